@@ -8,19 +8,52 @@ import json
 import random
 import time
 import base64
+import io
+import hashlib
+import zlib
+import sqlite3
 import email
 import email.policy
+import sys
+import tempfile
+import logging
+import threading
+import queue
+import uuid
+import cProfile
+import multiprocessing
+import importlib
+import pstats
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from email.message import EmailMessage
 from datetime import datetime, timedelta
-from collections import defaultdict
-import fitz  # PyMuPDF
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from langchain_groq import ChatGroq
+from collections import OrderedDict, defaultdict
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for, session
+
+class LazyModule:
+    """Module proxy that imports on first attribute access.
+
+    Keeps heavy libraries off the cold-start path: a serverless instance
+    serving `/` or `/send_email` never loads PyMuPDF, NumPy or httpx.
+    Google and LangChain classes are imported inside the functions that
+    use them, for the same reason.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)  # the import lock makes this thread-safe
+        return getattr(self._module, attr)
+
+fitz = LazyModule("fitz")  # PyMuPDF
+httpx = LazyModule("httpx")
+np = LazyModule("numpy")
 
 # ==================== CONFIGURATION ====================
 SCOPES = [
@@ -44,11 +77,275 @@ import smtplib
 
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-TEMPORARY_FOLDER = "temp_resumes"
+# Serverless hosts (Vercel, Lambda): only the temp dir is writable and background threads are frozen
+# once a response is sent, so state defaults to the temp dir and process memory there
+SERVERLESS = os.getenv("SERVERLESS", "1" if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "0") == "1"
+TEMPORARY_FOLDER = os.getenv("TEMPORARY_FOLDER", "temp_resumes")
+ATTACHMENT_MAX_AGE_DAYS = int(os.getenv("ATTACHMENT_MAX_AGE_DAYS", "90"))
+# "disk" (size-capped LRU) or "memory"
+ATTACHMENT_STORAGE = os.getenv("ATTACHMENT_STORAGE", "memory" if SERVERLESS else "disk")
+# Least recently used blobs are dropped past these caps; keep them above one run's downloads
+ATTACHMENT_DISK_MAX_BYTES = int(os.getenv("ATTACHMENT_DISK_MAX_BYTES", str(500 * 1024 * 1024)))
+ATTACHMENT_MEMORY_MAX_BYTES = int(os.getenv("ATTACHMENT_MEMORY_MAX_BYTES", str(200 * 1024 * 1024)))
+ATTACHMENT_JANITOR_INTERVAL = int(os.getenv("ATTACHMENT_JANITOR_INTERVAL", "600"))  # seconds between cleanups
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = os.getenv("SMTP_PORT")
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))  # persistent connections (and sender threads)
+SMTP_MESSAGES_PER_MINUTE = int(os.getenv("SMTP_MESSAGES_PER_MINUTE", "60"))  # provider send limit
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_IDLE_CHECK_SECONDS = 30  # NOOP-check connections that sat idle longer than this
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Logging in without STARTTLS would send the password in clear text; only for local test servers
+SMTP_ALLOW_PLAINTEXT = os.getenv("SMTP_ALLOW_PLAINTEXT", "0") == "1"
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = 30  # seconds before the first retry, doubled on every failure
+OUTBOX_BACKOFF_MAX = 3600
+OUTBOX_POLL_INTERVAL = 2
+OUTBOX_CLAIM_BATCH = 20
+# A claimed ('sending') email is only re-queued once its claim is older than this: long enough
+# for the whole claimed batch to go out at the provider rate, plus one SMTP timeout
+OUTBOX_LEASE_SECONDS = float(os.getenv(
+    "OUTBOX_LEASE_SECONDS", str(SMTP_TIMEOUT + 60.0 * OUTBOX_CLAIM_BATCH / max(1, SMTP_MESSAGES_PER_MINUTE))
+))
+
+# Gmail download engine
+MAX_RESUME_MESSAGES = int(os.getenv("MAX_RESUME_MESSAGES", "20"))
+MAX_RESUME_MESSAGES_LIMIT = int(os.getenv("MAX_RESUME_MESSAGES_LIMIT", "500"))  # most a request may ask for
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))  # Gmail allows at most 100 calls per batch
+GMAIL_DOWNLOAD_WORKERS = int(os.getenv("GMAIL_DOWNLOAD_WORKERS", "8"))
+GMAIL_LIST_PAGE_SIZE = 500  # maximum maxResults accepted by messages.list
+GMAIL_FULL_SYNC_MAX_MESSAGES = int(os.getenv("GMAIL_FULL_SYNC_MAX_MESSAGES", "5000"))  # ids queued by a full sync
+GMAIL_SKIP_LABELS = {'SENT', 'DRAFT', 'SPAM', 'TRASH'}  # new history entries with these labels are ignored
+GMAIL_API_ROOT = "https://gmail.googleapis.com/gmail/v1/users/me"
+GMAIL_PART_DEPTH = 5  # MIME nesting levels requested in the part-structure fetch
+GMAIL_STREAM_ATTACHMENTS = os.getenv("GMAIL_STREAM_ATTACHMENTS", "1") == "1"  # stream bodies over HTTP
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))  # larger PDFs are skipped
+ATTACHMENT_CHUNK_SIZE = 64 * 1024  # bytes read, decoded and written per step while streaming
+GMAIL_HTTP_TIMEOUT = float(os.getenv("GMAIL_HTTP_TIMEOUT", "60"))  # seconds per streamed attachment read
+
+# LLM
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.18"))
+# Models and temperatures a request may ask for; each pair gets its own client and metrics label
+LLM_ALLOWED_MODELS = [m.strip() for m in os.getenv("LLM_ALLOWED_MODELS", LLM_MODEL).split(",") if m.strip()]
+LLM_TEMPERATURE_CHOICES = sorted({0.0, LLM_TEMPERATURE, 0.5, 1.0})  # requested values snap to the nearest
+PROMPT_VERSION = "hr-profile-v2"  # bump whenever the profile prompt changes so cached profiles are not reused
+PROMPT_RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", "2500"))  # per candidate
+PROMPT_JD_TOKEN_BUDGET = int(os.getenv("PROMPT_JD_TOKEN_BUDGET", "700"))
+# Token counting for the budgets above: empty uses the ~4 characters/token estimate. A tiktoken encoding
+# name (e.g. "cl100k_base") opts in to exact counts for that encoding; tiktoken downloads the encoding
+# file on first use unless TIKTOKEN_CACHE_DIR already holds it. Neither matches the Llama tokenizer exactly.
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "")
+
+# Structured output: "json" (schema-validated JSON profiles) or "text" (section headers parsed with regexes)
+PROFILE_OUTPUT_MODE = os.getenv("PROFILE_OUTPUT_MODE", "json")
+STRUCTURED_PROMPT_VERSION = "hr-profile-json-v1"
+STRUCTURED_REPAIR_ATTEMPTS = int(os.getenv("STRUCTURED_REPAIR_ATTEMPTS", "1"))  # re-asks for malformed fields only
+
+# Batched scoring: several candidates per LLM request (1 keeps one request per candidate)
+SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", "1"))
+SCORING_BATCH_SIZE_MAX = 20  # largest batch_size a request may ask for
+BATCH_PROMPT_VERSION = "hr-profile-batch-v2"
+BATCH_PROMPT_TOKEN_BUDGET = int(os.getenv("BATCH_PROMPT_TOKEN_BUDGET", "5000"))  # resumes in one request
+BATCH_RESUME_TOKEN_BUDGET = int(os.getenv("BATCH_RESUME_TOKEN_BUDGET", "1200"))  # per candidate in a batch
+
+# LLM scheduling (defaults match Groq's free tier for llama-3.1-8b-instant)
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+LLM_OUTPUT_TOKENS_ESTIMATE = 1200  # reserved against the TPM budget for each completion
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE = int(os.getenv("LLM_HTTP_KEEPALIVE", "10"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+
+# Local persistence (SQLite)
+DATA_FOLDER = os.getenv("DATA_FOLDER", os.path.join(tempfile.gettempdir(), "hr_data") if SERVERLESS else "data")
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(DATA_FOLDER, "hr_app.db"))
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", str(30 * 24 * 3600)))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "5000"))
+
+# PDF text extraction
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))  # resumes longer than this are truncated
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# With in-memory attachments the text cache goes to the temp dir, which stays writable on serverless hosts
+TEXT_CACHE_FOLDER = os.getenv("TEXT_CACHE_FOLDER") or (
+    os.path.join(tempfile.gettempdir(), "hr_text_cache") if ATTACHMENT_STORAGE == "memory"
+    else os.path.join(DATA_FOLDER, "text_cache"))
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))  # trimmed by the janitor
+
+# Pre-LLM ranking (shortlisting is off unless a top-K or minimum score is set)
+SHORTLIST_TOP_K = int(os.getenv("SHORTLIST_TOP_K", "0"))  # 0 sends every resume to the LLM
+SHORTLIST_MIN_SCORE = float(os.getenv("SHORTLIST_MIN_SCORE", "0"))  # prescreen score, 0-100
+BM25_K1 = 1.5
+BM25_B = 0.75
+RANKING_KEYWORD_WEIGHT = 0.3  # share of the prescreen score coming from keyword_match hits
+
+# Instrumentation
+STRUCTURED_LOGS = os.getenv("STRUCTURED_LOGS", "1") == "1"  # JSON log line per candidate and screening run
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # operational messages (retries, skipped mail, worker errors)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"  # allows ?profile=1 on any request
+PROFILE_FOLDER = os.getenv("PROFILE_FOLDER", os.path.join(DATA_FOLDER, "profiles"))
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TRACE_MAX_SPANS = 10000  # spans kept per screening run for the timing summary
+
+# Candidate store browsing
+CANDIDATE_PAGE_SIZE = 50
+CANDIDATE_PAGE_SIZE_MAX = 500
+
+# Semantic matching (local embeddings, no LLM)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")  # "hashing" or "sentence-transformers"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")  # sentence-transformers model name
+EMBEDDING_DIM = 1024  # hashed n-gram vector size
+EMBEDDING_CHUNK_WORDS = 120  # resume sections longer than this are split into windows
+SEMANTIC_RANKING_WEIGHT = float(os.getenv("SEMANTIC_RANKING_WEIGHT", "0"))  # share of the prescreen score
+SEMANTIC_SEARCH_TOP_N = 20
+
+# Background screening jobs
+# "sqlite" or "memory". Jobs run on in-process threads either way; on serverless hosts they only make
+# progress while some request keeps the instance running, so use /fetch_resumes there instead
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory" if SERVERLESS else "sqlite")
+SCREENING_JOB_WORKERS = int(os.getenv("SCREENING_JOB_WORKERS", "2"))
+SSE_POLL_INTERVAL = 0.5
+SSE_HEARTBEAT_INTERVAL = 15
+SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "3600"))  # clients reconnect with Last-Event-ID
+JOB_HEARTBEAT_INTERVAL = 30  # seconds between updated_at refreshes of this process's unfinished jobs
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", str(4 * JOB_HEARTBEAT_INTERVAL)))
+
+DB_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS profile_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        prompt_version TEXT NOT NULL,
+        raw_response TEXT NOT NULL,
+        sections TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_profile_cache_last_access ON profile_cache (last_access)",
+    "CREATE INDEX IF NOT EXISTS idx_profile_cache_created_at ON profile_cache (created_at)",
+    """CREATE TABLE IF NOT EXISTS attachment_index (
+        message_id TEXT NOT NULL,
+        attachment_name TEXT NOT NULL,
+        sender TEXT NOT NULL,
+        subject TEXT,
+        sha256 TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (message_id, attachment_name)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_attachment_index_sha256 ON attachment_index (sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_attachment_index_sender ON attachment_index (sender)",
+    "CREATE INDEX IF NOT EXISTS idx_attachment_index_created_at ON attachment_index (created_at)",
+    """CREATE TABLE IF NOT EXISTS gmail_sync_state (
+        account TEXT PRIMARY KEY,
+        history_id TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS gmail_processed_messages (
+        account TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        processed_at REAL NOT NULL,
+        PRIMARY KEY (account, message_id)
+    )""",
+    # Listed but not yet processed ids, in listing order (rowid); drained max_messages at a time
+    """CREATE TABLE IF NOT EXISTS gmail_pending_messages (
+        account TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        queued_at REAL NOT NULL,
+        PRIMARY KEY (account, message_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS screening_jobs (
+        job_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        params TEXT NOT NULL,
+        error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS screening_job_events (
+        job_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        event_type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (job_id, seq)
+    )""",
+    """CREATE TABLE IF NOT EXISTS email_outbox (
+        outbox_id TEXT PRIMARY KEY,
+        idempotency_key TEXT NOT NULL UNIQUE,
+        to_email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        sent_at REAL,
+        claimed_at REAL,
+        claimed_by TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)",
+    """CREATE TABLE IF NOT EXISTS job_postings (
+        job_posting_id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        job_description TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_screened_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_job_postings_last_screened ON job_postings (last_screened_at)",
+    """CREATE TABLE IF NOT EXISTS candidates (
+        job_posting_id TEXT NOT NULL,
+        candidate_key TEXT NOT NULL,
+        name TEXT,
+        email TEXT,
+        phone TEXT,
+        filename TEXT,
+        sender TEXT,
+        subject TEXT,
+        prescreen_score REAL,
+        ats_score REAL,
+        hr_score REAL,
+        sections TEXT NOT NULL,
+        model TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (job_posting_id, candidate_key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_job_hr ON candidates (job_posting_id, hr_score)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_job_ats ON candidates (job_posting_id, ats_score)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_job_updated ON candidates (job_posting_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_hr ON candidates (hr_score)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_ats ON candidates (ats_score)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_updated ON candidates (updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates (email)",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_email_lower ON candidates (lower(email))",
+    """CREATE TABLE IF NOT EXISTS embedding_cache (
+        content_hash TEXT NOT NULL,
+        embedder TEXT NOT NULL,
+        dim INTEGER NOT NULL,
+        chunks INTEGER NOT NULL,
+        vectors BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (content_hash, embedder)
+    )""",
+    """CREATE TABLE IF NOT EXISTS resume_index (
+        content_hash TEXT PRIMARY KEY,
+        name TEXT,
+        email TEXT,
+        phone TEXT,
+        filename TEXT,
+        sender TEXT,
+        indexed_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_resume_index_indexed_at ON resume_index (indexed_at)",
+]
 
 
 # Domain keywords for analysis
@@ -62,39 +359,1421 @@ KEYWORDS = {
 EXCLUDE_SENDERS = ['noreply', 'do-not-reply', 'system', 'newsletter', 'notification', 'alert', 'auto']
 RESUME_KEYWORDS = ['resume', 'cv', 'profile', 'biodata', 'application', 'job', 'candidate', 'bio data', 'my details', 'applying', 'seeking', 'submission']
 EXCLUDE_KEYWORDS = ['manual', 'form', 'insurance', 'doc', 'brochure', 'lab', 'syllabus', 'report']
+KEYWORDS_FILE = os.getenv("KEYWORDS_FILE")  # optional JSON {domain: [keywords]} replacing KEYWORDS
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 
-# ==================== GMAIL & RESUME PROCESSING LOGIC ====================
-def get_llm():
-    """Initializes and returns the Groq LLM instance."""
+# ==================== INSTRUMENTATION ====================
+class MetricsRegistry:
+    """Process-wide counters and histograms, exposed in the Prometheus text format on /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        self._metrics[name] = {'type': 'counter', 'help': help_text, 'series': {}}
+
+    def histogram(self, name, help_text, buckets=METRICS_LATENCY_BUCKETS):
+        self._metrics[name] = {'type': 'histogram', 'help': help_text, 'buckets': tuple(buckets), 'series': {}}
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._metrics[name]['series']
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        metric = self._metrics[name]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # Per-bucket counts plus [sum, count]; buckets are made cumulative when rendering
+            series = metric['series'].setdefault(key, [0] * len(metric['buckets']) + [0.0, 0])
+            for i, bound in enumerate(metric['buckets']):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @staticmethod
+    def _labels(pairs):
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, metric in self._metrics.items():
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in sorted(metric['series'].items()):
+                    if metric['type'] == 'counter':
+                        lines.append(f"{name}{self._labels(key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric['buckets'], value):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(key + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{self._labels(key + (('le', '+Inf'),))} {value[-1]}")
+                    lines.append(f"{name}_sum{self._labels(key)} {value[-2]:.6f}")
+                    lines.append(f"{name}_count{self._labels(key)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+METRICS = MetricsRegistry()
+METRICS.histogram("hr_stage_duration_seconds", "Time spent in each pipeline stage.")
+METRICS.counter("hr_stage_errors_total", "Pipeline stage executions that raised.")
+METRICS.counter("hr_llm_requests_total", "LLM requests by model and outcome.")
+METRICS.counter("hr_llm_tokens_total", "LLM tokens by model and kind (prompt/completion).")
+METRICS.counter("hr_candidates_total", "Candidates scored or failed, by profile source.")
+METRICS.counter("hr_batch_fallbacks_total", "Candidates a batch response left out, rescored one by one.")
+METRICS.counter("hr_resumes_downloaded_total", "New resume attachments downloaded from Gmail.")
+METRICS.counter("hr_emails_total", "Outgoing emails by outcome.")
+METRICS.counter("hr_screening_runs_total", "Screening pipeline runs by status.")
+
+class Trace:
+    """Spans recorded during one screening run, summarised per stage."""
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, duration, attrs, error):
+        with self._lock:
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append({'stage': stage, 'duration': duration, 'error': error, **attrs})
+
+    def summary(self):
+        """{stage: {'count', 'total_ms', 'max_ms', 'errors'}} in first-seen order."""
+        stages = {}
+        with self._lock:
+            for item in self.spans:
+                stats = stages.setdefault(item['stage'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'errors': 0})
+                stats['count'] += 1
+                stats['total_ms'] += item['duration'] * 1000
+                stats['max_ms'] = max(stats['max_ms'], item['duration'] * 1000)
+                stats['errors'] += int(item['error'])
+        for stats in stages.values():
+            stats['total_ms'] = round(stats['total_ms'], 1)
+            stats['max_ms'] = round(stats['max_ms'], 1)
+        return stages
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+@contextmanager
+def span(stage, **attrs):
+    """Times a pipeline stage into the stage histogram and the current run's trace.
+
+    The yielded dict can be filled with extra attributes for the trace.
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield attrs
+    except Exception:
+        error = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        METRICS.observe("hr_stage_duration_seconds", duration, stage=stage)
+        if error:
+            METRICS.inc("hr_stage_errors_total", stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, duration, attrs, error)
+
+@contextmanager
+def start_trace(trace_id=None):
+    trace = Trace(trace_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+EVENT_LOGGER = logging.getLogger("hr_screening")
+if not EVENT_LOGGER.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    EVENT_LOGGER.addHandler(_handler)
+    EVENT_LOGGER.setLevel(logging.INFO)
+    EVENT_LOGGER.propagate = False
+
+# Operational messages go to stderr, so stdout stays a clean stream of log_event JSON lines
+LOGGER = logging.getLogger("hr_app")
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(message)s"))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(LOG_LEVEL.upper())
+    LOGGER.propagate = False
+
+def log_event(event, **fields):
+    """Writes one structured (JSON) log line, tagged with the current run id."""
+    if not STRUCTURED_LOGS:
+        return
+    record = {"ts": round(time.time(), 3), "event": event}
+    trace = _current_trace.get()
+    if trace is not None:
+        record["run_id"] = trace.trace_id
+    record.update(fields)
+    EVENT_LOGGER.info(json.dumps(record, default=str))
+
+class ProfileSession:
+    """Collects cProfile data from the request thread and the worker threads it fans out to."""
+
+    def __init__(self):
+        self.stats = None
+        self._lock = threading.Lock()
+
+    def add(self, profiler):
+        with self._lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+def _run_in_worker(fn, *args):
+    session = _current_profile.get()
+    if session is None:
+        return fn(*args)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        session.add(profiler)
+
+def submit_in_context(pool, fn, *args):
+    """pool.submit that carries the caller's trace (and profiling session) into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, _run_in_worker, fn, *args)
+
+# ==================== KEYWORD MATCHING ====================
+class KeywordMatcher:
+    """Finds every keyword of a taxonomy in one pass over the text.
+
+    All terms are compiled into a single case-insensitive regex (a trie of
+    alternatives, so thousands of terms stay fast) with word boundaries:
+    'AI' does not match inside 'maintain', nor 'doc' inside 'doctor'.
+    A plural 's'/'es' suffix is allowed, so 'Resumes' still matches 'resume'.
+    """
+
+    def __init__(self, taxonomy, boundary=r'[a-z0-9]'):
+        if not isinstance(taxonomy, dict):
+            taxonomy = {'default': list(taxonomy)}
+        self.taxonomy = taxonomy
+        self._terms = {}  # normalised term -> [(group, keyword as written, taxonomy position)]
+        position = 0
+        for group, keywords in taxonomy.items():
+            for kw in keywords:
+                key = self.normalise(kw)
+                if key:
+                    self._terms.setdefault(key, []).append((group, kw, position))
+                    position += 1
+        pattern = self._trie_pattern(self._terms) if self._terms else r'(?!x)x'
+        self._regex = re.compile(rf'(?<!{boundary})(?P<term>{pattern})(?:e?s)?(?!{boundary})', re.IGNORECASE)
+
+    @staticmethod
+    def normalise(term):
+        return ' '.join(term.lower().split())
+
+    @staticmethod
+    def _trie_pattern(terms):
+        trie = {}
+        for term in terms:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        def _build(node):
+            branches = [
+                (r'\s+' if ch == ' ' else re.escape(ch)) + _build(child)
+                for ch, child in sorted(node.items()) if ch
+            ]
+            if not branches:
+                return ''
+            body = '|'.join(branches)
+            if '' in node:
+                return f'(?:{body})?'
+            return body if len(branches) == 1 else f'(?:{body})'
+
+        return _build(trie)
+
+    def search(self, text):
+        """True if any keyword occurs in the text."""
+        return self._regex.search(text or '') is not None
+
+    def finditer(self, text):
+        """Yields (normalised term, start, end) for every non-overlapping hit, longest term first."""
+        for m in self._regex.finditer(text or ''):
+            yield self.normalise(m.group('term')), m.start(), m.end()
+
+    def hits(self, text):
+        """Returns {keyword: {'count', 'offsets', 'groups'}} for every keyword found."""
+        by_term = {}
+        for term, start, end in self.finditer(text):
+            by_term.setdefault(term, []).append((start, end))
+        found = {}
+        for term, offsets in by_term.items():
+            groups = list(dict.fromkeys(group for group, _, _ in self._terms[term]))
+            for _, kw, _ in self._terms[term]:
+                found[kw] = {'count': len(offsets), 'offsets': offsets, 'groups': groups}
+        return found
+
+    def match_groups(self, text):
+        """Returns {group: [keywords found]} in taxonomy order, like the original keyword_match."""
+        seen = {term for term, _, _ in self.finditer(text)}
+        entries = sorted((entry for term in seen for entry in self._terms[term]), key=lambda e: e[2])
+        matches = defaultdict(list)
+        for group, kw, _ in entries:
+            matches[group].append(kw)
+        return dict(matches)
+
+def validate_keyword_taxonomy(taxonomy):
+    """Raises ValueError unless the taxonomy is a {domain: [keyword strings]} dict."""
+    if not isinstance(taxonomy, dict):
+        raise ValueError("keyword taxonomy must be an object of {domain: [keywords]}")
+    for group, keywords in taxonomy.items():
+        if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+            raise ValueError(f"keywords for {group!r} must be a list of strings")
+    return taxonomy
+
+def load_keyword_taxonomy(path):
+    """Loads a {domain: [keywords]} taxonomy from a JSON file."""
+    with open(path, encoding='utf-8') as f:
+        taxonomy = json.load(f)
     try:
-        return ChatGroq(
-            groq_api_key=GROQ_API_KEY,
-            model_name="llama-3.1-8b-instant",
-            temperature=0.18
+        return validate_keyword_taxonomy(taxonomy)
+    except ValueError as e:
+        raise ValueError(f"Keyword taxonomy in {path}: {str(e)}")
+
+@lru_cache(maxsize=32)
+def _compiled_keyword_matcher(taxonomy_json):
+    return KeywordMatcher(json.loads(taxonomy_json))
+
+def get_keyword_matcher(taxonomy=None):
+    """Returns a compiled matcher for a user-supplied taxonomy (cached), or the default one."""
+    if not taxonomy:
+        return KEYWORD_MATCHER
+    return _compiled_keyword_matcher(json.dumps(taxonomy, sort_keys=True))
+
+if KEYWORDS_FILE:
+    KEYWORDS = load_keyword_taxonomy(KEYWORDS_FILE)
+
+# Compiled once at import. Filenames and senders only need letter boundaries so 'resume2024.pdf' still matches
+KEYWORD_MATCHER = KeywordMatcher(KEYWORDS)
+RESUME_KEYWORD_MATCHER = KeywordMatcher(RESUME_KEYWORDS, boundary=r'[a-z]')
+EXCLUDE_KEYWORD_MATCHER = KeywordMatcher(EXCLUDE_KEYWORDS, boundary=r'[a-z]')
+EXCLUDE_SENDER_MATCHER = KeywordMatcher(EXCLUDE_SENDERS, boundary=r'[a-z]')
+
+# ==================== LOCAL DATABASE ====================
+_db_local = threading.local()
+
+# Columns added after a table was first released: (table, column, declaration)
+DB_COLUMN_MIGRATIONS = [
+    ("email_outbox", "claimed_at", "REAL"),
+    ("email_outbox", "claimed_by", "TEXT"),
+]
+
+def migrate_columns(conn):
+    """Adds any DB_COLUMN_MIGRATIONS column missing from an existing database."""
+    for table, column, declaration in DB_COLUMN_MIGRATIONS:
+        existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def get_db():
+    """Returns this thread's SQLite connection, creating the schema on first use."""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None or getattr(_db_local, 'path', None) != DATABASE_PATH:
+        os.makedirs(os.path.dirname(DATABASE_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(DATABASE_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in DB_SCHEMA:
+            conn.execute(statement)
+        migrate_columns(conn)
+        conn.commit()
+        _db_local.conn = conn
+        _db_local.path = DATABASE_PATH
+    return conn
+
+# ==================== CANDIDATE PROFILE CACHE ====================
+class ProfileCache:
+    """Content-addressed cache of LLM candidate profiles with TTL and LRU eviction."""
+
+    def __init__(self, ttl=PROFILE_CACHE_TTL, max_entries=PROFILE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(resume_text, job_description, model=LLM_MODEL, prompt_version=PROMPT_VERSION,
+                 temperature=None, matched_keywords=None):
+        """Hashes everything that influences the LLM output into a cache key.
+
+        That is the inputs, the model and its temperature, the keyword matches
+        the prompt includes (which depend on the taxonomy) and the prompt
+        version, token budgets and tokenizer.
+        """
+        material = json.dumps([
+            resume_text,
+            job_description,
+            model,
+            prompt_version,
+            float(LLM_TEMPERATURE if temperature is None else temperature),
+            matched_keywords or {},
+            [PROMPT_RESUME_TOKEN_BUDGET, PROMPT_JD_TOKEN_BUDGET, BATCH_RESUME_TOKEN_BUDGET, BATCH_PROMPT_TOKEN_BUDGET],
+            PROMPT_TOKENIZER,
+        ], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns {'raw_response', 'sections'} for a fresh entry, or None."""
+        conn = get_db()
+        now = time.time()
+        row = conn.execute(
+            "SELECT raw_response, sections, created_at FROM profile_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row['created_at'] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE profile_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+        conn.commit()
+        with self._lock:
+            self.hits += 1
+        return {'raw_response': row['raw_response'], 'sections': json.loads(row['sections'])}
+
+    def put(self, key, raw_response, sections, model=LLM_MODEL, prompt_version=PROMPT_VERSION):
+        """Stores a profile and evicts expired or least recently used entries."""
+        conn = get_db()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO profile_cache "
+            "(cache_key, model, prompt_version, raw_response, sections, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, model, prompt_version, raw_response, json.dumps(sections), now, now)
         )
-    except Exception as e:
-        print(f"Failed to initialize LLM: {str(e)}")
-        return None
+        conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones above max_entries."""
+        conn = get_db()
+        removed = conn.execute("DELETE FROM profile_cache WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM profile_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                "DELETE FROM profile_cache WHERE cache_key IN "
+                "(SELECT cache_key FROM profile_cache ORDER BY last_access LIMIT ?)", (overflow,)
+            ).rowcount
+        conn.commit()
+        with self._lock:
+            self.evictions += removed
+
+    def stats(self):
+        """Returns hit/miss/eviction counters and the current entry count."""
+        entries = get_db().execute("SELECT COUNT(*) FROM profile_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': entries,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+PROFILE_CACHE = ProfileCache()
+
+# ==================== ATTACHMENT STORE ====================
+class MemoryBlobBackend:
+    """Attachment bytes kept in process memory, least recently used dropped past `max_bytes`.
+
+    For serverless deployments, where the filesystem is read-only or
+    ephemeral; nothing touches disk.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes=None):
+        self._max_bytes = max_bytes
+        self._blobs = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        return ATTACHMENT_MEMORY_MAX_BYTES if self._max_bytes is None else self._max_bytes
+
+    def write(self, chunks, max_bytes=None):
+        """Buffers the chunks and stores them under their SHA-256. Returns (sha256, size, is_new)."""
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+        for chunk in chunks:
+            if max_bytes and buffer.tell() + len(chunk) > max_bytes:
+                raise ValueError(f"attachment exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            buffer.write(chunk)
+        sha256 = digest.hexdigest()
+        data = buffer.getvalue()
+        with self._lock:
+            is_new = sha256 not in self._blobs
+            if is_new:
+                self._blobs[sha256] = data
+                self._size += len(data)
+            self._blobs.move_to_end(sha256)
+        self.enforce_limit()
+        return sha256, len(data), is_new
+
+    def exists(self, sha256):
+        return sha256 in self._blobs
+
+    def read(self, sha256):
+        with self._lock:
+            data = self._blobs.get(sha256)
+            if data is not None:
+                self._blobs.move_to_end(sha256)
+            return data
+
+    def source(self, sha256):
+        """What extract_text_from_pdf is given: the bytes themselves."""
+        return self.read(sha256)
+
+    def delete(self, sha256):
+        with self._lock:
+            data = self._blobs.pop(sha256, None)
+            if data is not None:
+                self._size -= len(data)
+
+    def enforce_limit(self):
+        """Drops least recently used blobs until under the size cap. Returns the number dropped."""
+        dropped = 0
+        with self._lock:
+            while self._size > self.max_bytes and len(self._blobs) > 1:
+                _, data = self._blobs.popitem(last=False)
+                self._size -= len(data)
+                dropped += 1
+        return dropped
+
+    def stats(self):
+        return {"backend": self.name, "blobs": len(self._blobs), "bytes": self._size, "max_bytes": self.max_bytes}
+
+class DiskBlobBackend:
+    """Attachment files named <sha256>.pdf in a folder, size-capped as an LRU by file mtime.
+
+    Reads touch the file, so eviction removes what was used longest ago.
+    Chunks are streamed to a temp file, so only one is in memory at a time.
+    """
+
+    name = "disk"
+    INCOMING_MAX_AGE = 3600  # seconds before an abandoned .incoming file is removed
+    BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.pdf$")  # other files in the folder are never counted or deleted
+
+    def __init__(self, folder=None, max_bytes=None):
+        self._folder = folder
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {}  # folder -> bytes on disk, computed on first use
+
+    @property
+    def folder(self):
+        return self._folder or TEMPORARY_FOLDER
+
+    @property
+    def max_bytes(self):
+        return ATTACHMENT_DISK_MAX_BYTES if self._max_bytes is None else self._max_bytes
+
+    def path(self, sha256):
+        return os.path.join(self.folder, f"{sha256}.pdf")
+
+    def write(self, chunks, max_bytes=None):
+        """Writes the chunks to disk, hashing as it goes. Returns (sha256, size, is_new)."""
+        os.makedirs(self.folder, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.folder, f".incoming-{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise ValueError(f"attachment exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            path = self.path(sha256)
+            with self._lock:
+                is_new = not os.path.exists(path)
+                if is_new:
+                    os.replace(tmp_path, path)
+                    if self.folder in self._sizes:
+                        self._sizes[self.folder] += size
+                else:
+                    os.utime(path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if self._sizes.get(self.folder, float("inf")) > self.max_bytes:
+            self.enforce_limit()
+        return sha256, size, is_new
 
-def send_email(to_email: str, subject: str, body: str) -> bool:
-    """Send a plain-text email. Returns True if successful."""
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def read(self, sha256):
+        try:
+            with open(self.path(sha256), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(self.path(sha256))
+        return data
+
+    def source(self, sha256):
+        """What extract_text_from_pdf is given: the file path (PyMuPDF reads it directly)."""
+        path = self.path(sha256)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def delete(self, sha256):
+        try:
+            size = os.path.getsize(self.path(sha256))
+            os.remove(self.path(sha256))
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self.folder in self._sizes:
+                self._sizes[self.folder] -= size
+
+    def _scan(self):
+        """[(mtime, size, path)] of stored blobs (<sha256>.pdf only); also removes abandoned temp files."""
+        entries = []
+        now = time.time()
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+                if name.startswith(".incoming-"):
+                    if now - stat.st_mtime > self.INCOMING_MAX_AGE:
+                        os.remove(path)
+                elif self.BLOB_NAME.match(name):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def enforce_limit(self):
+        """Deletes least recently used blobs until under the size cap. Returns the number deleted."""
+        with self._lock:
+            entries = sorted(self._scan())
+            size = sum(entry[1] for entry in entries)
+            dropped = 0
+            for _, blob_size, path in entries[:-1]:
+                if size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= blob_size
+                dropped += 1
+            self._sizes[self.folder] = size
+        return dropped
+
+    def stats(self):
+        entries = self._scan()
+        return {
+            "backend": self.name,
+            "folder": self.folder,
+            "blobs": len(entries),
+            "bytes": sum(entry[1] for entry in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+def make_blob_backend(kind=None):
+    kind = kind or ATTACHMENT_STORAGE
+    if kind == "memory":
+        return MemoryBlobBackend()
+    if kind != "disk":
+        LOGGER.warning(f"Unknown ATTACHMENT_STORAGE {kind!r}, using disk")
+    return DiskBlobBackend()
+
+class AttachmentStore:
+    """Content-addressed store of downloaded attachments.
+
+    Blobs are kept once per SHA-256 in a pluggable backend (size-capped
+    disk LRU or process memory); an index maps Gmail message id,
+    attachment name and sender to the blob, so repeated mails and repeated
+    runs never download or score the same bytes twice, even after the blob
+    itself has been evicted. With the memory backend the index lives in an
+    in-memory SQLite database too, so nothing is written under DATA_FOLDER.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._memory_index = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = make_blob_backend()
+        return self._backend
+
+    @contextmanager
+    def _index(self):
+        """The index connection, held under the store lock (the in-memory one is shared by all threads)."""
+        with self._lock:
+            if self.backend.name != "memory":
+                yield get_db()
+                return
+            if self._memory_index is None:
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                for statement in DB_SCHEMA:
+                    if "attachment_index" in statement:
+                        conn.execute(statement)
+                self._memory_index = conn
+            yield self._memory_index
+
+    def is_indexed(self, message_id, attachment_name):
+        """True if this message's attachment was stored by an earlier run."""
+        return self.lookup(message_id, attachment_name) is not None
+
+    def lookup(self, message_id, attachment_name):
+        """SHA-256 of this message's attachment if an earlier run stored it, else None."""
+        with self._index() as conn:
+            row = conn.execute(
+                "SELECT sha256 FROM attachment_index WHERE message_id = ? AND attachment_name = ?",
+                (message_id, attachment_name)
+            ).fetchone()
+        return row['sha256'] if row else None
+
+    def put(self, data, message_id, attachment_name, sender, subject):
+        """Stores attachment bytes and indexes them. Returns (sha256, is_new_blob)."""
+        return self.put_stream([data], message_id, attachment_name, sender, subject)
+
+    def put_stream(self, chunks, message_id, attachment_name, sender, subject, max_bytes=None):
+        """Stores an attachment chunk by chunk, hashing as it goes, then indexes it.
+
+        Raises ValueError (and keeps nothing) if the attachment grows past
+        `max_bytes`. A blob is new if its bytes were never indexed before.
+        Returns (sha256, is_new_blob).
+        """
+        try:
+            sha256, size, _ = self.backend.write(chunks, max_bytes)
+        except ValueError as e:
+            raise ValueError(f"{attachment_name}: {str(e)}")
+        with self._index() as conn:
+            is_new = conn.execute("SELECT 1 FROM attachment_index WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone() is None
+            conn.execute(
+                "INSERT OR REPLACE INTO attachment_index "
+                "(message_id, attachment_name, sender, subject, sha256, size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (message_id, attachment_name, sender, subject, sha256, size, time.time())
+            )
+            conn.commit()
+        return sha256, is_new
+
+    def exists(self, sha256):
+        return self.backend.exists(sha256)
+
+    def read(self, sha256):
+        """The blob's bytes, or None if evicted."""
+        return self.backend.read(sha256)
+
+    def source(self, sha256):
+        """A path or bytes for extract_text_from_pdf, or None if evicted."""
+        return self.backend.source(sha256)
+
+    def blobs_for_sender(self, sender):
+        """Returns the blob hashes previously received from a sender."""
+        with self._index() as conn:
+            rows = conn.execute("SELECT DISTINCT sha256 FROM attachment_index WHERE sender = ?", (sender,)).fetchall()
+        return [r['sha256'] for r in rows]
+
+    def evict(self, max_age_days=None):
+        """Deletes blobs (and their index rows) not seen in any mail for `max_age_days`."""
+        max_age_days = ATTACHMENT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        cutoff = time.time() - max_age_days * 86400
+        with self._index() as conn:
+            stale = [r['sha256'] for r in conn.execute(
+                "SELECT sha256 FROM attachment_index GROUP BY sha256 HAVING MAX(created_at) < ?", (cutoff,)
+            ).fetchall()]
+            for sha256 in stale:
+                self.backend.delete(sha256)
+            conn.executemany("DELETE FROM attachment_index WHERE sha256 = ?", [(sha256,) for sha256 in stale])
+            conn.commit()
+        return len(stale)
+
+    def cleanup(self):
+        """Age-based eviction plus the backend's size cap. Returns (expired, dropped)."""
+        return self.evict(), self.backend.enforce_limit()
+
+    def stats(self):
+        return self.backend.stats()
+
+ATTACHMENT_STORE = AttachmentStore()
+
+class AttachmentJanitor:
+    """Background thread that periodically expires old attachments and enforces the storage and text cache caps."""
+
+    def __init__(self, store, interval=None):
+        self.store = store
+        self._interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self):
+        return ATTACHMENT_JANITOR_INTERVAL if self._interval is None else self._interval
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="attachment-janitor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                expired, dropped = self.store.cleanup()
+                trimmed = trim_text_cache()
+                if expired or dropped or trimmed:
+                    LOGGER.info(f"Attachment janitor: expired {expired}, dropped {dropped} blob(s) over the size cap, "
+                                f"trimmed {trimmed} cached text(s)")
+            except Exception as e:
+                LOGGER.error(f"Attachment janitor error: {e}")
+            time.sleep(self.interval)
+
+ATTACHMENT_JANITOR = AttachmentJanitor(ATTACHMENT_STORE)
+
+# ==================== LLM CLIENTS ====================
+class LLMClientRegistry:
+    """Process-wide, lazily built ChatGroq clients sharing one keep-alive HTTP connection pool."""
+
+    def __init__(self):
+        self._clients = {}
+        self._http_client = None
+        self._lock = threading.Lock()
+
+    def _get_http_client(self):
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                timeout=LLM_REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_KEEPALIVE
+                )
+            )
+        return self._http_client
+
+    def get(self, model, temperature):
+        key = (model, float(temperature))
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    from langchain_groq import ChatGroq
+                    client = ChatGroq(
+                        groq_api_key=GROQ_API_KEY,
+                        model_name=model,
+                        temperature=temperature,
+                        max_retries=0,  # retries are scheduled by invoke_llm_with_backoff
+                        http_client=self._get_http_client()
+                    )
+                    self._clients[key] = client
+        return client
+
+LLM_CLIENTS = LLMClientRegistry()
+
+class LLMMetrics:
+    """Per-model call latency and token usage, for diagnosing where screening time goes."""
+
+    MAX_SAMPLES = 1000  # latency samples kept per model for percentiles
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, latency, prompt_tokens=0, completion_tokens=0, error=False):
+        with self._lock:
+            stats = self._models.setdefault(model, {
+                'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'total_latency': 0.0, 'latencies': []
+            })
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['total_latency'] += latency
+            stats['latencies'].append(latency)
+            del stats['latencies'][:-self.MAX_SAMPLES]
+        METRICS.inc("hr_llm_requests_total", model=model, outcome="error" if error else "ok")
+        if prompt_tokens or completion_tokens:
+            METRICS.inc("hr_llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+            METRICS.inc("hr_llm_tokens_total", completion_tokens, model=model, kind="completion")
+
+    def snapshot(self):
+        summary = {}
+        with self._lock:
+            for model, stats in self._models.items():
+                latencies = sorted(stats['latencies'])
+                summary[model] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'prompt_tokens': stats['prompt_tokens'],
+                    'completion_tokens': stats['completion_tokens'],
+                    'avg_latency_s': round(stats['total_latency'] / stats['calls'], 3),
+                    'p50_latency_s': round(latencies[len(latencies) // 2], 3),
+                    'p95_latency_s': round(latencies[int(len(latencies) * 0.95)], 3),
+                }
+        return summary
+
+LLM_METRICS = LLMMetrics()
+
+def get_token_usage(response):
+    """Returns (prompt_tokens, completion_tokens) reported for an LLM response."""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    if usage:
+        return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+    token_usage = (getattr(response, 'response_metadata', None) or {}).get('token_usage', {})
+    return token_usage.get('prompt_tokens', 0), token_usage.get('completion_tokens', 0)
+
+# ==================== LLM RATE LIMITING ====================
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until enough tokens have refilled."""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def try_acquire(self, amount=1):
+        """Takes `amount` tokens if available; otherwise returns the seconds to wait."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.refill_per_second
+
+    def acquire(self, amount=1):
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+class LLMRateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter shared by all LLM workers."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Holds every worker back, e.g. after the server answered 429 with Retry-After."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, estimated_tokens):
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+                continue
+            self.requests.acquire(1)
+            self.tokens.acquire(estimated_tokens)
+            return
+
+LLM_RATE_LIMITER = LLMRateLimiter(GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE)
+
+def estimate_tokens(text):
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 / rate limit errors raised by the Groq client."""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    message = str(error).lower()
+    return "rate_limit" in message or "rate limit" in message or "429" in message
+
+def is_transient_error(error):
+    """True for errors worth retrying besides rate limits: 5xx/408 responses, timeouts and dropped connections.
+
+    The Groq client is built with max_retries=0, so these are retried here instead.
+    """
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int) and (status >= 500 or status == 408):
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # groq.APIConnectionError / APITimeoutError wrap the underlying httpx transport error
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    return isinstance(error, httpx.TransportError)
+
+def get_retry_after(error):
+    """Reads the Retry-After header (seconds) from an API error, if present."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after') or headers.get('Retry-After')
     try:
-        msg = EmailMessage()
-        msg["From"] = EMAIL_ADDRESS
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.set_content(body)
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def compute_backoff(attempt, retry_after=None):
+    """Seconds to wait before retry `attempt`: Retry-After if given, else full-jitter exponential backoff."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+def invoke_llm_with_backoff(llm, prompt, limiter=None, max_retries=None, output_tokens=None, stream_parser=None):
+    """Invokes the LLM under the shared rate limiter, retrying rate-limited and transient failures.
+
+    With `stream_parser`, the response is streamed and every chunk is fed to
+    the parser as it arrives (the parser is reset before each attempt).
+    Returns the response content; other errors are raised to the caller.
+    """
+    limiter = limiter or LLM_RATE_LIMITER
+    max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+    estimated_tokens = estimate_tokens(prompt) + (output_tokens or LLM_OUTPUT_TOKENS_ESTIMATE)
+    model = getattr(llm, 'model_name', 'unknown')
+    for attempt in range(max_retries + 1):
+        with span("llm.rate_limit_wait"):
+            limiter.acquire(estimated_tokens)
+        start = time.perf_counter()
+        try:
+            with span("llm.request", model=model, attempt=attempt):
+                if stream_parser is None:
+                    response = llm.invoke(prompt)
+                    LLM_METRICS.record(model, time.perf_counter() - start, *get_token_usage(response))
+                    return response.content
+                stream_parser.reset()
+                parts, prompt_tokens, completion_tokens = [], 0, 0
+                for chunk in llm.stream(prompt):
+                    parts.append(chunk.content)
+                    stream_parser.feed(chunk.content)
+                    chunk_prompt_tokens, chunk_completion_tokens = get_token_usage(chunk)
+                    prompt_tokens += chunk_prompt_tokens
+                    completion_tokens += chunk_completion_tokens
+                LLM_METRICS.record(model, time.perf_counter() - start, prompt_tokens, completion_tokens)
+                return "".join(parts)
+        except Exception as e:
+            LLM_METRICS.record(model, time.perf_counter() - start, error=True)
+            rate_limited = is_rate_limit_error(e)
+            if not (rate_limited or is_transient_error(e)) or attempt == max_retries:
+                raise
+            wait_time = compute_backoff(attempt, get_retry_after(e))
+            if rate_limited:
+                # A 429 applies to everyone sharing the key, so every worker backs off
+                limiter.pause(wait_time)
+                LOGGER.warning(f"Rate limit reached. Waiting {wait_time:.1f} seconds before retry...")
+            else:
+                LOGGER.warning(f"LLM request failed ({type(e).__name__}: {str(e)[:200]}). Retrying in {wait_time:.1f} seconds...")
+                time.sleep(wait_time)
+
+# ==================== EMAIL DELIVERY ====================
+class SMTPConnectionPool:
+    """Pool of persistent, authenticated SMTP connections.
+
+    Connections are opened lazily (at most `size`), reused across messages,
+    recycled after `max_messages` sends and transparently re-opened when the
+    server has dropped them. Login only happens when a password is
+    configured, and then only over STARTTLS unless `allow_plaintext` is set.
+    """
+
+    def __init__(self, host, port, username=None, password=None, size=2, timeout=30,
+                 max_messages=100, idle_check=SMTP_IDLE_CHECK_SECONDS, allow_plaintext=False):
+        self.host = host
+        self.port = int(port or 587)
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_check = idle_check
+        self.allow_plaintext = allow_plaintext
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connects = 0
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if smtp.has_extn("starttls"):
             smtp.starttls()
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            smtp.send_message(msg)
+            smtp.ehlo()
+        elif self.password and not self.allow_plaintext:
+            smtp.close()
+            raise smtplib.SMTPNotSupportedError(
+                f"{self.host}:{self.port} does not offer STARTTLS; refusing to send the password in clear text "
+                "(set SMTP_ALLOW_PLAINTEXT=1 only for local test servers)"
+            )
+        if self.password:
+            smtp.login(self.username, self.password)
+        self.connects += 1
+        return {"smtp": smtp, "sent": 0, "last_used": time.monotonic()}
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn["smtp"].quit()
+        except Exception:
+            try:
+                conn["smtp"].close()
+            except Exception:
+                pass
+
+    def _checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        stale = conn["sent"] >= self.max_messages
+        if not stale and time.monotonic() - conn["last_used"] > self.idle_check:
+            try:
+                stale = conn["smtp"].noop()[0] != 250
+            except smtplib.SMTPException:
+                stale = True
+            except OSError:
+                stale = True
+        if stale:
+            self._close(conn)
+            return self._connect()
+        return conn
+
+    def send(self, msg):
+        """Sends one EmailMessage, reconnecting once if the pooled connection was dropped.
+
+        Refused recipients and other SMTP errors are raised to the caller.
+        """
+        with self._slots:
+            conn = self._checkout()
+            try:
+                try:
+                    conn["smtp"].send_message(msg)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._close(conn)
+                    conn = None  # if reconnecting fails there is no connection left to return
+                    conn = self._connect()
+                    conn["smtp"].send_message(msg)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # The session is still usable after a rejected recipient or message
+                if conn is not None:
+                    self._release(conn)
+                raise
+            except Exception:
+                if conn is not None:
+                    self._close(conn)
+                raise
+            self._release(conn)
+
+    def _release(self, conn):
+        conn["sent"] += 1
+        conn["last_used"] = time.monotonic()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+class BulkEmailSender:
+    """Send queue in front of an SMTPConnectionPool, throttled to the provider's rate limit."""
+
+    def __init__(self, pool, workers=2, messages_per_minute=60):
+        self.pool = pool
+        self.throttle = TokenBucket(max(1, workers), messages_per_minute / 60.0)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp")
+
+    def _deliver(self, msg):
+        result = self._send(msg)
+        METRICS.inc("hr_emails_total", outcome="sent" if result["success"] else "failed")
+        return result
+
+    def _send(self, msg):
+        self.throttle.acquire()
+        try:
+            with span("email.send"):
+                self.pool.send(msg)
+            return {"email": msg["To"], "success": True}
+        except smtplib.SMTPRecipientsRefused as e:
+            code, reason = next(iter(e.recipients.values()))
+            return {
+                "email": msg["To"],
+                "success": False,
+                "error": f"{code} {reason.decode(errors='replace')}",
+                "permanent": code >= 500  # the mailbox does not exist or was rejected outright
+            }
+        except smtplib.SMTPAuthenticationError as e:
+            # Our credentials, not this message: keep retrying until they are fixed
+            return {"email": msg["To"], "success": False, "error": str(e)}
+        except smtplib.SMTPResponseException as e:
+            # 5xx replies (rejected sender, message refused at DATA) will not change on retry
+            return {"email": msg["To"], "success": False, "error": f"{e.smtp_code} {str(e.smtp_error)}",
+                    "permanent": e.smtp_code >= 500}
+        except Exception as e:
+            return {"email": msg["To"], "success": False, "error": str(e)}
+
+    def submit(self, msg):
+        """Queues one message; returns a future resolving to its per-recipient result."""
+        return self.executor.submit(self._deliver, msg)
+
+    def send_many(self, messages):
+        """Sends every message and returns one result dict per message, in order."""
+        futures = [self.submit(msg) for msg in messages]
+        return [f.result() for f in futures]
+
+_EMAIL_SENDER = None
+_EMAIL_SENDER_LOCK = threading.Lock()
+
+def get_email_sender():
+    """Returns the process-wide bulk sender, created on first use."""
+    global _EMAIL_SENDER
+    with _EMAIL_SENDER_LOCK:
+        if _EMAIL_SENDER is None:
+            pool = SMTPConnectionPool(
+                SMTP_SERVER,
+                SMTP_PORT,
+                EMAIL_ADDRESS,
+                EMAIL_PASSWORD,
+                size=SMTP_POOL_SIZE,
+                timeout=SMTP_TIMEOUT,
+                max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                allow_plaintext=SMTP_ALLOW_PLAINTEXT
+            )
+            _EMAIL_SENDER = BulkEmailSender(pool, SMTP_POOL_SIZE, SMTP_MESSAGES_PER_MINUTE)
+        return _EMAIL_SENDER
+
+def build_email_message(to_email, subject, body):
+    msg = EmailMessage()
+    msg["From"] = EMAIL_ADDRESS
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg
+
+# ==================== EMAIL OUTBOX ====================
+def email_idempotency_key(to_email, job_description, decision):
+    """One key per (candidate, job, decision) so repeated clicks never send twice."""
+    job_hash = hashlib.sha256((job_description or "").strip().encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{to_email.strip().lower()}|{job_hash}|{decision}".encode("utf-8")).hexdigest()
+
+class EmailOutbox:
+    """Durable queue of outgoing emails in the local SQLite database.
+
+    Rows move queued -> sending -> sent, or back to queued with an
+    exponential backoff after a failure, until OUTBOX_MAX_ATTEMPTS is
+    reached and they are marked failed. A claim is a lease held by one
+    dispatcher process; only expired leases are taken back, so a row that
+    another live worker is sending is never sent twice.
+    """
+
+    def __init__(self):
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def enqueue(self, to_email, subject, body, idempotency_key):
+        """Queues an email unless its key was seen before. Returns (row, created)."""
+        now = time.time()
+        conn = get_db()
+        cur = conn.execute(
+            """INSERT OR IGNORE INTO email_outbox
+               (outbox_id, idempotency_key, to_email, subject, body, status, next_attempt_at, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)""",
+            (uuid.uuid4().hex, idempotency_key, to_email, subject, body, now, now, now)
+        )
+        conn.commit()
+        row = conn.execute("SELECT * FROM email_outbox WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        return dict(row), cur.rowcount == 1
+
+    def claim(self, limit=OUTBOX_CLAIM_BATCH):
+        """Marks up to `limit` due emails as sending (leased to this process) and returns them."""
+        self.reset_stale()
+        conn = get_db()
+        rows = conn.execute(
+            "SELECT * FROM email_outbox WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            # Another dispatcher process may have claimed the row in between
+            now = time.time()
+            cur = conn.execute(
+                "UPDATE email_outbox SET status = 'sending', claimed_at = ?, claimed_by = ?, updated_at = ? "
+                "WHERE outbox_id = ? AND status = 'queued'",
+                (now, self.owner, now, row['outbox_id'])
+            )
+            if cur.rowcount == 1:
+                claimed.append(dict(row))
+        conn.commit()
+        return claimed
+
+    def mark_sent(self, outbox_id):
+        now = time.time()
+        conn = get_db()
+        conn.execute(
+            "UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, last_error = NULL, "
+            "sent_at = ?, updated_at = ? WHERE outbox_id = ?",
+            (now, now, outbox_id)
+        )
+        conn.commit()
+
+    def mark_failed(self, row, error, permanent=False):
+        """Schedules a retry with exponential backoff, or gives up after the last attempt."""
+        attempts = row['attempts'] + 1
+        now = time.time()
+        if permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+            status, next_attempt = 'failed', now
+        else:
+            delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+            status, next_attempt = 'queued', now + random.uniform(delay / 2, delay)
+        conn = get_db()
+        conn.execute(
+            "UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+            "WHERE outbox_id = ?",
+            (status, attempts, next_attempt, error, now, row['outbox_id'])
+        )
+        conn.commit()
+
+    def reset_stale(self, lease_seconds=None):
+        """Re-queues emails whose 'sending' lease expired (the claiming process stopped mid-send)."""
+        lease_seconds = OUTBOX_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        now = time.time()
+        conn = get_db()
+        cur = conn.execute(
+            "UPDATE email_outbox SET status = 'queued', next_attempt_at = ?, claimed_at = NULL, claimed_by = NULL, "
+            "updated_at = ? WHERE status = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)",
+            (now, now, now - lease_seconds)
+        )
+        conn.commit()
+        return cur.rowcount
+
+    def get(self, outbox_id):
+        row = get_db().execute("SELECT * FROM email_outbox WHERE outbox_id = ?", (outbox_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, status=None, limit=100):
+        if status:
+            rows = get_db().execute(
+                "SELECT * FROM email_outbox WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = get_db().execute("SELECT * FROM email_outbox ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def counts(self):
+        rows = get_db().execute("SELECT status, COUNT(*) AS n FROM email_outbox GROUP BY status").fetchall()
+        return {r['status']: r['n'] for r in rows}
+
+class OutboxDispatcher:
+    """Background thread that delivers due outbox emails through the pooled SMTP sender."""
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            reset = self.outbox.reset_stale()
+            if reset:
+                LOGGER.info(f"Outbox: re-queued {reset} email(s) interrupted by a restart")
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                sent_any = self.dispatch_once()
+            except Exception as e:
+                LOGGER.error(f"Outbox dispatch error: {e}")
+                sent_any = False
+            if not sent_any:
+                self._wake.wait(OUTBOX_POLL_INTERVAL)
+                self._wake.clear()
+
+    def dispatch_once(self):
+        """Sends one claimed batch; returns True if there was anything to send."""
+        rows = self.outbox.claim()
+        if not rows:
+            return False
+        sender = get_email_sender()
+        futures = [(row, sender.submit(build_email_message(row['to_email'], row['subject'], row['body']))) for row in rows]
+        for row, future in futures:
+            result = future.result()
+            if result["success"]:
+                self.outbox.mark_sent(row['outbox_id'])
+            else:
+                LOGGER.warning(f"Outbox: sending to {row['to_email']} failed (attempt {row['attempts'] + 1}): {result['error']}")
+                self.outbox.mark_failed(row, result["error"], result.get("permanent", False))
         return True
+
+EMAIL_OUTBOX = EmailOutbox()
+OUTBOX_DISPATCHER = OutboxDispatcher(EMAIL_OUTBOX)
+
+def outbox_record(row):
+    """The outbox entry returned by the status endpoints."""
+    return {
+        "outbox_id": row["outbox_id"],
+        "to_email": row["to_email"],
+        "subject": row["subject"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "last_error": row["last_error"],
+        "next_attempt_at": row["next_attempt_at"] if row["status"] == "queued" else None,
+        "created_at": row["created_at"],
+        "sent_at": row["sent_at"],
+    }
+
+# ==================== GMAIL & RESUME PROCESSING LOGIC ====================
+def get_llm(model=None, temperature=None):
+    """Returns the shared Groq LLM instance for a model/temperature pair."""
+    try:
+        return LLM_CLIENTS.get(model or LLM_MODEL, LLM_TEMPERATURE if temperature is None else temperature)
     except Exception as e:
-        print(f"Email sending error: {e}")
-        return False
+        LOGGER.error(f"Failed to initialize LLM: {str(e)}")
+        return None
 
 def get_acceptance_email(candidate_name: str, job_title: str):
     """Generates the subject and body for an acceptance email."""
@@ -118,6 +1797,8 @@ HR Team
 """
     return subject, body
 
+EMAIL_TEMPLATES = {"accept": get_acceptance_email, "reject": get_rejection_email}
+
 def parse_email_from_sender(sender: str) -> str:
     """Extracts just the email address from a sender string."""
     if not sender:
@@ -153,108 +1834,634 @@ def get_timestamp_days_ago(days):
 
 def is_resume_file(filename, subject):
     """Checks if a file and subject match resume criteria."""
-    name = (filename or "").lower()
-    subject = (subject or "").lower()
-    is_subject_ok = any(kw in subject for kw in RESUME_KEYWORDS)
-    is_filename_ok = any(kw in name for kw in RESUME_KEYWORDS)
-    is_excluded = any(kw in name for kw in EXCLUDE_KEYWORDS)
+    is_subject_ok = RESUME_KEYWORD_MATCHER.search(subject)
+    is_filename_ok = RESUME_KEYWORD_MATCHER.search(filename)
+    is_excluded = EXCLUDE_KEYWORD_MATCHER.search(filename)
     return (is_subject_ok or is_filename_ok) and not is_excluded
 
 def is_valid_sender(sender):
     """Checks if a sender is valid (not a noreply address)."""
-    sender_lower = sender.lower()
-    return not any(exclude in sender_lower for exclude in EXCLUDE_SENDERS)
+    return not EXCLUDE_SENDER_MATCHER.search(sender)
+
+_GMAIL_DISCOVERY_DOC = None
+_GMAIL_SERVICES = threading.local()  # googleapiclient services are not thread-safe, so cache per thread
+GMAIL_SERVICE_CACHE_SIZE = 32
+
+def gmail_discovery_document():
+    """The Gmail discovery document, parsed once per process (None if the library has no bundled copy)."""
+    global _GMAIL_DISCOVERY_DOC
+    if _GMAIL_DISCOVERY_DOC is None:
+        from googleapiclient import discovery_cache
+        doc = discovery_cache.get_static_doc('gmail', 'v1')
+        _GMAIL_DISCOVERY_DOC = json.loads(doc) if doc else False
+    return _GMAIL_DISCOVERY_DOC or None
+
+def build_gmail_service(creds):
+    """Gmail API client for the given credentials, reused per credential within a thread.
+
+    Each request rebuilds Credentials from the session, so the cache is keyed
+    by the access token (and client id), not the object: an equal credential
+    reuses the client, while a refreshed token gets a fresh one.
+    """
+    from googleapiclient.discovery import build, build_from_document
+    key = (getattr(creds, "client_id", None), getattr(creds, "token", None))
+    cache = getattr(_GMAIL_SERVICES, "services", None)
+    if cache is None:
+        cache = _GMAIL_SERVICES.services = OrderedDict()
+    service = cache.get(key) if key[1] else None
+    if service is not None:
+        cache.move_to_end(key)
+        return service
+
+    doc = gmail_discovery_document()
+    service = build_from_document(doc, credentials=creds) if doc else build('gmail', 'v1', credentials=creds)
+    if key[1]:
+        cache[key] = service
+        while len(cache) > GMAIL_SERVICE_CACHE_SIZE:
+            cache.popitem(last=False)
+    return service
+
+def list_message_ids(gmail_service, query, limit):
+    """Lists up to `limit` message ids matching a query, following nextPageToken."""
+    message_ids = []
+    page_token = None
+    while len(message_ids) < limit:
+        params = {'userId': 'me', 'q': query, 'maxResults': min(GMAIL_LIST_PAGE_SIZE, limit - len(message_ids))}
+        if page_token:
+            params['pageToken'] = page_token
+        results = gmail_service.users().messages().list(**params).execute()
+        message_ids.extend(m['id'] for m in results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return message_ids[:limit]
+
+def _part_fields(depth):
+    fields = "partId,filename,mimeType,body(attachmentId,size)"
+    return fields if depth == 0 else f"{fields},parts({_part_fields(depth - 1)})"
+
+# Part tree only: no headers and no inline body data, so text/HTML bodies are never transferred
+GMAIL_PART_FIELDS = f"id,payload({_part_fields(GMAIL_PART_DEPTH)})"
+
+def batch_get_messages(gmail_service, message_ids, batch_size=None, format='full', fields=None, metadata_headers=None):
+    """Fetches messages with batch HTTP requests, in listing order.
+
+    Use format='metadata' with `metadata_headers` for headers only, or
+    format='full' with `fields` to restrict the response to what is needed.
+    """
+    batch_size = batch_size or GMAIL_BATCH_SIZE
+    fetched = {}
+
+    def _on_response(request_id, response, exception):
+        if exception is not None:
+            LOGGER.warning(f"Skipping message {request_id} due to error: {str(exception)}")
+            return
+        fetched[request_id] = response
+
+    params = {'userId': 'me', 'format': format}
+    if fields:
+        params['fields'] = fields
+    if metadata_headers:
+        params['metadataHeaders'] = metadata_headers
+    for start in range(0, len(message_ids), batch_size):
+        batch = gmail_service.new_batch_http_request(callback=_on_response)
+        for msg_id in message_ids[start:start + batch_size]:
+            batch.add(gmail_service.users().messages().get(id=msg_id, **params), request_id=msg_id)
+        batch.execute()
+    # Keep the listing order (newest first) so sender de-duplication stays stable
+    return [fetched[msg_id] for msg_id in message_ids if msg_id in fetched]
+
+def get_header(payload, name):
+    """Returns a header value from a Gmail message payload."""
+    for header in payload.get('headers', []):
+        if header.get('name', '').lower() == name.lower():
+            return header.get('value', '')
+    return ''
 
-def download_resumes_from_gmail(creds, days_filter=30):
-    """Downloads resumes from Gmail as PDF attachments."""
+def iter_message_parts(payload):
+    """Yields every MIME part of a Gmail message payload, depth first."""
+    yield payload
+    for part in payload.get('parts', []) or []:
+        yield from iter_message_parts(part)
+
+def open_attachment_session(creds, gmail_service):
+    """An authorised requests session for streaming attachment bodies, or None.
+
+    Streaming needs real credentials and the real API client; stand-in
+    services (tests, benchmarks) use the client-library path instead.
+    """
+    from googleapiclient.discovery import Resource
+    if GMAIL_STREAM_ATTACHMENTS and creds is not None and isinstance(gmail_service, Resource):
+        from google.auth.transport.requests import AuthorizedSession
+        return AuthorizedSession(creds)
+    return None
+
+def _text_chunks(text, size=ATTACHMENT_CHUNK_SIZE):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+
+def iter_json_string_field(text_chunks, field):
+    """Yields the value of a top-level JSON string field piece by piece from streamed JSON text.
+
+    JSON escapes in the value are decoded, including ones split across chunks.
+    """
+    marker = f'"{field}"'
+    chunks = iter(text_chunks)
+    buffer = ""
+    # Skip ahead to the opening quote of the value
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        buffer += chunk
+        start = buffer.find(marker)
+        if start == -1:
+            buffer = buffer[-len(marker):]
+            continue
+        quote = buffer.find('"', start + len(marker))
+        if quote != -1:
+            buffer = buffer[quote + 1:]
+            break
+    # Then pass the value through until its closing quote, holding back an escape cut off by the chunk end
+    while buffer is not None:
+        out = []
+        while True:
+            special = _JSON_STRING_SPECIAL.search(buffer)
+            if special is None:
+                out.append(buffer)
+                buffer = ""
+                break
+            out.append(buffer[:special.start()])
+            if special.group() == '"':
+                yield "".join(out)
+                return
+            escape_len = 6 if buffer[special.start() + 1:special.start() + 2] == "u" else 2
+            escape = buffer[special.start():special.start() + escape_len]
+            if len(escape) < escape_len:
+                buffer = buffer[special.start():]
+                break
+            out.append(json.loads(f'"{escape}"'))
+            buffer = buffer[special.start() + escape_len:]
+        text = "".join(out)
+        if text:
+            yield text
+        chunk = next(chunks, None)
+        buffer = None if chunk is None else buffer + chunk
+
+def decode_base64url_stream(text_chunks):
+    """Decodes base64url text arriving in arbitrary pieces, yielding bytes as soon as whole quanta are in."""
+    pending = ""
+    for chunk in text_chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            yield base64.urlsafe_b64decode(pending[:usable])
+            pending = pending[usable:]
+    if pending:
+        yield base64.urlsafe_b64decode(pending + "=" * (-len(pending) % 4))
+
+def iter_attachment_chunks(gmail_service, message_id, part, http_session=None):
+    """Yields the bytes of one attachment part in bounded chunks.
+
+    With `http_session` the base64 body is streamed from the API and
+    decoded as it arrives, so memory stays bounded whatever the file size;
+    otherwise the client library returns it in one response, which is then
+    decoded piece by piece.
+    """
+    body = part.get('body', {})
+    if body.get('data'):
+        yield from decode_base64url_stream(_text_chunks(body['data']))
+        return
+    if http_session is None:
+        attachment = gmail_service.users().messages().attachments().get(
+            userId='me',
+            messageId=message_id,
+            id=body['attachmentId']
+        ).execute()
+        yield from decode_base64url_stream(_text_chunks(attachment.get('data', '')))
+        return
+    url = f"{GMAIL_API_ROOT}/messages/{message_id}/attachments/{body['attachmentId']}"
+    with http_session.get(url, params={'fields': 'data'}, stream=True, timeout=GMAIL_HTTP_TIMEOUT) as response:
+        response.raise_for_status()
+        text = (chunk.decode('ascii') for chunk in response.iter_content(ATTACHMENT_CHUNK_SIZE))
+        yield from decode_base64url_stream(iter_json_string_field(text, 'data'))
+
+# ==================== INCREMENTAL GMAIL SYNC ====================
+def get_sync_state(account):
+    """Returns the last synced historyId for an account, or None."""
+    row = get_db().execute("SELECT history_id FROM gmail_sync_state WHERE account = ?", (account,)).fetchone()
+    return row['history_id'] if row else None
+
+def save_sync_state(account, history_id):
+    conn = get_db()
+    conn.execute(
+        "INSERT OR REPLACE INTO gmail_sync_state (account, history_id, updated_at) VALUES (?, ?, ?)",
+        (account, str(history_id), time.time())
+    )
+    conn.commit()
+
+def filter_unprocessed(account, message_ids):
+    """Drops message ids already processed for this account, keeping order."""
+    if not message_ids:
+        return []
+    conn = get_db()
+    processed = set()
+    for start in range(0, len(message_ids), 500):  # stay under SQLite's bound parameter limit
+        chunk = message_ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        processed.update(r['message_id'] for r in conn.execute(
+            f"SELECT message_id FROM gmail_processed_messages WHERE account = ? AND message_id IN ({placeholders})",
+            [account, *chunk]
+        ).fetchall())
+    return [msg_id for msg_id in message_ids if msg_id not in processed]
+
+def mark_processed(account, message_ids):
+    """Records messages as done and removes them from the pending queue."""
+    conn = get_db()
+    now = time.time()
+    conn.executemany(
+        "INSERT OR IGNORE INTO gmail_processed_messages (account, message_id, processed_at) VALUES (?, ?, ?)",
+        [(account, msg_id, now) for msg_id in message_ids]
+    )
+    conn.executemany(
+        "DELETE FROM gmail_pending_messages WHERE account = ? AND message_id = ?",
+        [(account, msg_id) for msg_id in message_ids]
+    )
+    conn.commit()
+
+def queue_pending(account, message_ids):
+    """Adds message ids to the account's pending queue (already queued ids keep their place)."""
+    conn = get_db()
+    now = time.time()
+    conn.executemany(
+        "INSERT OR IGNORE INTO gmail_pending_messages (account, message_id, queued_at) VALUES (?, ?, ?)",
+        [(account, msg_id, now) for msg_id in message_ids]
+    )
+    conn.commit()
+
+def next_pending(account, limit):
+    """The oldest `limit` queued message ids for an account."""
+    rows = get_db().execute(
+        "SELECT message_id FROM gmail_pending_messages WHERE account = ? ORDER BY rowid LIMIT ?", (account, limit)
+    ).fetchall()
+    return [r['message_id'] for r in rows]
+
+def list_history_message_ids(gmail_service, start_history_id):
+    """Lists messages added since `start_history_id`, newest first.
+
+    Returns (message_ids, latest_history_id). Raises HttpError 404 when the
+    start id is too old for Gmail to serve history from.
+    """
+    message_ids = []
+    latest_history_id = start_history_id
+    page_token = None
+    while True:
+        params = {'userId': 'me', 'startHistoryId': start_history_id, 'historyTypes': 'messageAdded'}
+        if page_token:
+            params['pageToken'] = page_token
+        results = gmail_service.users().history().list(**params).execute()
+        for record in results.get('history', []):
+            for added in record.get('messagesAdded', []):
+                message = added.get('message', {})
+                if GMAIL_SKIP_LABELS.intersection(message.get('labelIds', [])):
+                    continue
+                message_ids.append(message['id'])
+        latest_history_id = results.get('historyId', latest_history_id)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return list(reversed(list(dict.fromkeys(message_ids)))), latest_history_id
+
+def list_message_ids_incremental(gmail_service, query, limit):
+    """Lists unprocessed message ids using Gmail history since the last sync.
+
+    The first run (or one whose history has expired) lists the full query
+    window instead. Every unprocessed id is queued before the history id
+    is advanced, and each run takes the oldest `limit` from the queue, so
+    mail beyond `limit` waits for the next run instead of being skipped.
+    Ids stay queued until mark_processed, so failed messages are retried.
+    Returns (account, message_ids, history_id_to_save).
+    """
+    from googleapiclient.errors import HttpError
+    profile = gmail_service.users().getProfile(userId='me').execute()
+    account = profile['emailAddress']
+    start_history_id = get_sync_state(account)
+    message_ids = None
+    history_id = profile['historyId']
+    if start_history_id:
+        try:
+            message_ids, history_id = list_history_message_ids(gmail_service, start_history_id)
+        except HttpError as e:
+            if getattr(e, 'resp', None) is None or e.resp.status != 404:
+                raise
+            LOGGER.info(f"Gmail history {start_history_id} expired for {account}, running a full sync")
+    if message_ids is None:
+        message_ids = list_message_ids(gmail_service, query, GMAIL_FULL_SYNC_MAX_MESSAGES)
+    queue_pending(account, filter_unprocessed(account, message_ids))
+    return account, next_pending(account, limit), history_id
+
+# ==================== RESUME DOWNLOAD & PROCESSING ====================
+def download_resumes_from_gmail(creds, days_filter=30, max_messages=None, service_factory=None, incremental=False):
+    """Downloads resumes from Gmail as PDF attachments.
+
+    Senders are filtered on From/Subject headers (format='metadata') first;
+    only the surviving messages have their part structure fetched, and only
+    matching PDF parts under ATTACHMENT_MAX_BYTES are streamed into the
+    attachment store by a bounded pool of worker threads. All fetches use
+    batch requests. Attachments stored by an earlier run are screened again
+    from the store without being downloaded; identical bytes are returned
+    once. With `incremental`, only mail added since the previous sync is
+    examined.
+    """
+    from googleapiclient.errors import HttpError
+    max_messages = MAX_RESUME_MESSAGES if max_messages is None else max_messages
+    service_factory = service_factory or (lambda: build_gmail_service(creds))
     try:
-        gmail_service = build('gmail', 'v1', credentials=creds)
+        gmail_service = service_factory()
         timestamp = get_timestamp_days_ago(days_filter)
         query = f'has:attachment filename:pdf after:{timestamp}'
-        results = gmail_service.users().messages().list(userId='me', q=query).execute()
-        messages = results.get('messages', [])
-        downloaded_files = []
+        with span("gmail.list") as attrs:
+            if incremental:
+                account, message_ids, history_id = list_message_ids_incremental(gmail_service, query, max_messages)
+            else:
+                message_ids = list_message_ids(gmail_service, query, max_messages)
+            attrs["messages"] = len(message_ids)
+        with span("gmail.fetch_metadata"):
+            headers = batch_get_messages(gmail_service, message_ids, format='metadata', metadata_headers=['From', 'Subject'])
         processed_senders = set()
-        os.makedirs(TEMPORARY_FOLDER, exist_ok=True)
-        
-        for msg in messages[:20]:
-            try:
-                msg_data = gmail_service.users().messages().get(
-                    userId='me', 
-                    id=msg['id'], 
-                    format='raw'
-                ).execute()
-                raw_msg = msg_data.get('raw')
-                if not raw_msg:
-                    continue
-                if isinstance(raw_msg, str):
-                    raw_msg = raw_msg.encode('ASCII')
-                
-                raw_msg = base64.urlsafe_b64decode(raw_msg)
-                mime_msg = email.message_from_bytes(raw_msg, policy=email.policy.default)
-                
-                sender = mime_msg.get('From', '').lower()
-                subject = mime_msg.get('Subject', '(No Subject)')
+        ATTACHMENT_STORE.evict()
 
+        # Messages whose fetch or download failed are left unmarked, so incremental sync retries them
+        failed_ids = set(message_ids) - {msg['id'] for msg in headers}
+        senders = {}
+        with span("gmail.filter_senders"):
+            for msg in headers:
+                payload = msg.get('payload', {})
+                sender = get_header(payload, 'From').lower()
                 if not is_valid_sender(sender) or sender in processed_senders:
                     continue
                 processed_senders.add(sender)
-                
-                for part in mime_msg.walk():
-                    filename = part.get_filename()
+                senders[msg['id']] = (sender, get_header(payload, 'Subject') or '(No Subject)')
+
+        with span("gmail.fetch_structure", messages=len(senders)):
+            structures = batch_get_messages(gmail_service, list(senders), fields=GMAIL_PART_FIELDS)
+        failed_ids.update(set(senders) - {msg['id'] for msg in structures})
+
+        pending, stored = [], []
+        with span("gmail.filter_parts"):
+            for msg in structures:
+                sender, subject = senders[msg['id']]
+                for part in iter_message_parts(msg.get('payload', {})):
+                    filename = part.get('filename')
                     if filename and filename.lower().endswith('.pdf'):
                         if is_resume_file(filename, subject):
-                            file_data = part.get_payload(decode=True)
-                            sender_hash = hash(sender) % 10000
-                            safe_filename = f"{sender_hash}_{filename}"
-                            filepath = os.path.join(TEMPORARY_FOLDER, safe_filename)
-                            if os.path.exists(filepath):
+                            meta = {'sender': sender, 'subject': subject, 'original_filename': filename}
+                            # Stored by an earlier run: screen it again without re-downloading
+                            sha256 = ATTACHMENT_STORE.lookup(msg['id'], filename)
+                            if sha256 and ATTACHMENT_STORE.exists(sha256):
+                                stored.append(dict(meta, sha256=sha256, message_id=msg['id']))
                                 continue
-                            with open(filepath, 'wb') as f:
-                                f.write(file_data)
-                            downloaded_files.append({
-                                'filepath': filepath, 
-                                'sender': sender, 
-                                'subject': subject,
-                                'original_filename': filename
-                            })
-                            
-            except Exception as e:
-                print(f"Skipping message due to error: {str(e)}")
-                continue
-        return downloaded_files
+                            size = part.get('body', {}).get('size', 0)
+                            if size > ATTACHMENT_MAX_BYTES:
+                                LOGGER.info(f"Skipping {filename} from {sender}: {size} bytes exceeds the attachment limit")
+                                continue
+                            pending.append((msg['id'], part, meta))
+
+        # googleapiclient services and HTTP sessions are not thread-safe, so each worker builds its own
+        local = threading.local()
+
+        def _download(message_id, part, meta):
+            if not hasattr(local, 'service'):
+                local.service = service_factory()
+                local.http_session = open_attachment_session(creds, local.service)
+            with span("gmail.attachment"):
+                sha256, _ = ATTACHMENT_STORE.put_stream(
+                    iter_attachment_chunks(local.service, message_id, part, local.http_session),
+                    message_id,
+                    meta['original_filename'],
+                    meta['sender'],
+                    meta['subject'],
+                    max_bytes=ATTACHMENT_MAX_BYTES
+                )
+            return dict(meta, sha256=sha256, message_id=message_id)
+
+        downloaded_files = []
+        with ThreadPoolExecutor(max_workers=GMAIL_DOWNLOAD_WORKERS, thread_name_prefix="gmail-download") as pool:
+            futures = [(item[0], submit_in_context(pool, _download, *item)) for item in pending]
+            for message_id, future in futures:
+                try:
+                    downloaded_files.append(future.result())
+                except Exception as e:
+                    LOGGER.warning(f"Skipping attachment due to error: {str(e)}")
+                    failed_ids.add(message_id)
+
+        # The same bytes mailed twice are screened once; the digest never decides whether to screen
+        resumes, seen = [], set()
+        for meta in stored + downloaded_files:
+            if meta['sha256'] not in seen:
+                seen.add(meta['sha256'])
+                resumes.append(meta)
+
+        if incremental:
+            mark_processed(account, [msg_id for msg_id in message_ids if msg_id not in failed_ids])
+            save_sync_state(account, history_id)
+        METRICS.inc("hr_resumes_downloaded_total", len(downloaded_files))
+        return resumes
     except HttpError as e:
-        print(f"Google API error: {str(e)}")
+        LOGGER.error(f"Google API error: {str(e)}")
         return []
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        LOGGER.error(f"Unexpected error: {str(e)}")
         return []
 
-def extract_text_from_pdf(pdf_path):
-    """Extracts text from a PDF file using PyMuPDF."""
+def extract_text_from_pdf(pdf, max_pages=None):
+    """Extracts text from the first `max_pages` pages of a PDF (file path or bytes) using PyMuPDF."""
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    in_memory = isinstance(pdf, (bytes, bytearray, memoryview))
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        # In-memory blobs go straight to PyMuPDF, without a temp file
+        with (fitz.open(stream=pdf, filetype="pdf") if in_memory else fitz.open(pdf)) as doc:
+            return "".join(doc[i].get_text() for i in range(min(max_pages, doc.page_count)))
     except Exception as e:
-        print(f"Error reading PDF {pdf_path}: {str(e)}")
+        LOGGER.warning(f"Error reading PDF {f'<{len(pdf)} bytes>' if in_memory else pdf}: {str(e)}")
         return ""
 
+def file_sha256(path):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+TEXT_CACHE_NAME = re.compile(r"^[0-9a-f]{64}-p\d+\.txt$")
+TEXT_CACHE_TMP_MAX_AGE = 3600  # seconds before an abandoned .tmp file is removed
+
+def _text_cache_path(digest, max_pages):
+    return os.path.join(TEXT_CACHE_FOLDER, f"{digest}-p{max_pages}.txt")
+
+def read_cached_text(digest, max_pages):
+    """Returns previously extracted text for a file hash, or None."""
+    try:
+        with open(_text_cache_path(digest, max_pages), encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write_cached_text(digest, max_pages, text):
+    """Stores extracted text in the sidecar cache (atomically, so readers never see partial files).
+
+    The cache is an optimisation: if it cannot be written (read-only or full disk) the text is
+    simply extracted again next time.
+    """
+    path = _text_cache_path(digest, max_pages)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(TEXT_CACHE_FOLDER, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        LOGGER.warning(f"Could not write text cache for {digest}: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def trim_text_cache(max_bytes=None):
+    """Deletes the oldest cached texts until the cache is under TEXT_CACHE_MAX_BYTES.
+
+    Only <sha256>-p<pages>.txt files (and abandoned .tmp files) are touched. Returns the number deleted.
+    """
+    max_bytes = TEXT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+    entries = []
+    try:
+        names = os.listdir(TEXT_CACHE_FOLDER)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(TEXT_CACHE_FOLDER, name)
+        try:
+            stat = os.stat(path)
+            if name.endswith(".tmp"):
+                if now - stat.st_mtime > TEXT_CACHE_TMP_MAX_AGE:
+                    os.remove(path)
+            elif TEXT_CACHE_NAME.match(name):
+                entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            continue
+    size = sum(entry[1] for entry in entries)
+    deleted = 0
+    for _, file_size, path in sorted(entries):
+        if size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        size -= file_size
+        deleted += 1
+    return deleted
+
+def extract_texts_parallel(pdf_paths, max_pages=None, max_workers=None):
+    """Extracts text from many PDFs, using the sidecar cache and a process pool for cache misses.
+
+    Returns {path: text}. Falls back to in-process extraction where process
+    pools are unavailable (e.g. serverless runtimes without /dev/shm).
+    """
+    misses = defaultdict(list)  # digest -> paths; byte-identical files are extracted once
+    for path in dict.fromkeys(pdf_paths):
+        try:
+            misses[file_sha256(path)].append(path)
+        except OSError as e:
+            LOGGER.warning(f"Error reading PDF {path}: {str(e)}")
+    by_digest = _extract_by_digest({digest: lambda paths=paths: paths[0] for digest, paths in misses.items()},
+                                   max_pages, max_workers)
+    return {path: by_digest[digest] for digest, paths in misses.items() for path in paths}
+
+def extract_attachment_texts(sha256s, max_pages=None, max_workers=None):
+    """Extracts text from stored attachments by hash. Returns {sha256: text}.
+
+    The blob hash doubles as the text cache key, so cache hits never touch
+    the blob; misses are handed to PyMuPDF as a path (disk) or bytes (memory).
+    """
+    return _extract_by_digest({sha256: lambda sha256=sha256: ATTACHMENT_STORE.source(sha256)
+                               for sha256 in dict.fromkeys(sha256s)}, max_pages, max_workers)
+
+_EXTRACT_POOL = None
+_EXTRACT_POOL_WORKERS = 0
+_EXTRACT_POOL_LOCK = threading.Lock()
+
+def get_extract_pool(max_workers):
+    """The long-lived PDF extraction process pool, (re)created when the worker count changes.
+
+    Workers are spawned, not forked: this process runs many threads, and a forked child
+    can inherit a lock some other thread was holding and deadlock.
+    """
+    global _EXTRACT_POOL, _EXTRACT_POOL_WORKERS
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is not None and _EXTRACT_POOL_WORKERS != max_workers:
+            _EXTRACT_POOL.shutdown(wait=False)
+            _EXTRACT_POOL = None
+        if _EXTRACT_POOL is None:
+            _EXTRACT_POOL = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+            _EXTRACT_POOL_WORKERS = max_workers
+        return _EXTRACT_POOL
+
+def reset_extract_pool():
+    """Drops a broken pool so the next call starts a fresh one."""
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        pool, _EXTRACT_POOL = _EXTRACT_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+def _extract_by_digest(sources, max_pages=None, max_workers=None):
+    """Text for {digest: source loader}, via the sidecar cache and a process pool for misses."""
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_workers = max_workers or PDF_EXTRACT_WORKERS
+    texts = {}
+    pending = []
+    for digest, load in sources.items():
+        cached = read_cached_text(digest, max_pages)
+        if cached is not None:
+            texts[digest] = cached
+            continue
+        source = load()
+        if source is None:
+            LOGGER.warning(f"Attachment {digest} is no longer stored")
+            texts[digest] = ""
+        else:
+            pending.append((digest, source))
+
+    extracted = None
+    if len(pending) > 1 and max_workers > 1:
+        try:
+            extracted = list(get_extract_pool(max_workers).map(
+                extract_text_from_pdf, [source for _, source in pending], [max_pages] * len(pending)))
+        except (OSError, NotImplementedError, RuntimeError) as e:  # BrokenProcessPool is a RuntimeError
+            LOGGER.warning(f"Process pool unavailable, extracting in-process: {str(e)}")
+            reset_extract_pool()
+    if extracted is None:
+        extracted = [extract_text_from_pdf(source, max_pages) for _, source in pending]
+
+    for (digest, _), text in zip(pending, extracted):
+        if text:
+            write_cached_text(digest, max_pages, text)
+        texts[digest] = text
+    return texts
+
 def clean_text(text):
     """Cleans up text by removing extra whitespace."""
     return re.sub(r'\s+', ' ', text).strip()
 
-def keyword_match(text):
-    """Matches keywords in text against predefined domains."""
-    matches = defaultdict(list)
-    lower_text = text.lower()
-    for domain, words in KEYWORDS.items():
-        for kw in words:
-            if kw.lower() in lower_text:
-                matches[domain].append(kw)
-    return dict(matches)
+def keyword_match(text, matcher=None):
+    """Matches keywords in text against predefined (or user-supplied) domains."""
+    return (matcher or KEYWORD_MATCHER).match_groups(text)
 
 def extract_candidate_name(filepath):
     """Tries to extract a candidate name from a filename."""
@@ -285,73 +2492,604 @@ def extract_contact_info(text):
             break
     return email_val, phone
 
-def generate_candidate_profile_hr(job_description, resume_text, matched_keywords, name, email, phone):
-    """Generates an HR profile for a candidate using an LLM."""
-    prompt = f"""
-You are a senior HR analyst and technical recruiter. Your job is to analyze the resume evidence deeply and compare it with the job description, providing uniquely detailed, non-repetitive, and actionable HR insights. Use different evidence for each section and avoid repeating sentences or phrasing.
-Inputs:
-Job Description: {job_description}
-Resume Text: {resume_text}
-Matched Keywords: {json.dumps(matched_keywords, indent=2)}
-Candidate Name: {name}
-Candidate Email: {email}
-Candidate Phone: {phone}
-
-Output Format (use explicit section headers):
-Basic Information:
-- Name: {name}
-- Email: {email}
-- Phone: {phone}
-- Total years of experience (estimate if not explicit)
-- Highest education (if available)
-- Most recent position and employer
+def generate_candidate_profile_hr(job_description, resume_text, matched_keywords, name, email, phone, model=None, temperature=None,
+                                  prompt_stats=None):
+    """Generates an HR profile for a candidate using an LLM."""
+    prompt, stats = build_profile_prompt(job_description, resume_text, matched_keywords, name, email, phone)
+    PROMPT_STATS.record(stats)
+    if prompt_stats is not None:
+        prompt_stats.record(stats)
+    llm = get_llm(model, temperature)
+    if not llm:
+        return "LLM initialization failed"
+    try:
+        return invoke_llm_with_backoff(llm, prompt)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            return "Failed to generate profile after multiple attempts"
+        return f"Error generating profile: {str(e)}"
+
+# ==================== PROMPT CONSTRUCTION ====================
+PROFILE_PROMPT_TEMPLATE = """You are a senior HR analyst and technical recruiter. Compare the resume evidence with the job description and give detailed, actionable, non-repetitive HR insights; use different evidence in each section.
+
+Job Description:
+{job_description}
+
+Resume (key sections):
+{resume_text}
+
+Matched Keywords: {matched_keywords}
+Candidate: {name} | {email} | {phone}
+
+Answer with exactly these section headers:
+Basic Information:
+- Name: {name}
+- Email: {email}
+- Phone: {phone}
+- Total years of experience (estimate if not explicit)
+- Highest education (if available)
+- Most recent position and employer
+
+Strengths & Weaknesses:
+2-3 strengths and 2-3 weaknesses, each with distinct resume evidence (skills, projects, impact, gaps, missing skills):
+- **Strength:** [evidence]
+- **Weakness:** [evidence]
+
+HR Summary & Justification:
+**HR Summary:** 4-6 lines covering domain expertise, technical proficiency, business acumen, teamwork, communication, project/role highlights and unique strengths.
+**Justification:** 4-5 lines citing project/role/skill evidence; cover positives, negatives, business value, culture fit and upskilling potential.
+
+Recommendation:
+- **Why Select This Candidate:** at least two unique strengths, 2-3 sentences.
+- **Why Not Select This Candidate:** at least two weaknesses or concerns, 2-3 sentences.
+- **Additional Future Potential:** roles or upskilling that would benefit candidate and company, with new evidence.
+
+ATS Evaluation JSON:
+[{{"name": "{name}", "ats_score": [0-100], "hr_score": [1-10]}}]
+
+JD-Based Interview Questions & Resume Match Evaluation:
+4-5 domain-specific questions from the JD. For each: [Match level: Clear / Partial / Not Evident] — [explanation citing a different project, skill or achievement].
+"""
+
+# Resume headings, in the order their content is kept when the token budget runs out
+RESUME_SECTION_PRIORITY = [
+    ("summary", ["summary", "profile", "professional summary", "career objective", "objective", "about me"]),
+    ("skills", ["skills", "technical skills", "key skills", "core competencies", "technologies", "tools", "expertise"]),
+    ("experience", ["experience", "work experience", "professional experience", "employment history",
+                    "work history", "internships", "internship"]),
+    ("projects", ["projects", "academic projects", "key projects", "personal projects"]),
+    ("education", ["education", "academic background", "qualifications", "educational qualification"]),
+    ("certifications", ["certifications", "certificates", "courses", "training"]),
+    ("achievements", ["achievements", "awards", "accomplishments", "publications"]),
+]
+# Sections that rarely help the evaluation and are dropped outright
+RESUME_SECTION_DROP = ["hobbies", "interests", "references", "declaration", "personal details",
+                       "personal information", "languages known", "extra curricular activities"]
+RESUME_BOILERPLATE = re.compile(
+    r"references? (are )?available (up)?on request|i hereby declare|curriculum vitae|^resume$|page \d+( of \d+)?$",
+    re.IGNORECASE
+)
+
+_HEADING_LOOKUP = {h: key for key, headings in RESUME_SECTION_PRIORITY for h in headings}
+_HEADING_LOOKUP.update({h: "drop" for h in RESUME_SECTION_DROP})
+
+_token_encoder = None
+_token_encoder_lock = threading.Lock()
+
+def get_token_encoder():
+    """The PROMPT_TOKENIZER tiktoken encoding, loaded once; False when not configured or unavailable."""
+    global _token_encoder
+    if _token_encoder is None:
+        with _token_encoder_lock:
+            if _token_encoder is None:
+                encoder = False
+                if PROMPT_TOKENIZER:
+                    try:
+                        import tiktoken
+                        encoder = tiktoken.get_encoding(PROMPT_TOKENIZER)
+                    except Exception as e:
+                        LOGGER.warning(f"Tokenizer {PROMPT_TOKENIZER!r} unavailable, estimating tokens from length: {str(e)}")
+                _token_encoder = encoder
+    return _token_encoder
+
+def count_tokens(text):
+    """Counts prompt tokens with the configured tokenizer, or estimates them from the length."""
+    encoder = get_token_encoder()
+    if encoder:
+        return len(encoder.encode(text or "", disallowed_special=()))
+    return estimate_tokens(text or "")
+
+def truncate_to_tokens(text, budget):
+    """Cuts text at a line (or word) boundary so it fits in `budget` tokens."""
+    if count_tokens(text) <= budget:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            words = line.split()
+            while words and used + count_tokens(" ".join(words)) + 1 > budget:
+                words = words[:max(0, len(words) * 3 // 4)]
+            if words:
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+def _heading_key(line):
+    candidate = re.sub(r"[^a-z &]", "", line.lower()).strip()
+    if not candidate or len(line) > 40:
+        return None
+    return _HEADING_LOOKUP.get(candidate)
+
+def split_resume_sections(raw_text):
+    """Splits resume text into {section: text} by common headings; text before any heading is 'header'."""
+    sections = defaultdict(list)
+    current = "header"
+    seen_lines = set()
+    for line in (raw_text or "").splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        key = _heading_key(line)
+        if key:
+            current = key
+            continue
+        normalised = line.lower()
+        if normalised in seen_lines or RESUME_BOILERPLATE.search(line):
+            continue
+        seen_lines.add(normalised)
+        sections[current].append(line)
+    return {key: "\n".join(lines) for key, lines in sections.items()}
+
+def compress_resume(raw_text, budget=None):
+    """Keeps the most useful resume sections (deduplicated, boilerplate removed) within a token budget."""
+    budget = PROMPT_RESUME_TOKEN_BUDGET if budget is None else budget
+    sections = split_resume_sections(raw_text)
+    parts, remaining = [], budget
+    for key in ["header"] + [key for key, _ in RESUME_SECTION_PRIORITY]:
+        text = sections.get(key)
+        if not text or remaining <= 0:
+            continue
+        block = truncate_to_tokens(text if key == "header" else f"{key.upper()}:\n{text}", remaining)
+        parts.append(block)
+        remaining -= count_tokens(block) + 1
+    return "\n".join(parts)
+
+def compress_job_description(job_description, budget=None):
+    """Drops repeated lines and trims the job description to its token budget."""
+    budget = PROMPT_JD_TOKEN_BUDGET if budget is None else budget
+    lines = [" ".join(line.split()) for line in (job_description or "").splitlines()]
+    return truncate_to_tokens("\n".join(dict.fromkeys(line for line in lines if line)), budget)
+
+class PromptStats:
+    """Counts prompt tokens before and after compression."""
+
+    def __init__(self):
+        self.prompts = 0
+        self.input_tokens_before = 0
+        self.input_tokens_after = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, stats):
+        with self._lock:
+            self.prompts += 1
+            self.input_tokens_before += stats["input_tokens_before"]
+            self.input_tokens_after += stats["input_tokens_after"]
+            self.prompt_tokens += stats["prompt_tokens"]
+
+    def snapshot(self):
+        with self._lock:
+            saved = self.input_tokens_before - self.input_tokens_after
+            return {
+                "prompts": self.prompts,
+                "input_tokens_before": self.input_tokens_before,
+                "input_tokens_after": self.input_tokens_after,
+                "tokens_saved": saved,
+                "saved_ratio": round(saved / self.input_tokens_before, 3) if self.input_tokens_before else 0.0,
+                "prompt_tokens": self.prompt_tokens,
+            }
+
+PROMPT_STATS = PromptStats()
+
+def build_profile_prompt(job_description, resume_text, matched_keywords, name, email, phone,
+                         template=None, fields=None):
+    """Builds a profile prompt within the per-candidate token budget.
+
+    `template` defaults to the section-header prompt; `fields` selects the
+    JSON keys described to structured templates. Returns (prompt, stats)
+    where stats compares the resume, job description and keyword inputs
+    before and after compression.
+    """
+    compact_resume = compress_resume(resume_text)
+    compact_jd = compress_job_description(job_description)
+    compact_keywords = json.dumps(matched_keywords, separators=(",", ":"))
+    prompt = (template or PROFILE_PROMPT_TEMPLATE).format(
+        job_description=compact_jd,
+        resume_text=compact_resume,
+        matched_keywords=compact_keywords,
+        name=name,
+        email=email,
+        phone=phone,
+        field_formats=render_field_formats(fields or PROFILE_SCHEMA)
+    )
+    stats = {
+        "input_tokens_before": (count_tokens(resume_text) + count_tokens(job_description)
+                                + count_tokens(json.dumps(matched_keywords, indent=2))),
+        "input_tokens_after": count_tokens(compact_resume) + count_tokens(compact_jd) + count_tokens(compact_keywords),
+        "prompt_tokens": count_tokens(prompt),
+    }
+    return prompt, stats
+
+BATCH_PROFILE_PROMPT_TEMPLATE = """You are a senior HR analyst and technical recruiter. Evaluate each candidate below against the same job description, on one consistent scale so the scores are comparable across candidates. Cite concrete, different resume evidence in every field and avoid repetition.
+
+Job Description:
+{job_description}
+
+{candidates}
+
+Return ONLY a JSON array with exactly one object per candidate, in the same order, each with these keys:
+"id": the candidate id (e.g. "C1"),
+{field_formats}
+"""
+
+BATCH_CANDIDATE_TEMPLATE = """Candidate {id}: {name} | {email} | {phone}
+Matched Keywords: {matched_keywords}
+Resume:
+{resume_text}
+"""
+
+def compact_resume_for_batch(candidate):
+    """Compressed resume text for batched prompts (computed once per candidate)."""
+    if "compact_resume" not in candidate:
+        candidate["compact_resume"] = compress_resume(
+            candidate.get("raw_text") or candidate["cleaned_text"], BATCH_RESUME_TOKEN_BUDGET
+        )
+    return candidate["compact_resume"]
+
+def pack_candidate_batches(candidates, batch_size, token_budget=None):
+    """Greedily packs candidates into batches of at most `batch_size` within the resume token budget."""
+    token_budget = BATCH_PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    batches, current, used = [], [], 0
+    for candidate in candidates:
+        cost = count_tokens(compact_resume_for_batch(candidate))
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(candidate)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def build_batch_profile_prompt(job_description, candidates):
+    """Builds one comparative prompt for several candidates; ids are C1..Cn in order.
+
+    Returns (prompt, stats) in the same form as build_profile_prompt.
+    """
+    compact_jd = compress_job_description(job_description)
+    blocks, before, after = [], count_tokens(job_description), count_tokens(compact_jd)
+    for i, candidate in enumerate(candidates, 1):
+        resume_text = candidate.get("raw_text") or candidate["cleaned_text"]
+        compact_resume = compact_resume_for_batch(candidate)
+        compact_keywords = json.dumps(candidate["matched_keywords"], separators=(",", ":"))
+        blocks.append(BATCH_CANDIDATE_TEMPLATE.format(
+            id=f"C{i}",
+            name=candidate["name"],
+            email=candidate["email"],
+            phone=candidate["phone"],
+            matched_keywords=compact_keywords,
+            resume_text=compact_resume
+        ))
+        before += count_tokens(resume_text) + count_tokens(json.dumps(candidate["matched_keywords"], indent=2))
+        after += count_tokens(compact_resume) + count_tokens(compact_keywords)
+    prompt = BATCH_PROFILE_PROMPT_TEMPLATE.format(
+        job_description=compact_jd,
+        candidates="\n".join(blocks),
+        field_formats=render_field_formats(PROFILE_SCHEMA)
+    )
+    return prompt, {"input_tokens_before": before, "input_tokens_after": after, "prompt_tokens": count_tokens(prompt)}
+
+def sections_from_profile_json(profile):
+    """Maps one structured profile onto the sections dict produced by build_candidate_sections."""
+    summary = str(profile.get("hr_summary") or "").strip()
+    justification = str(profile.get("justification") or "").strip()
+    ats_score = profile.get("ats_score")
+    hr_score = profile.get("hr_score")
+    return {
+        "basic_info": str(profile.get("basic_info") or "").strip(),
+        "strengths_weaknesses": str(profile.get("strengths_weaknesses") or "").strip(),
+        "hr_summary_justification": f"**HR Summary:** {summary}\n**Justification:** {justification}",
+        "recommendation": style_recommendation_subheadings(str(profile.get("recommendation") or "")),
+        "ats_json": json.dumps([{"name": profile.get("name", ""), "ats_score": ats_score, "hr_score": hr_score}]),
+        "interview_questions": str(profile.get("interview_questions") or "").strip(),
+        "hr_summary": summary,
+        "justification": justification,
+        "ats_score": ats_score,
+        "hr_score": hr_score,
+    }
+
+def generate_batch_profiles_hr(job_description, candidates, model=None, temperature=None, prompt_stats=None):
+    """Scores several candidates in one LLM request.
+
+    The JSON array is parsed while it streams in and each object is
+    validated; malformed fields are repaired per candidate. Returns
+    (profiles, raw_response) where profiles[i] is the result for
+    candidates[i], or None if the model left it out.
+    """
+    prompt, stats = build_batch_profile_prompt(job_description, candidates)
+    PROMPT_STATS.record(stats)
+    if prompt_stats is not None:
+        prompt_stats.record(stats)
+    llm = get_llm(model, temperature)
+    if not llm:
+        return [None] * len(candidates), ""
+    parser = StreamingJSONParser(depth=1)
+    try:
+        response = invoke_llm_with_backoff(
+            llm, prompt, output_tokens=LLM_OUTPUT_TOKENS_ESTIMATE * len(candidates), stream_parser=parser
+        )
+    except Exception as e:
+        LOGGER.warning(f"Batch profile generation failed: {str(e)}")
+        return [None] * len(candidates), ""
+    by_id = {str(p.get("id")): p for p in parser.values if isinstance(p, dict)}
+    profiles = []
+    for i, candidate in enumerate(candidates, 1):
+        profile = by_id.get(f"C{i}")
+        if profile is not None:
+            profile = repair_profile_fields(
+                llm, profile, validate_profile(profile), job_description, candidate, prompt_stats
+            )
+        profiles.append(profile)
+    return profiles, response
+
+# ==================== STRUCTURED OUTPUT ====================
+# Field -> str for text fields, (min, max) for integer scores
+PROFILE_SCHEMA = {
+    "basic_info": str,
+    "strengths_weaknesses": str,
+    "hr_summary": str,
+    "justification": str,
+    "recommendation": str,
+    "ats_score": (0, 100),
+    "hr_score": (1, 10),
+    "interview_questions": str,
+}
+
+PROFILE_FIELD_FORMATS = {
+    "basic_info": 'markdown lines "- Name: ...", "- Email: ...", "- Phone: ...", "- Total years of experience: ...", '
+                  '"- Highest education: ...", "- Most recent position and employer: ..."',
+    "strengths_weaknesses": '2-3 lines "- **Strength:** [evidence]" and 2-3 lines "- **Weakness:** [evidence]"',
+    "hr_summary": "4-6 lines on domain expertise, technical proficiency, business acumen, teamwork, communication "
+                  "and project highlights",
+    "justification": "4-5 lines citing project/role/skill evidence, positives and negatives, culture fit and "
+                     "upskilling potential",
+    "recommendation": '"**Why Select This Candidate:** ... **Why Not Select This Candidate:** ... '
+                      '**Additional Future Potential:** ..." (2-3 sentences each)',
+    "ats_score": "integer 0-100",
+    "hr_score": "integer 1-10",
+    "interview_questions": '4-5 JD-based questions as "1. [question] **Match level:** Clear / Partial / Not Evident '
+                           '**Explanation:** [resume evidence]", one per line',
+}
+
+STRUCTURED_PROFILE_PROMPT_TEMPLATE = """You are a senior HR analyst and technical recruiter. Compare the resume evidence with the job description and give detailed, actionable, non-repetitive HR insights; use different evidence in each field.
 
-Strengths & Weaknesses:
-List 2-3 unique strengths and 2-3 unique weaknesses, each with distinct evidence from the resume (skills, projects, impact, achievements, missing skills, gaps, etc). Use this format:
-- **Strength:** [evidence...]
-- **Weakness:** [evidence...]
+Job Description:
+{job_description}
 
-HR Summary & Justification:
-Write a comprehensive, non-repetitive analysis (at least 3-5 lines, with specific, concrete resume evidence in each sentence), combining HR summary and justification. Start with a sub-heading **HR Summary:** and then a sub-heading **Justification:**, and then write the corresponding content for each. The HR Summary must be at least 4-6 lines, and should mention: domain expertise, technical proficiency, business acumen, teamwork, communication, project/role highlights, and unique strengths. Do not repeat phrases or evidence. The Justification must be at least 4-5 lines and reference project/role/skill evidence from the resume. Each major point must reference different evidence from the resume. Highlight both positive and negative aspects, and address business value, culture fit, and any observable upskilling or future potential.
+Resume (key sections):
+{resume_text}
 
-Recommendation:
-Provide a decisive recommendation in three clearly marked sections (each at least 2-3 sentences, all using different language/evidence than above):
-- **Why Select This Candidate:** Reference at least two unique strengths from the resume.
-- **Why Not Select This Candidate:** Reference at least two unique weaknesses or potential concerns from the resume.
-- **Additional Future Potential:** Discuss what roles or upskilling would benefit this candidate and the company, referencing new evidence from the resume.
+Matched Keywords: {matched_keywords}
+Candidate: {name} | {email} | {phone}
 
-ATS Evaluation JSON:
-A valid JSON array with 1 object in this format:
-[
-  {{
-    "name": "{name}",
-    "ats_score": [0-100],
-    "hr_score": [1-10]
-  }}
-]
+Return ONLY one JSON object with these keys:
+{field_formats}
+"""
 
-JD-Based Interview Questions & Resume Match Evaluation:
-Generate 4-5 highly relevant, domain-specific interview questions based on the JD. For each, rate the resume's match: [Match level: Clear / Partial / Not Evident] — [Explanation, referencing a different project, skill, or achievement from the resume for each question.]
+REPAIR_PROMPT_TEMPLATE = """Some fields of a candidate evaluation were missing or malformed. Using the job description and resume below, return ONLY a JSON object with these keys:
+{field_formats}
+
+Job Description:
+{job_description}
 
-Your output must have these sections clearly separated, each detailed and actionable, with minimal repetition.
+Resume (key sections):
+{resume_text}
+
+Candidate: {name} | {email} | {phone}
 """
-    llm = get_llm()
-    if not llm:
-        return "LLM initialization failed"
-    max_retries = 3
-    for attempt in range(max_retries):
+
+def render_field_formats(fields):
+    return ",\n".join(f'"{field}": {PROFILE_FIELD_FORMATS[field]}' for field in fields)
+
+class StreamingJSONParser:
+    """Single-pass, incremental extractor of JSON objects from LLM output.
+
+    Text is fed chunk by chunk as it streams in. Every object at `depth`
+    (0: the top-level object, 1: objects inside a top-level array) is
+    decoded as soon as its closing brace arrives. Prose and code fences
+    around the JSON are skipped, including brackets or braces in the prose:
+    a top-level container only counts once its first significant character
+    looks like JSON (a key after '{', an object after '['). Parsing stops
+    after the first top-level container that yielded an object. Objects
+    that fail to decode are counted in `errors`.
+    """
+
+    _decoder = json.JSONDecoder(strict=False)  # LLMs often put raw newlines inside strings
+
+    def __init__(self, depth=0):
+        self._requested_depth = depth
+        self.reset()
+
+    def reset(self):
+        self.target_depth = self._requested_depth
+        self.values = []
+        self.errors = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._capture = None
+        self._opener = None  # top-level '{' or '[' whose first significant character is still unseen
+        self._done = False
+
+    def feed(self, chunk):
+        for ch in chunk or "":
+            if self._done:
+                return
+            self._feed_char(ch)
+
+    def _abandon(self):
+        """The top-level bracket was prose, not JSON: forget it and keep scanning."""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._capture = None
+        self._opener = None
+        self.target_depth = self._requested_depth
+
+    def _feed_char(self, ch):
+        if self._opener is not None and not ch.isspace():
+            opener, self._opener = self._opener, None
+            if ch not in ('"}' if opener == "{" else "{]"):
+                self._abandon()
+                return self._feed_char(ch)
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+        elif self._depth == 0:
+            # Only an object, or (in array mode) an array, can start the JSON
+            if ch != "{" and not (ch == "[" and self.target_depth == 1):
+                return
+            if ch == "{" and self.target_depth == 1:
+                # Maybe a lone object where an array was asked for; _abandon restores array mode
+                # if the brace turns out to be prose
+                self.target_depth = 0
+            if self.target_depth == 0:
+                self._capture = []
+            self._opener = ch
+            self._depth = 1
+        elif ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            if self._depth == self.target_depth and ch == "{":
+                self._capture = []
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+        if self._capture is not None:
+            self._capture.append(ch)
+            if self._depth == self.target_depth and ch == "}":
+                self._emit("".join(self._capture))
+                self._capture = None
+        if self._depth == 0 and ch in "}]" and not self._in_string and (self.values or self.errors):
+            self._done = True
+
+    def _emit(self, text):
         try:
-            response = llm.invoke(prompt)
-            return response.content
-        except Exception as e:
-            if "rate_limit" in str(e).lower() or "429" in str(e):
-                wait_time = (attempt + 1) * 5
-                print(f"Rate limit reached. Waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
+            self.values.append(self._decoder.decode(text))
+        except ValueError:
+            self.errors += 1
+
+def validate_profile(profile):
+    """Coerces scores to integers and returns the names of missing or malformed fields."""
+    invalid = []
+    for field, rule in PROFILE_SCHEMA.items():
+        value = profile.get(field)
+        if isinstance(rule, tuple):
+            try:
+                value = int(round(float(value)))
+            except (TypeError, ValueError):
+                invalid.append(field)
                 continue
-            else:
-                return f"Error generating profile: {str(e)}"
-    return "Failed to generate profile after multiple attempts"
+            if not rule[0] <= value <= rule[1]:
+                invalid.append(field)
+                continue
+            profile[field] = value
+        elif isinstance(value, list) and value:
+            profile[field] = "\n".join(str(v) for v in value)
+        elif not isinstance(value, str) or not value.strip():
+            invalid.append(field)
+    return invalid
+
+def repair_profile_fields(llm, profile, invalid_fields, job_description, candidate, prompt_stats=None):
+    """Re-asks the model for the invalid fields only and merges the answers into the profile.
+
+    Returns the profile, or None if it is still invalid after the repair attempts.
+    """
+    for _ in range(STRUCTURED_REPAIR_ATTEMPTS):
+        if not invalid_fields:
+            return profile
+        prompt, stats = build_profile_prompt(
+            job_description,
+            candidate.get("raw_text") or candidate["cleaned_text"],
+            candidate["matched_keywords"],
+            candidate["name"],
+            candidate["email"],
+            candidate["phone"],
+            template=REPAIR_PROMPT_TEMPLATE,
+            fields=invalid_fields
+        )
+        PROMPT_STATS.record(stats)
+        if prompt_stats is not None:
+            prompt_stats.record(stats)
+        parser = StreamingJSONParser()
+        try:
+            invoke_llm_with_backoff(llm, prompt, output_tokens=LLM_OUTPUT_TOKENS_ESTIMATE // 2, stream_parser=parser)
+        except Exception as e:
+            LOGGER.warning(f"Profile repair failed for {candidate['name']}: {str(e)}")
+            break
+        if parser.values and isinstance(parser.values[0], dict):
+            profile.update({k: v for k, v in parser.values[0].items() if k in invalid_fields})
+        invalid_fields = validate_profile(profile)
+    return None if invalid_fields else profile
+
+def generate_structured_profile_hr(job_description, candidate, model=None, temperature=None, prompt_stats=None):
+    """Generates a schema-validated JSON profile for one candidate.
+
+    Returns (profile, raw_response); profile is None if the model failed.
+    """
+    prompt, stats = build_profile_prompt(
+        job_description,
+        candidate.get("raw_text") or candidate["cleaned_text"],
+        candidate["matched_keywords"],
+        candidate["name"],
+        candidate["email"],
+        candidate["phone"],
+        template=STRUCTURED_PROFILE_PROMPT_TEMPLATE
+    )
+    PROMPT_STATS.record(stats)
+    if prompt_stats is not None:
+        prompt_stats.record(stats)
+    llm = get_llm(model, temperature)
+    if not llm:
+        return None, "LLM initialization failed"
+    parser = StreamingJSONParser()
+    try:
+        response = invoke_llm_with_backoff(llm, prompt, stream_parser=parser)
+    except Exception as e:
+        return None, f"Error generating profile: {str(e)}"
+    profile = parser.values[0] if parser.values and isinstance(parser.values[0], dict) else {}
+    profile = repair_profile_fields(llm, profile, validate_profile(profile), job_description, candidate, prompt_stats)
+    return profile, response
+
+SECTION_MARKERS = {
+    "basic information": "basic_info",
+    "strengths & weaknesses": "strengths_weaknesses",
+    "hr summary & justification": "hr_summary_justification",
+    "recommendation": "recommendation",
+    "ats evaluation json": "ats_json",
+    "jd-based interview questions": "interview_questions",
+}
+SECTION_HEADER_RE = re.compile(
+    r"^[#*\s]*(" + "|".join(re.escape(marker) for marker in SECTION_MARKERS) + ")",
+    re.IGNORECASE | re.MULTILINE
+)
 
 def parse_hr_response_sections(response_text):
     """Parses the LLM response text into structured sections."""
@@ -360,26 +3098,24 @@ def parse_hr_response_sections(response_text):
         'recommendation': '', 'ats_json': '', 'interview_questions': ''
     }
     text = response_text.strip()
-    markers = [
-        ("basic_info", "basic information"), ("strengths_weaknesses", "strengths & weaknesses"),
-        ("hr_summary_justification", "hr summary & justification"), ("recommendation", "recommendation"),
-        ("ats_json", "ats evaluation json"), ("interview_questions", "jd-based interview questions")
-    ]
+    # Headers only count at the start of a line, so e.g. "recommendation" inside a sentence is ignored
     positions = []
-    for key, marker in markers:
-        idx = text.lower().find(marker)
-        if idx != -1:
-            positions.append((idx, key, marker))
-    positions.sort()
-    for i, (idx, key, marker) in enumerate(positions):
-        start = idx + len(marker)
+    for m in SECTION_HEADER_RE.finditer(text):
+        key = SECTION_MARKERS[m.group(1).lower()]
+        if key not in {p[1] for p in positions}:
+            positions.append((m.start(), key, m.end()))
+    for i, (idx, key, start) in enumerate(positions):
         end = positions[i+1][0] if i+1 < len(positions) else len(text)
         content = text[start:end].strip(" :\n*")
         sections[key] = content
     if sections["ats_json"]:
-        json_match = re.search(r'\[[\s\S]*\]', sections["ats_json"])
-        if json_match:
-            sections["ats_json"] = json_match.group(0)
+        json_start = sections["ats_json"].find("[")
+        if json_start != -1:
+            try:
+                _, json_end = json.JSONDecoder().raw_decode(sections["ats_json"], json_start)
+                sections["ats_json"] = sections["ats_json"][json_start:json_end]
+            except ValueError:
+                pass
     return sections
 
 def extract_subsections_hr_summary_justification(text):
@@ -405,7 +3141,1037 @@ def style_recommendation_subheadings(recommendation):
     rec_out = re.sub(r"(?<!\*)\s*Additional Future Potential\s*:(?!\*)", "\n\n**Additional Future Potential:**", rec_out, flags=re.IGNORECASE)
     return rec_out
 
+def build_candidate_sections(profile):
+    """Turns a raw LLM profile into the sections dict returned to the UI, including scores."""
+    sections = parse_hr_response_sections(profile)
+    summary, justification = extract_subsections_hr_summary_justification(sections.get("hr_summary_justification", ""))
+    sections["hr_summary"] = summary
+    sections["justification"] = justification
+    sections["recommendation"] = style_recommendation_subheadings(sections.get("recommendation", ""))
+
+    ats_score = None
+    hr_score = None
+    ats_json_text = sections.get("ats_json", "")
+    if ats_json_text:
+        try:
+            ats_list = json.loads(ats_json_text)
+            if ats_list and isinstance(ats_list[0], dict):
+                ats_score = ats_list[0].get("ats_score")
+                hr_score = ats_list[0].get("hr_score")
+        except Exception as e:
+            LOGGER.warning(f"Could not parse ATS JSON: {e}")
+
+    sections["ats_score"] = ats_score
+    sections["hr_score"] = hr_score
+    return sections
+
+# ==================== PRE-LLM RANKING ====================
+RANKING_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the to we will with you your "
+    "this that who which their they able strong experience work working role team years year plus".split()
+)
+
+def tokenize_for_ranking(text):
+    """Lowercased word tokens (keeping tech tokens like c++, c#, node.js), without stopwords."""
+    tokens = re.findall(r"[a-z0-9][a-z0-9+#.]*", (text or "").lower())
+    return [t.rstrip('.') for t in tokens if t.rstrip('.') and t not in RANKING_STOPWORDS]
+
+def bm25_scores(query_tokens, documents_tokens, k1=BM25_K1, b=BM25_B):
+    """Okapi BM25 score of every document for the query, vectorised over a docs x query-terms matrix."""
+    query_terms = list(dict.fromkeys(query_tokens))
+    if not query_terms or not documents_tokens:
+        return np.zeros(len(documents_tokens))
+    term_index = {term: i for i, term in enumerate(query_terms)}
+    tf = np.zeros((len(documents_tokens), len(query_terms)))
+    for row, tokens in enumerate(documents_tokens):
+        for token in tokens:
+            col = term_index.get(token)
+            if col is not None:
+                tf[row, col] += 1
+    query_tf = np.array([query_tokens.count(term) for term in query_terms], dtype=float)
+    doc_len = np.array([len(tokens) for tokens in documents_tokens], dtype=float)
+    avg_len = doc_len.mean() or 1.0
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(documents_tokens) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf * query_tf).sum(axis=1)
+
+def rank_resumes(job_description, texts, matched_keywords_list, matcher=None):
+    """Cheap relevance score (0-100) for each resume against the job description.
+
+    Combines BM25 over the cleaned text with the share of the job
+    description's keywords that the resume also matches.
+    """
+    if not texts:
+        return np.zeros(0)
+    bm25 = bm25_scores(tokenize_for_ranking(job_description), [tokenize_for_ranking(t) for t in texts])
+    bm25 = bm25 / bm25.max() if bm25.max() > 0 else bm25
+
+    jd_keywords = {kw for kws in keyword_match(job_description, matcher).values() for kw in kws}
+    keyword_scores = []
+    for matched in matched_keywords_list:
+        found = {kw for kws in matched.values() for kw in kws}
+        wanted = jd_keywords or found
+        keyword_scores.append(len(found & wanted) / len(wanted) if wanted else 0.0)
+    keyword_scores = np.array(keyword_scores)
+    return np.round(100 * ((1 - RANKING_KEYWORD_WEIGHT) * bm25 + RANKING_KEYWORD_WEIGHT * keyword_scores), 1)
+
+def shortlist_candidates(prepared, job_description, top_k=None, min_score=None, matcher=None):
+    """Scores every prepared candidate and splits them into (shortlist, rest), best first.
+
+    Each candidate gets a 'prescreen_score'; only the shortlist goes to the LLM.
+    With SEMANTIC_RANKING_WEIGHT > 0, a candidate's 'semantic_score' is blended in.
+    """
+    top_k = SHORTLIST_TOP_K if top_k is None else top_k
+    min_score = SHORTLIST_MIN_SCORE if min_score is None else min_score
+    scores = rank_resumes(
+        job_description,
+        [c["cleaned_text"] for c in prepared],
+        [c["matched_keywords"] for c in prepared],
+        matcher
+    )
+    for candidate, score in zip(prepared, scores):
+        if SEMANTIC_RANKING_WEIGHT > 0 and candidate.get("semantic_score") is not None:
+            score = (1 - SEMANTIC_RANKING_WEIGHT) * score + SEMANTIC_RANKING_WEIGHT * candidate["semantic_score"]
+        candidate["prescreen_score"] = round(float(score), 1)
+    ranked = sorted(prepared, key=lambda c: c["prescreen_score"], reverse=True)
+    shortlist = [c for c in ranked if c["prescreen_score"] >= min_score]
+    if top_k > 0:  # 0 (or less) means no top-K cut
+        shortlist = shortlist[:top_k]
+    shortlisted_ids = {id(c) for c in shortlist}
+    return shortlist, [c for c in ranked if id(c) not in shortlisted_ids]
+
+# ==================== CANDIDATE STORE ====================
+CANDIDATE_SORT_COLUMNS = {
+    "hr_score": "hr_score",
+    "ats_score": "ats_score",
+    "prescreen_score": "prescreen_score",
+    "updated_at": "updated_at",
+    "name": "name",
+}
+
+def job_posting_id_for(job_description):
+    """Stable id for a job description, so re-screening the same JD lands on the same posting."""
+    normalized = re.sub(r"\s+", " ", (job_description or "").strip().lower())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+def to_score(value):
+    """Scores may arrive as numbers or strings from the LLM; anything unparseable is stored as NULL."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class CandidateStore:
+    """Screened candidates and their job postings, persisted in the local SQLite database.
+
+    A candidate is keyed by email (or file name) within a posting, so a
+    re-screen updates the existing row instead of adding a duplicate.
+    """
+
+    def upsert_job_posting(self, job_description):
+        job_posting_id = job_posting_id_for(job_description)
+        now = time.time()
+        conn = get_db()
+        conn.execute(
+            """INSERT INTO job_postings (job_posting_id, title, job_description, created_at, last_screened_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(job_posting_id) DO UPDATE SET last_screened_at = excluded.last_screened_at""",
+            (job_posting_id, infer_job_title_from_jd(job_description), job_description, now, now)
+        )
+        conn.commit()
+        return job_posting_id
+
+    def save_candidate(self, job_posting_id, record, model=None):
+        sections = record["sections"]
+        identity = (record.get("email") or record.get("filename") or record.get("name") or "").strip().lower()
+        now = time.time()
+        conn = get_db()
+        conn.execute(
+            """INSERT INTO candidates
+               (job_posting_id, candidate_key, name, email, phone, filename, sender, subject, prescreen_score,
+                ats_score, hr_score, sections, model, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(job_posting_id, candidate_key) DO UPDATE SET
+                 name = excluded.name, email = excluded.email, phone = excluded.phone,
+                 filename = excluded.filename, sender = excluded.sender, subject = excluded.subject,
+                 prescreen_score = excluded.prescreen_score, ats_score = excluded.ats_score,
+                 hr_score = excluded.hr_score, sections = excluded.sections, model = excluded.model,
+                 updated_at = excluded.updated_at""",
+            (
+                job_posting_id, hashlib.sha256(identity.encode("utf-8")).hexdigest(),
+                record.get("name"), record.get("email"), record.get("phone"), record.get("filename"),
+                record.get("sender"), record.get("subject"), to_score(record.get("prescreen_score")),
+                to_score(sections.get("ats_score")), to_score(sections.get("hr_score")),
+                json.dumps(sections), model, now, now
+            )
+        )
+        conn.commit()
+
+    def list_job_postings(self, limit=CANDIDATE_PAGE_SIZE, offset=0):
+        conn = get_db()
+        total = conn.execute("SELECT COUNT(*) FROM job_postings").fetchone()[0]
+        rows = conn.execute(
+            """SELECT p.job_posting_id, p.title, p.created_at, p.last_screened_at,
+                      COUNT(c.candidate_key) AS candidates, AVG(c.ats_score) AS avg_ats_score,
+                      AVG(c.hr_score) AS avg_hr_score, MAX(c.hr_score) AS top_hr_score
+               FROM job_postings p LEFT JOIN candidates c ON c.job_posting_id = p.job_posting_id
+               GROUP BY p.job_posting_id ORDER BY p.last_screened_at DESC LIMIT ? OFFSET ?""",
+            (limit, offset)
+        ).fetchall()
+        return [dict(r) for r in rows], total
+
+    def get_job_posting(self, job_posting_id):
+        row = get_db().execute("SELECT * FROM job_postings WHERE job_posting_id = ?", (job_posting_id,)).fetchone()
+        return dict(row) if row else None
+
+    def query_candidates(self, job_posting_id=None, min_ats_score=None, min_hr_score=None, search=None,
+                         sort="hr_score", descending=True, limit=CANDIDATE_PAGE_SIZE, offset=0):
+        """Filtered, sorted page of candidates. Returns (records, total matching)."""
+        where, args = [], []
+        if job_posting_id:
+            where.append("job_posting_id = ?")
+            args.append(job_posting_id)
+        if min_ats_score is not None:
+            where.append("ats_score >= ?")
+            args.append(min_ats_score)
+        if min_hr_score is not None:
+            where.append("hr_score >= ?")
+            args.append(min_hr_score)
+        if search:
+            where.append("(name LIKE ? OR email LIKE ? OR filename LIKE ?)")
+            args.extend([f"%{search}%"] * 3)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        column = CANDIDATE_SORT_COLUMNS.get(sort, "hr_score")
+        # SQLite sorts NULL first, so descending order (served straight from the score indexes)
+        # already puts unscored candidates last; ascending order needs the explicit NULL check
+        order = f"{column} DESC" if descending else f"{column} IS NULL, {column} ASC"
+        conn = get_db()
+        total = conn.execute(f"SELECT COUNT(*) FROM candidates {clause}", args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM candidates {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+            args + [limit, offset]
+        ).fetchall()
+        return [self._record(r) for r in rows], total
+
+    def latest_scores_by_email(self, emails):
+        """Most recent screening (ats/hr score, posting) per email, keyed by lowercased email."""
+        if not emails:
+            return {}
+        emails = list(dict.fromkeys(e.lower() for e in emails))
+        placeholders = ",".join("?" * len(emails))
+        rows = get_db().execute(
+            "SELECT email, job_posting_id, ats_score, hr_score FROM candidates "
+            f"WHERE lower(email) IN ({placeholders}) ORDER BY updated_at",
+            emails
+        ).fetchall()
+        return {r["email"].lower(): dict(r) for r in rows}
+
+    @staticmethod
+    def _record(row):
+        return {
+            "job_posting_id": row["job_posting_id"],
+            "name": row["name"],
+            "email": row["email"],
+            "phone": row["phone"],
+            "filename": row["filename"],
+            "sender": row["sender"],
+            "subject": row["subject"],
+            "prescreen_score": row["prescreen_score"],
+            "sections": json.loads(row["sections"]),
+            "model": row["model"],
+            "screened_at": row["updated_at"],
+        }
+
+CANDIDATE_STORE = CandidateStore()
+
+# ==================== SEMANTIC INDEX ====================
+class HashingEmbedder:
+    """Dependency-free text embedder: word uni/bigrams and character n-grams hashed into a fixed-size vector.
+
+    Uses a stable hash (crc32), so cached vectors stay valid across restarts.
+    Character n-grams make related word forms ("engineer", "engineering")
+    land close together.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hash-ngram-v1-{dim}"
+
+    def _features(self, text):
+        words = tokenize_for_ranking(text)
+        features = defaultdict(float)
+        for word in words:
+            features["w:" + word] += 1.0
+            padded = f"<{word}>"
+            for n in (3, 4):
+                for i in range(len(padded) - n + 1):
+                    features["c:" + padded[i:i + n]] += 0.5
+        for first, second in zip(words, words[1:]):
+            features[f"b:{first} {second}"] += 1.0
+        return features
+
+    def embed(self, texts):
+        """Returns an L2-normalised float32 matrix, one row per text."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                # Signed hashing keeps collisions from only ever adding up
+                matrix[row, h % self.dim] += (1.0 if h & 0x80000000 else -1.0) * (1.0 + np.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+class SentenceTransformerEmbedder:
+    """CPU sentence-embedding model (optional dependency: sentence-transformers)."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+_EMBEDDER = None
+
+def get_embedder():
+    """The configured embedder; falls back to hashed n-grams if the model cannot be loaded."""
+    global _EMBEDDER
+    if _EMBEDDER is None:
+        if EMBEDDING_BACKEND == "sentence-transformers":
+            try:
+                _EMBEDDER = SentenceTransformerEmbedder()
+            except Exception as e:
+                LOGGER.warning(f"Sentence-transformers unavailable, using hashed n-gram embeddings: {str(e)}")
+        if _EMBEDDER is None:
+            _EMBEDDER = HashingEmbedder()
+    return _EMBEDDER
+
+def chunk_resume(raw_text, max_words=EMBEDDING_CHUNK_WORDS):
+    """Splits a resume into section-sized chunks, windowing sections longer than `max_words`."""
+    chunks = []
+    for key, text in split_resume_sections(raw_text).items():
+        words = text.split()
+        for start in range(0, len(words), max_words):
+            window = " ".join(words[start:start + max_words])
+            chunks.append(window if key == "header" else f"{key}: {window}")
+    return chunks or [" ".join((raw_text or "").split())]
+
+class SemanticIndex:
+    """Persistent vector index of every resume seen, for LLM-free semantic matching.
+
+    Chunk embeddings are cached in SQLite by content hash and embedder, and
+    kept in memory as one contiguous matrix so a search is a single
+    matrix-vector product. A resume's score blends its best-matching chunk
+    with its overall (mean) vector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_for = None
+        self._hashes = []
+        self._positions = {}
+        self._chunk_vectors = None  # built by _ensure_loaded, so importing the app does not load NumPy
+        self._chunk_starts = None
+        self._doc_vectors = None
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    def _ensure_loaded(self, embedder):
+        """(Re)loads the in-memory matrices when the database or embedder changed."""
+        key = (DATABASE_PATH, embedder.name)
+        if self._loaded_for == key:
+            return
+        rows = get_db().execute(
+            "SELECT e.content_hash, e.dim, e.chunks, e.vectors FROM embedding_cache e "
+            "JOIN resume_index r ON r.content_hash = e.content_hash WHERE e.embedder = ? ORDER BY r.indexed_at",
+            (embedder.name,)
+        ).fetchall()
+        self._hashes, blocks = [], []
+        for row in rows:
+            self._hashes.append(row['content_hash'])
+            blocks.append(np.frombuffer(row['vectors'], dtype=np.float32).reshape(row['chunks'], row['dim']))
+        self._rebuild(blocks)
+        self._loaded_for = key
+
+    def _rebuild(self, blocks):
+        self._positions = {h: i for i, h in enumerate(self._hashes)}
+        if not blocks:
+            self._chunk_vectors = self._chunk_starts = self._doc_vectors = None
+            return
+        self._chunk_vectors = np.vstack(blocks)
+        self._chunk_starts = np.cumsum([0] + [len(b) for b in blocks[:-1]]).astype(np.int64)
+        doc_vectors = np.vstack([b.mean(axis=0) for b in blocks])
+        norms = np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+        self._doc_vectors = doc_vectors / np.where(norms == 0, 1.0, norms)
+
+    def _blocks(self):
+        if self._chunk_vectors is None:
+            return []
+        ends = list(self._chunk_starts[1:]) + [len(self._chunk_vectors)]
+        return [self._chunk_vectors[start:end] for start, end in zip(self._chunk_starts, ends)]
+
+    def _embed_cached(self, embedder, content_hash, raw_text):
+        """Chunk vectors for a resume, from the embedding cache or freshly computed."""
+        conn = get_db()
+        row = conn.execute(
+            "SELECT dim, chunks, vectors FROM embedding_cache WHERE content_hash = ? AND embedder = ?",
+            (content_hash, embedder.name)
+        ).fetchone()
+        if row:
+            return np.frombuffer(row['vectors'], dtype=np.float32).reshape(row['chunks'], row['dim'])
+        vectors = embedder.embed(chunk_resume(raw_text))
+        conn.execute(
+            "INSERT OR REPLACE INTO embedding_cache (content_hash, embedder, dim, chunks, vectors, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (content_hash, embedder.name, vectors.shape[1], vectors.shape[0], vectors.tobytes(), time.time())
+        )
+        conn.commit()
+        return vectors
+
+    def add_many(self, candidates):
+        """Indexes prepared candidates (embedding only new content). Returns their content hashes."""
+        embedder = get_embedder()
+        hashes = []
+        with self._lock:
+            self._ensure_loaded(embedder)
+            blocks = None
+            conn = get_db()
+            for candidate in candidates:
+                raw_text = candidate.get("raw_text") or candidate["cleaned_text"]
+                content_hash = self.content_hash(raw_text)
+                hashes.append(content_hash)
+                conn.execute(
+                    "INSERT OR REPLACE INTO resume_index "
+                    "(content_hash, name, email, phone, filename, sender, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, candidate["name"], candidate["email"], candidate["phone"],
+                     candidate["filename"], candidate["sender"], time.time())
+                )
+                if content_hash in self._positions:
+                    continue
+                vectors = self._embed_cached(embedder, content_hash, raw_text)
+                if blocks is None:
+                    blocks = self._blocks()
+                self._positions[content_hash] = len(self._hashes)
+                self._hashes.append(content_hash)
+                blocks.append(vectors)
+            conn.commit()
+            if blocks is not None:
+                self._rebuild(blocks)
+        return hashes
+
+    def _scores(self, query_vector):
+        """Similarity of every indexed resume to the query vector, vectorised."""
+        chunk_sims = self._chunk_vectors @ query_vector
+        best_chunk = np.maximum.reduceat(chunk_sims, self._chunk_starts)
+        return 0.5 * best_chunk + 0.5 * (self._doc_vectors @ query_vector)
+
+    def score_documents(self, job_description, content_hashes):
+        """Semantic score (0-100) of the given indexed resumes for a job description."""
+        embedder = get_embedder()
+        query = embedder.embed([job_description])[0]
+        with self._lock:
+            self._ensure_loaded(embedder)
+            if not self._hashes:
+                return [0.0] * len(content_hashes)
+            scores = self._scores(query)
+            positions = self._positions
+            return [round(100 * max(0.0, float(scores[positions[h]])), 1) if h in positions else 0.0
+                    for h in content_hashes]
+
+    def search(self, job_description, top_n=SEMANTIC_SEARCH_TOP_N, min_score=0.0):
+        """Best `top_n` resumes across everything indexed. Returns [(content_hash, score 0-100)]."""
+        embedder = get_embedder()
+        query = embedder.embed([job_description])[0]
+        with self._lock:
+            self._ensure_loaded(embedder)
+            if not self._hashes:
+                return []
+            scores = self._scores(query)
+            hashes = self._hashes
+        top_n = min(top_n, len(scores))
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top])]
+        return [(hashes[i], round(100 * float(scores[i]), 1)) for i in top if 100 * scores[i] >= min_score]
+
+    def describe(self, content_hashes):
+        """resume_index rows (applicant details) for the given hashes, keyed by hash."""
+        if not content_hashes:
+            return {}
+        placeholders = ",".join("?" * len(content_hashes))
+        rows = get_db().execute(
+            f"SELECT * FROM resume_index WHERE content_hash IN ({placeholders})", list(content_hashes)
+        ).fetchall()
+        return {r['content_hash']: dict(r) for r in rows}
+
+    def stats(self):
+        embedder = get_embedder()
+        with self._lock:
+            self._ensure_loaded(embedder)
+            return {
+                "embedder": embedder.name,
+                "resumes": len(self._hashes),
+                "chunks": 0 if self._chunk_vectors is None else len(self._chunk_vectors),
+            }
+
+SEMANTIC_INDEX = SemanticIndex()
+
+# ==================== SCREENING PIPELINE ====================
+def prepare_candidate(meta, raw_text=None, matcher=None):
+    """Extracts text, keywords and contact details for a downloaded resume. Returns None if unusable."""
+    sha256 = meta.get("sha256")
+    if raw_text is None:
+        source = ATTACHMENT_STORE.source(sha256) if sha256 else None
+        if source is None:
+            return None
+        raw_text = extract_text_from_pdf(source)
+    if not raw_text:
+        return None
+
+    cleaned_text = clean_text(raw_text)
+    matched_keywords = keyword_match(cleaned_text, matcher)
+    # Stored blobs are named by content hash, so the name comes from the original attachment
+    candidate_name = extract_candidate_name(meta.get("original_filename") or f"{sha256}.pdf")
+    if not candidate_name:
+        first_line = cleaned_text.splitlines()[0].strip() if cleaned_text else ""
+        if first_line and len(first_line) < 60:
+            candidate_name = first_line
+        else:
+            candidate_name = os.path.splitext(meta.get("original_filename") or sha256)[0]
+
+    email_from_sender = parse_email_from_sender(meta.get("sender", ""))
+    email_from_text, phone_from_text = extract_contact_info(cleaned_text)
+    return {
+        "name": candidate_name,
+        "email": email_from_sender or email_from_text,
+        "phone": phone_from_text,
+        "filename": meta.get("original_filename", ""),
+        "sender": meta.get("sender", ""),
+        "subject": meta.get("subject", ""),
+        "raw_text": raw_text,
+        "cleaned_text": cleaned_text,
+        "matched_keywords": matched_keywords,
+    }
+
+def candidate_record(candidate, sections):
+    """The candidate object returned to the UI."""
+    return {
+        "name": candidate["name"],
+        "email": candidate["email"],
+        "phone": candidate["phone"],
+        "filename": candidate["filename"],
+        "sender": candidate["sender"],
+        "subject": candidate["subject"],
+        "prescreen_score": candidate.get("prescreen_score"),
+        "sections": sections
+    }
+
+def log_candidate(candidate, record, source, duration):
+    """Structured log line and counter for one candidate's scoring outcome."""
+    outcome = "scored" if record else "failed"
+    METRICS.inc("hr_candidates_total", outcome=outcome, source=source)
+    sections = record["sections"] if record else {}
+    log_event(
+        f"candidate_{outcome}",
+        candidate=candidate["name"],
+        email=candidate["email"],
+        filename=candidate["filename"],
+        source=source,
+        prescreen_score=candidate.get("prescreen_score"),
+        ats_score=sections.get("ats_score"),
+        hr_score=sections.get("hr_score"),
+        duration_ms=round(duration * 1000, 1)
+    )
+
+def score_candidate(candidate, job_description, model=None, temperature=None, prompt_stats=None, output_mode=None):
+    """Profiles one prepared candidate (cache first, then the LLM). Returns the UI record or None.
+
+    `output_mode` "json" asks for a schema-validated JSON profile; "text"
+    uses the section-header prompt and regex parsing.
+    """
+    start = time.perf_counter()
+    with span("candidate.score", mode=output_mode or PROFILE_OUTPUT_MODE) as attrs:
+        record = _score_candidate(candidate, job_description, model, temperature, prompt_stats, output_mode, attrs)
+    log_candidate(candidate, record, attrs.get("source", "llm"), time.perf_counter() - start)
+    return record
+
+def profile_cache_key(candidate, job_description, model, temperature, prompt_version):
+    return ProfileCache.make_key(
+        candidate["cleaned_text"], job_description, model, prompt_version,
+        temperature=temperature, matched_keywords=candidate.get("matched_keywords")
+    )
+
+def _score_candidate(candidate, job_description, model, temperature, prompt_stats, output_mode, attrs):
+    model = model or LLM_MODEL
+    output_mode = output_mode or PROFILE_OUTPUT_MODE
+    prompt_version = STRUCTURED_PROMPT_VERSION if output_mode == "json" else PROMPT_VERSION
+    cache_key = profile_cache_key(candidate, job_description, model, temperature, prompt_version)
+    cached = PROFILE_CACHE.get(cache_key)
+    attrs["source"] = "cache" if cached else "llm"
+    if cached:
+        sections = cached["sections"]
+    elif output_mode == "json":
+        profile, raw = generate_structured_profile_hr(job_description, candidate, model, temperature, prompt_stats)
+        if profile is None:
+            LOGGER.warning(f"Failed to generate profile for {candidate['name']}: {raw[:200]}")
+            return None
+        profile.setdefault("name", candidate["name"])
+        with span("llm.parse"):
+            sections = sections_from_profile_json(profile)
+        PROFILE_CACHE.put(cache_key, json.dumps(profile), sections, model=model, prompt_version=STRUCTURED_PROMPT_VERSION)
+    else:
+        # The raw text keeps line breaks, which the prompt builder needs to find resume sections
+        profile = generate_candidate_profile_hr(
+            job_description,
+            candidate.get("raw_text") or candidate["cleaned_text"],
+            candidate["matched_keywords"],
+            candidate["name"],
+            candidate["email"],
+            candidate["phone"],
+            model=model,
+            temperature=temperature,
+            prompt_stats=prompt_stats,
+        )
+
+        if profile.startswith("Error") or profile.startswith("Failed") or profile == "LLM initialization failed":
+            LOGGER.warning(f"Failed to generate profile for {candidate['name']}: {profile}")
+            return None
+
+        with span("llm.parse"):
+            sections = build_candidate_sections(profile)
+        PROFILE_CACHE.put(cache_key, profile, sections, model=model)
+
+    return candidate_record(candidate, sections)
+
+def score_candidate_batch(batch, job_description, model=None, temperature=None, prompt_stats=None, output_mode=None):
+    """Profiles a batch of candidates with one comparative LLM request.
+
+    Cached candidates skip the request; any candidate the model leaves out
+    is retried on its own. Returns one record (or None) per candidate.
+    """
+    model = model or LLM_MODEL
+    records = [None] * len(batch)
+    keys = [profile_cache_key(c, job_description, model, temperature, BATCH_PROMPT_VERSION) for c in batch]
+    misses = []
+    for i, (candidate, key) in enumerate(zip(batch, keys)):
+        # A profile from single-candidate mode is just as good
+        cached = PROFILE_CACHE.get(key) or PROFILE_CACHE.get(
+            profile_cache_key(candidate, job_description, model, temperature, STRUCTURED_PROMPT_VERSION)
+        ) or PROFILE_CACHE.get(profile_cache_key(candidate, job_description, model, temperature, PROMPT_VERSION))
+        if cached:
+            records[i] = candidate_record(candidate, cached["sections"])
+            log_candidate(candidate, records[i], "cache", 0.0)
+        else:
+            misses.append(i)
+    if not misses:
+        return records
+
+    start = time.perf_counter()
+    with span("candidate.score_batch", size=len(misses)):
+        profiles, _ = generate_batch_profiles_hr(
+            job_description, [batch[i] for i in misses], model, temperature, prompt_stats
+        )
+    # The request's latency is shared by every candidate in the batch
+    per_candidate = (time.perf_counter() - start) / len(misses)
+    missing = sum(profile is None for profile in profiles)
+    if missing:
+        METRICS.inc("hr_batch_fallbacks_total", missing)
+        LOGGER.warning(f"Batch response left out {missing} of {len(misses)} candidates; scoring them one by one")
+    for i, profile in zip(misses, profiles):
+        if profile is None:
+            records[i] = score_candidate(batch[i], job_description, model, temperature, prompt_stats, output_mode)
+            continue
+        profile.setdefault("name", batch[i]["name"])
+        with span("llm.parse"):
+            sections = sections_from_profile_json(profile)
+        PROFILE_CACHE.put(keys[i], json.dumps(profile), sections, model=model, prompt_version=BATCH_PROMPT_VERSION)
+        records[i] = candidate_record(batch[i], sections)
+        log_candidate(batch[i], records[i], "batch", per_candidate)
+    return records
+
+def score_candidates(prepared, job_description, max_workers=None, on_result=None, model=None, temperature=None,
+                     prompt_stats=None, batch_size=None, output_mode=None):
+    """Scores prepared candidates concurrently; the shared rate limiter paces the LLM calls.
+
+    With `batch_size` > 1, candidates are packed into comparative batched
+    prompts (always structured JSON). `on_result` is called with each scored candidate as soon as it
+    is ready. Results keep the input order and failed candidates are dropped.
+    """
+    if not prepared:
+        return []
+    max_workers = max_workers or LLM_MAX_CONCURRENCY
+    batch_size = SCORING_BATCH_SIZE if batch_size is None else batch_size
+    if batch_size > 1:
+        batches = pack_candidate_batches(prepared, batch_size)
+        task = lambda batch: score_candidate_batch(batch, job_description, model, temperature, prompt_stats, output_mode)
+    else:
+        batches = [[c] for c in prepared]
+        task = lambda batch: [score_candidate(batch[0], job_description, model, temperature, prompt_stats, output_mode)]
+
+    results = [None] * len(prepared)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches)), thread_name_prefix="llm-score") as pool:
+        futures = {}
+        start = 0
+        for batch in batches:
+            futures[submit_in_context(pool, task, batch)] = start
+            start += len(batch)
+        for future in as_completed(futures):
+            for offset, result in enumerate(future.result()):
+                results[futures[future] + offset] = result
+                if result and on_result:
+                    on_result(result)
+    return [r for r in results if r]
+
+def run_screening_pipeline(creds, job_description, days_filter=30, max_messages=None, on_event=None,
+                           model=None, temperature=None, incremental=False, keywords=None,
+                           shortlist_top_k=None, shortlist_min_score=None, batch_size=None, output_mode=None):
+    """Runs download, extraction, pre-ranking and scoring for one screening request.
+
+    `on_event(event_type, data)` receives progress, the pre-LLM ranking and
+    each scored candidate. Scored candidates are saved to the candidate store
+    under the job posting for `job_description`. Every stage is timed into
+    the run's trace. Returns {'downloaded': int, 'ranking': [...],
+    'candidates': [...], 'job_posting_id': str, 'prompt_stats': {...},
+    'run_id': str, 'timings': {stage: {...}}}.
+    """
+    with start_trace() as trace:
+        try:
+            result = _run_screening_pipeline(
+                creds, job_description, days_filter, max_messages, on_event or (lambda event_type, data: None),
+                model, temperature, incremental, keywords, shortlist_top_k, shortlist_min_score, batch_size, output_mode
+            )
+        except Exception:
+            METRICS.inc("hr_screening_runs_total", status="failed")
+            log_event("screening_run_failed", timings=trace.summary())
+            raise
+        METRICS.inc("hr_screening_runs_total", status="completed")
+        result["run_id"] = trace.trace_id
+        result["timings"] = trace.summary()
+        log_event(
+            "screening_run_completed",
+            downloaded=result["downloaded"],
+            scored=len(result["candidates"]),
+            job_posting_id=result["job_posting_id"],
+            timings=result["timings"]
+        )
+        return result
+
+def _run_screening_pipeline(creds, job_description, days_filter, max_messages, emit, model, temperature,
+                            incremental, keywords, shortlist_top_k, shortlist_min_score, batch_size, output_mode):
+    job_posting_id = CANDIDATE_STORE.upsert_job_posting(job_description)
+    emit("status", {"stage": "downloading"})
+    downloaded_resumes = download_resumes_from_gmail(creds, days_filter, max_messages, incremental=incremental)
+    emit("status", {"stage": "scoring", "downloaded": len(downloaded_resumes)})
+
+    with span("pdf.extract", files=len(downloaded_resumes)):
+        texts = extract_attachment_texts([meta["sha256"] for meta in downloaded_resumes])
+    matcher = get_keyword_matcher(keywords)
+    prepared = []
+    for meta in downloaded_resumes:
+        with span("candidate.prepare"):
+            prepared.append(prepare_candidate(meta, texts.get(meta["sha256"], ""), matcher))
+    prepared = [c for c in prepared if c]
+    with span("semantic.index", candidates=len(prepared)):
+        try:
+            content_hashes = SEMANTIC_INDEX.add_many(prepared)
+            semantic_scores = SEMANTIC_INDEX.score_documents(job_description, content_hashes)
+            for candidate, score in zip(prepared, semantic_scores):
+                candidate["semantic_score"] = score
+        except Exception as e:
+            LOGGER.error(f"Error updating semantic index: {str(e)}")
+    with span("rank.shortlist", candidates=len(prepared)):
+        shortlist, rest = shortlist_candidates(prepared, job_description, shortlist_top_k, shortlist_min_score, matcher)
+    ranking = [{
+        "name": c["name"],
+        "email": c["email"],
+        "filename": c["filename"],
+        "prescreen_score": c["prescreen_score"],
+        "semantic_score": c.get("semantic_score"),
+        "shortlisted": i < len(shortlist)
+    } for i, c in enumerate(shortlist + rest)]
+    emit("ranking", {"ranking": ranking})
+    emit("status", {"stage": "scoring", "downloaded": len(downloaded_resumes), "prepared": len(shortlist)})
+    prompt_stats = PromptStats()
+
+    def on_result(candidate):
+        with span("store.candidate"):
+            CANDIDATE_STORE.save_candidate(job_posting_id, candidate, model or LLM_MODEL)
+        emit("candidate", candidate)
+
+    with span("scoring", candidates=len(shortlist)):
+        candidates = score_candidates(
+            shortlist,
+            job_description,
+            on_result=on_result,
+            model=model,
+            temperature=temperature,
+            prompt_stats=prompt_stats,
+            batch_size=batch_size,
+            output_mode=output_mode
+        )
+    return {
+        "downloaded": len(downloaded_resumes),
+        "ranking": ranking,
+        "candidates": candidates,
+        "job_posting_id": job_posting_id,
+        "prompt_stats": prompt_stats.snapshot()
+    }
+
+# ==================== SCREENING JOBS ====================
+JOB_TERMINAL_STATUSES = ("completed", "failed")
+
+class InMemoryJobStore:
+    """Process-local job state; suitable for a single worker process and for tests."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._events = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def create(self, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                'job_id': job_id, 'status': 'queued', 'params': params,
+                'error': None, 'created_at': now, 'updated_at': now
+            }
+        return job_id
+
+    def set_status(self, job_id, status, error=None):
+        with self._lock:
+            self._jobs[job_id].update(status=status, error=error, updated_at=time.time())
+
+    def add_event(self, job_id, event_type, data):
+        with self._lock:
+            seq = len(self._events[job_id]) + 1
+            self._events[job_id].append({'seq': seq, 'type': event_type, 'data': data})
+        return seq
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def events(self, job_id, after=0):
+        with self._lock:
+            return list(self._events.get(job_id, [])[after:])
+
+    def expire_stale(self):
+        """Jobs die with the process that holds them, so nothing is ever left behind."""
+        return []
+
+class SQLiteJobStore:
+    """Job state persisted in the local SQLite database, shared between worker threads.
+
+    While a process holds unfinished jobs, a heartbeat thread refreshes their updated_at.
+    A queued or running job whose heartbeat is older than JOB_STALE_SECONDS belonged to a
+    process that died; expire_stale marks it failed so pollers and streams terminate.
+    """
+
+    def __init__(self, heartbeat_interval=JOB_HEARTBEAT_INTERVAL, stale_seconds=JOB_STALE_SECONDS):
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_seconds = stale_seconds
+        self._active = set()
+        self._lock = threading.Lock()
+        self._heartbeat = None
+
+    def create(self, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = get_db()
+        conn.execute(
+            "INSERT INTO screening_jobs (job_id, status, params, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(params), now, now)
+        )
+        conn.commit()
+        with self._lock:
+            self._active.add(job_id)
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+        return job_id
+
+    def set_status(self, job_id, status, error=None):
+        conn = get_db()
+        conn.execute(
+            "UPDATE screening_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            (status, error, time.time(), job_id)
+        )
+        conn.commit()
+        if status in JOB_TERMINAL_STATUSES:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                job_ids = list(self._active)
+            if not job_ids:
+                continue
+            try:
+                conn = get_db()
+                conn.executemany("UPDATE screening_jobs SET updated_at = ? WHERE job_id = ?",
+                                 [(time.time(), job_id) for job_id in job_ids])
+                conn.commit()
+            except sqlite3.Error as e:
+                LOGGER.error(f"Job heartbeat failed: {str(e)}")
+
+    def expire_stale(self):
+        """Marks queued/running jobs without a recent heartbeat as failed. Returns their ids."""
+        conn = get_db()
+        with self._lock:
+            active = set(self._active)
+        rows = conn.execute(
+            "SELECT job_id FROM screening_jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+            (*JOB_TERMINAL_STATUSES, time.time() - self.stale_seconds)
+        ).fetchall()
+        expired = [r["job_id"] for r in rows if r["job_id"] not in active]
+        for job_id in expired:
+            error = "Worker stopped before the job finished"
+            self.add_event(job_id, "error", {"error": error})
+            self.set_status(job_id, "failed", error=error)
+        return expired
+
+    def add_event(self, job_id, event_type, data):
+        conn = get_db()
+        with conn:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM screening_job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO screening_job_events (job_id, seq, event_type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, event_type, json.dumps(data), time.time())
+            )
+        return seq
+
+    def get(self, job_id):
+        row = get_db().execute("SELECT * FROM screening_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def events(self, job_id, after=0):
+        rows = get_db().execute(
+            "SELECT seq, event_type, data FROM screening_job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after)
+        ).fetchall()
+        return [{'seq': r['seq'], 'type': r['event_type'], 'data': json.loads(r['data'])} for r in rows]
+
+JOB_STORE = InMemoryJobStore() if JOB_STORE_BACKEND == "memory" else SQLiteJobStore()
+SCREENING_EXECUTOR = ThreadPoolExecutor(max_workers=SCREENING_JOB_WORKERS, thread_name_prefix="screening")
+
+def run_screening_job(job_id, creds, params):
+    """Worker entry point: runs the pipeline and records every step as a job event."""
+    JOB_STORE.set_status(job_id, "running")
+    try:
+        result = run_screening_pipeline(
+            creds,
+            params["job_description"],
+            params["days_filter"],
+            params["max_messages"],
+            on_event=lambda event_type, data: JOB_STORE.add_event(job_id, event_type, data),
+            model=params.get("model"),
+            temperature=params.get("temperature"),
+            incremental=params.get("incremental", False),
+            keywords=params.get("keywords"),
+            shortlist_top_k=params.get("shortlist_top_k"),
+            shortlist_min_score=params.get("shortlist_min_score"),
+            batch_size=params.get("batch_size"),
+            output_mode=params.get("output_mode")
+        )
+        JOB_STORE.add_event(job_id, "done", {
+            "downloaded": result["downloaded"],
+            "scored": len(result["candidates"]),
+            "job_posting_id": result["job_posting_id"],
+            "prompt_stats": result["prompt_stats"],
+            "timings": result["timings"]
+        })
+        JOB_STORE.set_status(job_id, "completed")
+    except Exception as e:
+        LOGGER.error(f"Screening job {job_id} failed: {str(e)}")
+        JOB_STORE.add_event(job_id, "error", {"error": str(e)})
+        JOB_STORE.set_status(job_id, "failed", error=str(e))
+
+def submit_screening_job(creds, params):
+    """Creates a job record and queues it on the background worker pool."""
+    job_id = JOB_STORE.create(params)
+    SCREENING_EXECUTOR.submit(run_screening_job, job_id, creds, params)
+    return job_id
+
+def get_live_job(job_id):
+    """JOB_STORE.get, after failing the job if the process running it has died."""
+    job = JOB_STORE.get(job_id)
+    if (job and job["status"] not in JOB_TERMINAL_STATUSES
+            and job["updated_at"] < time.time() - JOB_STALE_SECONDS and JOB_STORE.expire_stale()):
+        job = JOB_STORE.get(job_id)
+    return job
+
+def format_sse(event):
+    """Serialises a job event as a Server-Sent Events message."""
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
 # ==================== FLASK ROUTES ====================
+def start_outbox_dispatcher():
+    """Starts email delivery (resuming mail queued before a restart). Only called by the email routes,
+    so pages that never send mail do not need a writable database."""
+    try:
+        OUTBOX_DISPATCHER.start()
+        OUTBOX_DISPATCHER.notify()
+    except Exception as e:
+        LOGGER.error(f"Could not start the outbox dispatcher: {str(e)}")
+
+def start_attachment_janitor():
+    """Starts attachment cleanup; called by the routes that download resumes."""
+    try:
+        ATTACHMENT_JANITOR.start()
+    except Exception as e:
+        LOGGER.error(f"Could not start the attachment janitor: {str(e)}")
+
+@app.before_request
+def start_request_profile():
+    """Opt-in profiling: with PROFILING_ENABLED, ?profile=1 runs the request under cProfile.
+
+    Worker threads started through submit_in_context are profiled too and
+    merged into the same report. Thread pools are named per stage
+    (gmail-download, llm-score, smtp, screening) so py-spy output is easy to
+    map onto the pipeline as well.
+    """
+    if not (PROFILING_ENABLED and request.args.get("profile") == "1"):
+        return
+    g.profile_session = ProfileSession()
+    g.profile_token = _current_profile.set(g.profile_session)
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+@app.after_request
+def finish_request_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    _current_profile.reset(g.pop("profile_token"))
+    profile_session = g.pop("profile_session")
+    profile_session.add(profiler)
+    report = io.StringIO()
+    profile_session.stats.stream = report  # print_stats writes here instead of the process's stdout
+    profile_session.stats.sort_stats("cumulative").print_stats(25)
+    path = os.path.join(PROFILE_FOLDER, f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint}-{uuid.uuid4().hex[:6]}.prof")
+    try:
+        os.makedirs(PROFILE_FOLDER, exist_ok=True)
+        profile_session.stats.dump_stats(path)
+        response.headers["X-Profile-File"] = path
+    except OSError as e:
+        LOGGER.warning("Could not save profile %s: %s", path, e)
+    LOGGER.info("Profile of %s:\n%s", request.endpoint, report.getvalue())
+    return response
+
 @app.route("/")
 def index():
     # Ensure you have an 'index.html' in templates folder; otherwise return a simple message
@@ -417,6 +4183,7 @@ def index():
 @app.route("/authenticate")
 def authenticate():
     """Start OAuth flow using web Flow"""
+    from google_auth_oauthlib.flow import Flow
     flow = Flow.from_client_config(CLIENT_CONFIG, SCOPES)
     flow.redirect_uri = url_for("callback", _external=True)
     authorization_url, state = flow.authorization_url(access_type="offline", include_granted_scopes="true", prompt="consent")
@@ -429,6 +4196,7 @@ def callback():
     if not state or state != request.args.get('state'):
         return jsonify({"error": "Authentication state lost."}), 400
 
+    from google_auth_oauthlib.flow import Flow
     flow = Flow.from_client_config(CLIENT_CONFIG, SCOPES, state=state)
     flow.redirect_uri = url_for("callback", _external=True)
 
@@ -443,15 +4211,20 @@ def callback():
     session['creds'] = creds.to_json()
     return redirect(url_for('index'))
 
-@app.route("/fetch_resumes", methods=["POST"])
-def fetch_resumes():
+def load_session_credentials():
+    """Loads (and refreshes if needed) the Google credentials stored in the session.
+
+    Returns (creds, None) on success or (None, (response, status)) on failure.
+    """
     if 'creds' not in session:
-        return jsonify({"error": "Authentication required"}), 401
+        return None, (jsonify({"error": "Authentication required"}), 401)
 
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
     try:
         creds = Credentials.from_authorized_user_info(json.loads(session['creds']), SCOPES)
     except Exception as e:
-        return jsonify({"error": "Invalid stored credentials", "details": str(e)}), 401
+        return None, (jsonify({"error": "Invalid stored credentials", "details": str(e)}), 401)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -459,89 +4232,315 @@ def fetch_resumes():
                 creds.refresh(Request())
                 session['creds'] = creds.to_json()
             except Exception as e:
-                return jsonify({"error": "Failed to refresh token", "details": str(e)}), 401
+                return None, (jsonify({"error": "Failed to refresh token", "details": str(e)}), 401)
         else:
-            return jsonify({"error": "Authentication token expired or invalid. Please re-authenticate."}), 401
+            return None, (jsonify({"error": "Authentication token expired or invalid. Please re-authenticate."}), 401)
+    return creds, None
 
-    data = request.json or {}
-    job_description = data.get("job_description", "")
-    days_filter = int(data.get("days_filter", 30))
+def _ranged(name, value, low, high):
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+def parse_bool(value):
+    """Strict boolean for JSON bodies and query strings: "false" and "0" are False, unknown values raise ValueError."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("true", "1", "yes", "on"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "0", "no", "off", ""):
+        return False
+    raise ValueError(f"expected a boolean, got {value!r}")
 
-    downloaded_resumes = download_resumes_from_gmail(creds, days_filter)
+def read_screening_params(data):
+    """Normalises the screening options posted by the UI. Returns (params, None) or (None, 400 response).
 
-    if not downloaded_resumes:
+    The model must be in LLM_ALLOWED_MODELS and the temperature snaps to the nearest
+    LLM_TEMPERATURE_CHOICES value, so clients cannot create unbounded LLM clients or metric labels.
+    Counts must lie in their range below; anything else is rejected rather than guessed at.
+    """
+    try:
+        params = {
+            "job_description": data.get("job_description", ""),
+            "days_filter": _ranged("days_filter", int(data.get("days_filter", 30)), 1, 3650),
+            "max_messages": _ranged("max_messages", int(data.get("max_messages", MAX_RESUME_MESSAGES)),
+                                    1, MAX_RESUME_MESSAGES_LIMIT),
+            "model": data.get("model") or LLM_MODEL,
+            "temperature": float(data.get("temperature", LLM_TEMPERATURE)),
+            "incremental": parse_bool(data.get("incremental", False)),
+            "keywords": data.get("keywords"),  # optional {domain: [keywords]} taxonomy
+            "shortlist_top_k": _ranged("shortlist_top_k", int(data.get("shortlist_top_k", SHORTLIST_TOP_K)),
+                                       0, MAX_RESUME_MESSAGES_LIMIT),  # 0 shortlists nobody out
+            "shortlist_min_score": _ranged("shortlist_min_score",
+                                           float(data.get("shortlist_min_score", SHORTLIST_MIN_SCORE)), 0, 100),
+            "batch_size": _ranged("batch_size", int(data.get("batch_size", SCORING_BATCH_SIZE)),
+                                  1, SCORING_BATCH_SIZE_MAX),  # candidates per LLM request
+            "output_mode": data.get("output_mode") or PROFILE_OUTPUT_MODE,
+        }
+        if params["output_mode"] not in ("json", "text"):
+            raise ValueError("output_mode must be 'json' or 'text'")
+        if params["keywords"]:
+            validate_keyword_taxonomy(params["keywords"])
+    except (TypeError, ValueError, OverflowError) as e:
+        return None, (jsonify({"error": f"Invalid screening parameter: {str(e)}"}), 400)
+    if params["model"] not in LLM_ALLOWED_MODELS:
+        return None, (jsonify({"error": f"Unsupported model; choose one of {LLM_ALLOWED_MODELS}"}), 400)
+    if not 0 <= params["temperature"] <= 2:
+        return None, (jsonify({"error": "temperature must be between 0 and 2"}), 400)
+    params["temperature"] = min(LLM_TEMPERATURE_CHOICES, key=lambda t: abs(t - params["temperature"]))
+    return params, None
+
+@app.route("/fetch_resumes", methods=["POST"])
+def fetch_resumes():
+    creds, error = load_session_credentials()
+    if error:
+        return error
+
+    params, error = read_screening_params(request.json or {})
+    if error:
+        return error
+    start_attachment_janitor()
+    result = run_screening_pipeline(
+        creds,
+        params["job_description"],
+        params["days_filter"],
+        params["max_messages"],
+        model=params["model"],
+        temperature=params["temperature"],
+        incremental=params["incremental"],
+        keywords=params["keywords"],
+        shortlist_top_k=params["shortlist_top_k"],
+        shortlist_min_score=params["shortlist_min_score"],
+        batch_size=params["batch_size"],
+        output_mode=params["output_mode"]
+    )
+
+    if not result["downloaded"]:
         return jsonify({"message": "No new resumes found."})
 
-    candidates = []
-    for i, meta in enumerate(downloaded_resumes):
-        filepath = meta.get("filepath")
-        if not filepath or not os.path.exists(filepath):
-            continue
+    return jsonify({
+        "candidates": result["candidates"],
+        "ranking": result["ranking"],
+        "job_posting_id": result["job_posting_id"],
+        "prompt_stats": result["prompt_stats"],
+        "run_id": result["run_id"],
+        "timings": result["timings"]
+    })
 
-        raw_text = extract_text_from_pdf(filepath)
-        if not raw_text:
-            continue
+def read_page_params():
+    """limit/offset query parameters, clamped to the allowed page size. Returns ((limit, offset), error)."""
+    try:
+        limit = max(1, min(int(request.args.get("limit", CANDIDATE_PAGE_SIZE)), CANDIDATE_PAGE_SIZE_MAX))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return None, (jsonify({"error": "limit and offset must be integers"}), 400)
+    return (limit, offset), None
 
-        cleaned_text = clean_text(raw_text)
-        matched_keywords = keyword_match(cleaned_text)
-        candidate_name = extract_candidate_name(filepath)
-        if not candidate_name:
-            first_line = cleaned_text.splitlines()[0].strip() if cleaned_text else ""
-            if first_line and len(first_line) < 60:
-                candidate_name = first_line
-            else:
-                candidate_name = os.path.splitext(os.path.basename(filepath))[0]
+def page_response(key, items, total, limit, offset):
+    return jsonify({
+        key: items,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None
+    })
 
-        email_from_sender = parse_email_from_sender(meta.get("sender", ""))
-        email_from_text, phone_from_text = extract_contact_info(cleaned_text)
-        candidate_email = email_from_sender or email_from_text
-        candidate_phone = phone_from_text
+def query_candidates_from_args(job_posting_id=None):
+    page, error = read_page_params()
+    if error:
+        return error
+    limit, offset = page
+    sort = request.args.get("sort", "hr_score")
+    order = request.args.get("order", "desc").lower()
+    if sort not in CANDIDATE_SORT_COLUMNS:
+        return jsonify({"error": f"sort must be one of {sorted(CANDIDATE_SORT_COLUMNS)}"}), 400
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+    try:
+        min_ats = request.args.get("min_ats_score")
+        min_hr = request.args.get("min_hr_score")
+        min_ats = float(min_ats) if min_ats else None
+        min_hr = float(min_hr) if min_hr else None
+    except ValueError:
+        return jsonify({"error": "min_ats_score and min_hr_score must be numbers"}), 400
+    candidates, total = CANDIDATE_STORE.query_candidates(
+        job_posting_id=job_posting_id or request.args.get("job_posting_id"),
+        min_ats_score=min_ats,
+        min_hr_score=min_hr,
+        search=request.args.get("q"),
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset
+    )
+    return page_response("candidates", candidates, total, limit, offset)
 
-        profile = generate_candidate_profile_hr(
-            job_description,
-            cleaned_text,
-            matched_keywords,
-            candidate_name,
-            candidate_email,
-            candidate_phone,
-        )
+@app.route("/job_postings")
+def list_job_postings():
+    """Screened job descriptions, most recently screened first, with candidate counts and score averages."""
+    page, error = read_page_params()
+    if error:
+        return error
+    limit, offset = page
+    postings, total = CANDIDATE_STORE.list_job_postings(limit, offset)
+    return page_response("job_postings", postings, total, limit, offset)
 
-        if profile.startswith("Error") or profile.startswith("Failed") or profile == "LLM initialization failed":
-            print(f"Failed to generate profile for {candidate_name}: {profile}")
-            continue
+@app.route("/job_postings/<job_posting_id>/candidates")
+def list_job_posting_candidates(job_posting_id):
+    """Stored candidates for one job posting.
 
-        sections = parse_hr_response_sections(profile)
-        summary, justification = extract_subsections_hr_summary_justification(sections.get("hr_summary_justification", ""))
-        sections["hr_summary"] = summary
-        sections["justification"] = justification
-        sections["recommendation"] = style_recommendation_subheadings(sections.get("recommendation", ""))
+    Query: sort=hr_score|ats_score|prescreen_score|updated_at|name, order=desc|asc,
+    min_ats_score, min_hr_score, q (name/email/file search), limit, offset.
+    """
+    if not CANDIDATE_STORE.get_job_posting(job_posting_id):
+        return jsonify({"error": "Unknown job posting id"}), 404
+    return query_candidates_from_args(job_posting_id)
 
-        ats_score = None
-        hr_score = None
-        ats_json_text = sections.get("ats_json", "")
-        if ats_json_text:
-            try:
-                ats_list = json.loads(ats_json_text)
-                if ats_list and isinstance(ats_list[0], dict):
-                    ats_score = ats_list[0].get("ats_score")
-                    hr_score = ats_list[0].get("hr_score")
-            except Exception as e:
-                print(f"Could not parse ATS JSON for {candidate_name}: {e}")
-
-        sections["ats_score"] = ats_score
-        sections["hr_score"] = hr_score
-
-        candidates.append({
-            "name": candidate_name,
-            "email": candidate_email,
-            "phone": candidate_phone,
-            "filename": meta.get("original_filename", ""),
-            "sender": meta.get("sender", ""),
-            "subject": meta.get("subject", ""),
-            "sections": sections
+@app.route("/candidates")
+def list_candidates():
+    """Stored candidates across all job postings; same filters as /job_postings/<id>/candidates plus job_posting_id."""
+    return query_candidates_from_args()
+
+@app.route("/screening_jobs", methods=["POST"])
+def create_screening_job():
+    """Starts a background screening run and returns its job id immediately."""
+    creds, error = load_session_credentials()
+    if error:
+        return error
+
+    params, error = read_screening_params(request.json or {})
+    if error:
+        return error
+    start_attachment_janitor()
+    job_id = submit_screening_job(creds, params)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("get_screening_job", job_id=job_id),
+        "events_url": url_for("stream_screening_job", job_id=job_id)
+    }), 202
+
+def read_event_cursor(value):
+    """The `after` / Last-Event-ID sequence number. Returns (after, None) or (None, 400 response)."""
+    try:
+        after = int(value or 0)
+    except ValueError:
+        after = -1
+    if after < 0:
+        return None, (jsonify({"error": "after / Last-Event-ID must be a non-negative integer"}), 400)
+    return after, None
+
+@app.route("/screening_jobs/<job_id>")
+def get_screening_job(job_id):
+    """Polling endpoint: job status plus every event after the `after` sequence number."""
+    job = get_live_job(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job id"}), 404
+    after, error = read_event_cursor(request.args.get("after"))
+    if error:
+        return error
+    events = JOB_STORE.events(job_id, after)
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "error": job["error"],
+        "events": events,
+        "next_after": events[-1]["seq"] if events else after
+    })
+
+@app.route("/screening_jobs/<job_id>/events")
+def stream_screening_job(job_id):
+    """Server-Sent Events stream of a job's progress; each candidate is sent as soon as it is scored.
+
+    The stream closes after SSE_MAX_STREAM_SECONDS; clients resume with Last-Event-ID."""
+    if not get_live_job(job_id):
+        return jsonify({"error": "Unknown job id"}), 404
+    after, error = read_event_cursor(request.headers.get("Last-Event-ID") or request.args.get("after"))
+    if error:
+        return error
+
+    def generate(after):
+        last_sent = started = time.monotonic()
+        while time.monotonic() - started < SSE_MAX_STREAM_SECONDS:
+            job = get_live_job(job_id)
+            events = JOB_STORE.events(job_id, after)
+            for event in events:
+                yield format_sse(event)
+                after = event["seq"]
+                last_sent = time.monotonic()
+            if job["status"] in JOB_TERMINAL_STATUSES and not events:
+                return
+            if time.monotonic() - last_sent > SSE_HEARTBEAT_INTERVAL:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(SSE_POLL_INTERVAL)
+
+    return Response(generate(after), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify({
+        "profile_cache": PROFILE_CACHE.stats(),
+        "semantic_index": SEMANTIC_INDEX.stats(),
+        "attachments": ATTACHMENT_STORE.stats()
+    })
+
+@app.route("/semantic_search", methods=["POST"])
+def semantic_search():
+    """Best-matching past applicants for a job description, from the local embedding index (no LLM call)."""
+    data = request.json or {}
+    job_description = data.get("job_description")
+    if not job_description:
+        return jsonify({"error": "job_description is required"}), 400
+    try:
+        top_n = max(1, min(int(data.get("top_n", SEMANTIC_SEARCH_TOP_N)), CANDIDATE_PAGE_SIZE_MAX))
+        min_score = float(data.get("min_score", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_n and min_score must be numbers"}), 400
+
+    start = time.perf_counter()
+    with span("semantic.search"):
+        matches = SEMANTIC_INDEX.search(job_description, top_n, min_score)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    details = SEMANTIC_INDEX.describe([h for h, _ in matches])
+    latest = CANDIDATE_STORE.latest_scores_by_email(
+        [details[h]["email"] for h, _ in matches if h in details and details[h]["email"]]
+    )
+    results = []
+    for content_hash, score in matches:
+        row = details.get(content_hash, {})
+        previous = latest.get((row.get("email") or "").lower(), {})
+        results.append({
+            "content_hash": content_hash,
+            "semantic_score": score,
+            "name": row.get("name"),
+            "email": row.get("email"),
+            "phone": row.get("phone"),
+            "filename": row.get("filename"),
+            "sender": row.get("sender"),
+            "indexed_at": row.get("indexed_at"),
+            "last_ats_score": previous.get("ats_score"),
+            "last_hr_score": previous.get("hr_score"),
+            "last_job_posting_id": previous.get("job_posting_id"),
         })
+    return jsonify({
+        "results": results,
+        "searched": SEMANTIC_INDEX.stats()["resumes"],
+        "elapsed_ms": round(elapsed_ms, 2)
+    })
 
-    return jsonify({"candidates": candidates})
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latency histograms and pipeline counters."""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/llm/metrics")
+def llm_metrics():
+    return jsonify({"models": LLM_METRICS.snapshot(), "prompts": PROMPT_STATS.snapshot()})
 
 @app.route("/send_email", methods=["POST"])
 def send_email_route():
@@ -556,17 +4555,87 @@ def send_email_route():
 
     job_title = infer_job_title_from_jd(job_description)
 
-    if email_type == "accept":
-        subject, body = get_acceptance_email(candidate_name, job_title)
-    elif email_type == "reject":
-        subject, body = get_rejection_email(candidate_name, job_title)
-    else:
+    if email_type not in EMAIL_TEMPLATES:
         return jsonify({"success": False, "message": "Invalid email type."}), 400
+    subject, body = EMAIL_TEMPLATES[email_type](candidate_name, job_title)
 
-    if send_email(candidate_email, subject, body):
-        return jsonify({"success": True, "message": f"{email_type.capitalize()} email sent successfully!"})
+    # Delivery happens in the background; a repeated click returns the existing entry
+    key = data.get("idempotency_key") or email_idempotency_key(candidate_email, job_description, email_type)
+    row, created = EMAIL_OUTBOX.enqueue(candidate_email, subject, body, key)
+    start_outbox_dispatcher()
+    if created:
+        message = f"{email_type.capitalize()} email queued for sending."
+    elif row["status"] == "sent":
+        message = f"{email_type.capitalize()} email was already sent to this candidate."
     else:
-        return jsonify({"success": False, "message": "Failed to send email."})
+        message = f"{email_type.capitalize()} email is already {row['status']} for this candidate."
+    return jsonify({"success": row["status"] != "failed", "message": message, "duplicate": not created, **outbox_record(row)}), (202 if created else 200)
+
+@app.route("/outbox")
+def list_outbox():
+    """Recent outbox entries, optionally filtered by ?status=queued|sending|sent|failed."""
+    limit = min(int(request.args.get("limit", 100)), 1000)
+    start_outbox_dispatcher()
+    rows = EMAIL_OUTBOX.list(request.args.get("status"), limit)
+    return jsonify({"counts": EMAIL_OUTBOX.counts(), "emails": [outbox_record(r) for r in rows]})
+
+@app.route("/outbox/<outbox_id>")
+def get_outbox_email(outbox_id):
+    """Delivery status of one queued email."""
+    row = EMAIL_OUTBOX.get(outbox_id)
+    if not row:
+        return jsonify({"error": "Unknown outbox id"}), 404
+    return jsonify(outbox_record(row))
+
+@app.route("/send_emails_bulk", methods=["POST"])
+def send_emails_bulk_route():
+    """Queues accept/reject emails for many candidates in the durable outbox.
+
+    Body: {"job_description": str, "candidates": [{"email", "name", "type", "idempotency_key"?}]}.
+    Each valid candidate is enqueued like /send_email (same idempotency key, so
+    a repeated request queues nothing twice); delivery, retries and backoff
+    happen in the outbox dispatcher. Returns one outbox entry per candidate.
+    """
+    data = request.json or {}
+    job_description = data.get("job_description")
+    candidates = data.get("candidates") or []
+    if not job_description or not candidates:
+        return jsonify({"success": False, "message": "Missing required data."}), 400
+
+    job_title = infer_job_title_from_jd(job_description)
+    results = []
+    for candidate in candidates:
+        email_type = candidate.get("type")
+        if not candidate.get("email") or not candidate.get("name") or email_type not in EMAIL_TEMPLATES:
+            results.append({
+                "email": candidate.get("email"),
+                "type": email_type,
+                "success": False,
+                "error": "Missing or invalid candidate data."
+            })
+            continue
+        subject, body = EMAIL_TEMPLATES[email_type](candidate["name"], job_title)
+        key = candidate.get("idempotency_key") or email_idempotency_key(candidate["email"], job_description, email_type)
+        row, created = EMAIL_OUTBOX.enqueue(candidate["email"], subject, body, key)
+        results.append({
+            "email": candidate["email"],
+            "type": email_type,
+            "success": row["status"] != "failed",
+            "duplicate": not created,
+            **outbox_record(row)
+        })
+    start_outbox_dispatcher()
+
+    queued = sum(1 for r in results if r["success"] and not r.get("duplicate"))
+    invalid = sum(1 for r in results if "outbox_id" not in r)
+    return jsonify({
+        "success": invalid == 0,
+        "queued": queued,
+        "duplicates": sum(1 for r in results if r.get("duplicate")),
+        "invalid": invalid,
+        "outbox_ids": [r["outbox_id"] for r in results if "outbox_id" in r],
+        "results": results
+    }), (202 if queued else 200)
 
 # if __name__ == "__main__":
 #     # Debug mode useful while developing; keep HTTPS/ngrok+secure production later.
@@ -0,0 +1,76 @@
+"""Benchmark: Gmail resume download throughput against a local fake Gmail stub.
+
+Compares the previous one-raw-message-at-a-time loop with the batched,
+concurrent download engine in api/main.py and reports messages per second
+and response bytes. --extra-attachment-kb adds a large non-resume attachment
+to every mail, which the raw loop downloads and the engine skips.
+
+    python benchmarks/bench_gmail_download.py --messages 300 --latency 0.02 --extra-attachment-kb 512
+"""
+import argparse
+import base64
+import email
+import email.policy
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+import main  # noqa: E402
+from fakes import FakeGmailService  # noqa: E402
+
+
+def sequential_raw_download(service, limit, folder):
+    """The previous strategy: list once, then one format='raw' get per message."""
+    messages = service.users().messages().list(userId="me", q="").execute().get("messages", [])
+    saved = 0
+    for msg in messages[:limit]:
+        raw = service.users().messages().get(userId="me", id=msg["id"], format="raw").execute()["raw"]
+        mime_msg = email.message_from_bytes(base64.urlsafe_b64decode(raw.encode("ASCII")), policy=email.policy.default)
+        for part in mime_msg.walk():
+            filename = part.get_filename()
+            if filename and filename.lower().endswith(".pdf"):
+                with open(os.path.join(folder, f"{msg['id']}_{filename}"), "wb") as f:
+                    f.write(part.get_payload(decode=True))
+                saved += 1
+    return saved
+
+
+def run(label, fn, service, num_messages):
+    start = time.perf_counter()
+    files = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {num_messages:>6} msgs  {elapsed:8.2f}s  {num_messages / elapsed:10.1f} msg/s  "
+          f"{service.calls:>5} round trips  {service.bytes_transferred / 2 ** 20:8.1f} MB  {files} files")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per HTTP round trip")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--extra-attachment-kb", type=int, default=0, help="non-resume attachment size per mail")
+    args = parser.parse_args()
+    extra = args.extra_attachment_kb * 1024
+
+    # The legacy loop never looked past the first page, so give it one page with everything
+    legacy = FakeGmailService(args.messages, args.latency, page_size=args.messages, extra_attachment_bytes=extra)
+    with tempfile.TemporaryDirectory() as folder:
+        run("sequential raw (legacy)", lambda: sequential_raw_download(legacy, args.messages, folder),
+            legacy, args.messages)
+
+    for workers in args.workers:
+        service = FakeGmailService(args.messages, args.latency, extra_attachment_bytes=extra)
+        with tempfile.TemporaryDirectory() as folder:
+            main.TEMPORARY_FOLDER = folder
+            main.DATABASE_PATH = os.path.join(folder, "bench.db")
+            main.GMAIL_DOWNLOAD_WORKERS = workers
+            # Every fake sender is distinct, so the engine downloads one attachment per message
+            fn = lambda: len(main.download_resumes_from_gmail(None, 30, args.messages, service_factory=lambda: service))
+            run(f"batched engine, {workers} workers", fn, service, args.messages)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,177 @@
+"""Benchmark: the whole /fetch_resumes -> /send_email flow against local fakes.
+
+Gmail, Groq and SMTP are replaced by the stand-ins in fakes.py, and the
+Flask app is driven through its test client with a pre-authorised session.
+Every batch size runs in a fresh data folder, so no cache carries over.
+The benchmark reports time per pipeline stage and resumes per minute.
+
+    python benchmarks/bench_pipeline.py --messages 100 --llm-latency 0.5 --batch-sizes 1 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+import main  # noqa: E402
+from fakes import FakeChatGroq, FakeGmailService, SMTPSink  # noqa: E402
+
+JOB_DESCRIPTION = """We are looking for a Data Engineer.
+Requirements: Python, SQL, ETL, PySpark, AWS, data pipelines, dashboards.
+Responsibilities: build and maintain batch and streaming pipelines, data quality checks."""
+
+# A syntactically valid authorised-user credential; nothing ever calls Google with it
+FAKE_CREDENTIALS = {
+    "token": "fake-token",
+    "refresh_token": "fake-refresh-token",
+    "client_id": "fake-client",
+    "client_secret": "fake-secret",
+    "token_uri": "https://oauth2.googleapis.com/token",
+    "expiry": "2099-01-01T00:00:00Z",  # never refreshed
+}
+
+# Pipeline stages timed by wrapping the module-level functions run_screening_pipeline calls
+STAGES = ["download_resumes_from_gmail", "extract_attachment_texts", "shortlist_candidates", "score_candidates"]
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return timed
+
+
+def configure(folder, args, gmail, llm, smtp):
+    """Points the app at the temp folder and the fakes."""
+    main.TEMPORARY_FOLDER = os.path.join(folder, "resumes")
+    main.DATABASE_PATH = os.path.join(folder, "bench.db")
+    main.TEXT_CACHE_FOLDER = os.path.join(folder, "text_cache")
+    main.build_gmail_service = lambda creds: gmail
+    main.get_llm = lambda model=None, temperature=None: llm
+    main.LLM_RATE_LIMITER = main.LLMRateLimiter(args.rpm, args.tpm)
+    main.LLM_MAX_CONCURRENCY = args.llm_workers
+    main.SMTP_SERVER, main.SMTP_PORT = "127.0.0.1", str(smtp.port)
+    main.EMAIL_PASSWORD = None
+    main.SMTP_ALLOW_PLAINTEXT = True  # the local sink speaks plain SMTP
+    main.SMTP_MESSAGES_PER_MINUTE = args.smtp_rate
+    main.OUTBOX_POLL_INTERVAL = 0.05
+    main._EMAIL_SENDER = None
+
+
+def wait_for_outbox(expected, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        counts = main.EMAIL_OUTBOX.counts()
+        if counts.get("sent", 0) + counts.get("failed", 0) >= expected:
+            return counts
+        time.sleep(0.02)
+    return main.EMAIL_OUTBOX.counts()
+
+
+def run_once(args, batch_size, smtp):
+    gmail = FakeGmailService(args.messages, args.gmail_latency, unique=True, seed=args.seed)
+    llm = FakeChatGroq(args.llm_latency, args.rate_limit_rate, args.retry_after, seed=args.seed)
+    timer = StageTimer()
+    originals = {name: getattr(main, name) for name in STAGES}
+    sent_before = smtp.messages
+    with tempfile.TemporaryDirectory() as folder:
+        configure(folder, args, gmail, llm, smtp)
+        for name in STAGES:
+            setattr(main, name, timer.wrap(name, originals[name]))
+        try:
+            client = main.app.test_client()
+            with client.session_transaction() as session:
+                session["creds"] = json.dumps(FAKE_CREDENTIALS)
+
+            with timer.stage("fetch_resumes (total)"):
+                response = client.post("/fetch_resumes", json={
+                    "job_description": JOB_DESCRIPTION,
+                    "max_messages": args.messages,
+                    "batch_size": batch_size,
+                    "output_mode": args.output_mode,
+                })
+            candidates = response.get_json().get("candidates", [])
+
+            with timer.stage("send_email (enqueue)"):
+                for i, candidate in enumerate(candidates):
+                    client.post("/send_email", json={
+                        "email": candidate["email"] or f"applicant{i}@example.com",
+                        "name": candidate["name"],
+                        "job_description": JOB_DESCRIPTION,
+                        "type": "accept" if i % 2 == 0 else "reject",
+                    })
+            with timer.stage("send_email (delivered)"):
+                counts = wait_for_outbox(len(candidates))
+        finally:
+            for name, fn in originals.items():
+                setattr(main, name, fn)
+
+    fetch_seconds = timer.seconds["fetch_resumes (total)"]
+    return {
+        "batch_size": batch_size,
+        "scored": len(candidates),
+        "stages": dict(timer.seconds),
+        "gmail_round_trips": gmail.calls,
+        "llm_calls": llm.calls,
+        "llm_429s": llm.rate_limited,
+        "emails_sent": smtp.messages - sent_before,
+        "outbox": counts,
+        "resumes_per_minute": 60.0 * len(candidates) / fetch_seconds if fetch_seconds else 0.0,
+    }
+
+
+def report(result):
+    print(f"\nbatch_size={result['batch_size']}  scored={result['scored']}  "
+          f"gmail round trips={result['gmail_round_trips']}  llm calls={result['llm_calls']} "
+          f"({result['llm_429s']} x 429)  emails sent={result['emails_sent']}")
+    for name, seconds in result["stages"].items():
+        print(f"  {name:<32} {seconds:8.2f}s")
+    print(f"  {'throughput':<32} {result['resumes_per_minute']:8.1f} resumes/min")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=60)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--output-mode", choices=["json", "text"], default="json")
+    parser.add_argument("--gmail-latency", type=float, default=0.02, help="seconds per Gmail round trip")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per LLM call")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05, help="share of LLM calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--llm-workers", type=int, default=main.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--rpm", type=int, default=10000, help="client-side requests-per-minute limit")
+    parser.add_argument("--tpm", type=int, default=10000000, help="client-side tokens-per-minute limit")
+    parser.add_argument("--smtp-rate", type=int, default=6000, help="SMTP messages per minute")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    smtp = SMTPSink().start()
+    results = [run_once(args, batch_size, smtp) for batch_size in args.batch_sizes]
+    smtp.shutdown()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            report(result)
+
+
+if __name__ == "__main__":
+    main_cli()
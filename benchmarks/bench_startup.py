@@ -0,0 +1,128 @@
+"""Benchmark: cold-start cost of importing the app and of the first request to each route.
+
+Every scenario runs in a fresh interpreter started with `-X importtime`.
+The child writes markers to stderr around `import main`, so module loads
+are split between app import and the first request. The report lists the
+slowest modules of each phase. This is the cost a serverless instance pays
+before it can answer.
+
+    python benchmarks/bench_startup.py --routes / /send_email /semantic_search --top 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+API_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+STARTED = "--- bench_startup: interpreter ready ---"
+MARKER = "--- bench_startup: main imported ---"
+
+JOB_DESCRIPTION = "Data Engineer: Python, SQL, ETL, PySpark, AWS."
+
+# (method, path, JSON body) for each route the benchmark knows how to call without network access
+ROUTES = {
+    "/": ("GET", "/", None),
+    "/metrics": ("GET", "/metrics", None),
+    "/cache/stats": ("GET", "/cache/stats", None),
+    "/candidates": ("GET", "/candidates", None),
+    "/send_email": ("POST", "/send_email", {
+        "email": "applicant@example.com", "name": "Applicant", "job_description": JOB_DESCRIPTION, "type": "accept",
+    }),
+    "/semantic_search": ("POST", "/semantic_search", {"job_description": JOB_DESCRIPTION, "top_n": 5}),
+    # Not a route: what /fetch_resumes pays before its first Gmail call
+    "gmail_service": ("CALL", "build_gmail_service", None),
+}
+
+CHILD = """
+import json, sys, time
+sys.stderr.write({started!r} + "\\n")
+sys.path.insert(0, {api!r})
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+method, path, body = {route!r}
+start = time.perf_counter()
+if method == "CALL":
+    from google.oauth2.credentials import Credentials
+    main.build_gmail_service(Credentials(token="t", refresh_token="r", client_id="c"))
+    status = 0
+else:
+    client = main.app.test_client()
+    status = (client.post(path, json=body) if method == "POST" else client.get(path)).status_code
+request_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_ms": import_ms, "request_ms": request_ms, "status": status}}))
+"""
+
+
+def parse_importtime(lines, depth=0):
+    """[(cumulative_us, module)] for the imports nested `depth` levels deep in `-X importtime` output lines."""
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by two spaces of indentation per level (after the one separator space)
+        if (len(name) - len(name.lstrip()) - 1) // 2 == depth:
+            modules.append((int(cumulative_us), name.strip()))
+    return modules
+
+
+def run_scenario(name, data_folder):
+    env = dict(os.environ, DATA_FOLDER=data_folder, DATABASE_PATH=os.path.join(data_folder, "bench.db"),
+               TEMPORARY_FOLDER=os.path.join(data_folder, "resumes"), PYTHONDONTWRITEBYTECODE="1")
+    code = CHILD.format(api=API_FOLDER, started=STARTED, marker=MARKER, route=ROUTES[name])
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, env=env, cwd=API_FOLDER)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{proc.stderr[-2000:]}")
+    stderr = proc.stderr.splitlines()
+    # Interpreter startup (site, encodings) comes before STARTED and is not the app's cost
+    stderr = stderr[stderr.index(STARTED) + 1:] if STARTED in stderr else stderr
+    split = stderr.index(MARKER) if MARKER in stderr else len(stderr)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update(
+        route=name,
+        startup=parse_importtime(stderr[:split], depth=1),  # what `import main` pulls in directly
+        request=parse_importtime(stderr[split:]),
+    )
+    return result
+
+
+def report(result, top):
+    print(f"\n{result['route']}  (status {result['status']})")
+    for phase, ms in (("startup", result["import_ms"]), ("request", result["request_ms"])):
+        modules = sorted(result[phase], reverse=True)
+        imported_ms = sum(m[0] for m in modules) / 1000
+        print(f"  {phase:<8} {ms:8.1f} ms wall, {imported_ms:8.1f} ms importing {len(modules)} modules")
+        for cumulative_us, name in modules[:top]:
+            print(f"      {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--top", type=int, default=5, help="slowest modules listed per phase")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per route; the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.routes:
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as folder:
+                runs.append(run_scenario(name, folder))
+        results.append(min(runs, key=lambda r: r["import_ms"] + r["request_ms"]))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            report(result, args.top)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,411 @@
+"""Local stand-ins for external services, used by the benchmarks.
+
+FakeGmailService mimics the subset of the googleapiclient Gmail resource used
+by api/main.py. Messages are real MIME messages built from the PDFs in
+temp_resumes/, and every HTTP round trip sleeps for `latency` seconds so that
+batching and concurrency show up in the numbers.
+
+FakeChatGroq answers profile prompts with well-formed (single, batched,
+repair or section-header) responses after a configurable latency and can
+inject HTTP 429 errors. SMTPSink is a minimal local SMTP server that accepts
+and counts messages, like an aiosmtpd debugging server.
+"""
+import base64
+import glob
+import json
+import os
+import random
+import re
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESUME_FOLDER = os.path.join(ROOT, "temp_resumes")
+
+
+def load_sample_pdfs(folder=RESUME_FOLDER):
+    """Returns (filename, bytes) for every PDF in the sample folder, without the numeric prefix."""
+    pdfs = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.pdf"))):
+        name = os.path.basename(path)
+        if "_" in name and name.split("_")[0].isdigit():
+            name = name.split("_", 1)[1]
+        with open(path, "rb") as f:
+            pdfs.append((name, f.read()))
+    return pdfs
+
+
+def personalize_pdf(pdf_bytes, index):
+    """Stamps a unique line onto the first page so every resume has distinct bytes and text."""
+    import fitz  # PyMuPDF
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        doc[0].insert_text((36, 24), f"Applicant {index} - applicant{index}@example.com - ref {index:06d}", fontsize=8)
+        return doc.tobytes()
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode("ASCII")
+
+
+def build_mime_message(index, filename, pdf_bytes):
+    """Builds an application mail with one PDF attachment."""
+    msg = EmailMessage()
+    msg["From"] = f"Applicant {index} <applicant{index}@example.com>"
+    msg["To"] = "hr@example.com"
+    msg["Subject"] = f"Job application - resume {index}"
+    msg.set_content("Please find my resume attached.")
+    msg.add_attachment(pdf_bytes, maintype="application", subtype="pdf", filename=filename)
+    return msg
+
+
+class FakeRequest:
+    """A deferred API call; `execute()` pays one round trip of latency."""
+
+    def __init__(self, service, fn):
+        self._service = service
+        self._fn = fn
+
+    def execute(self, num_retries=0):
+        self._service.round_trip()
+        return self._service.transfer(self._fn())
+
+
+class FakeBatch:
+    """Batch HTTP request: many calls, one round trip."""
+
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request_id, request))
+
+    def execute(self):
+        self._service.round_trip()
+        for request_id, request in self._requests:
+            try:
+                response, exception = self._service.transfer(request._fn()), None
+            except Exception as e:
+                response, exception = None, e
+            self._callback(request_id, response, exception)
+
+
+class FakeGmailService:
+    """In-memory Gmail API stub serving MIME messages built from sample PDFs."""
+
+    def __init__(self, num_messages=200, latency=0.02, page_size=100, seed=0, unique=False,
+                 extra_attachment_bytes=0):
+        self.latency = latency
+        self.page_size = page_size
+        self.calls = 0
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
+        self._messages = {}
+        self._attachments = {}
+        self._order = []
+        self._history_id = 1000
+        rng = random.Random(seed)
+        pdfs = load_sample_pdfs()
+        for i in range(num_messages):
+            filename, pdf_bytes = pdfs[rng.randrange(len(pdfs))]
+            if unique:
+                pdf_bytes = personalize_pdf(pdf_bytes, i)
+            msg = build_mime_message(i, filename, pdf_bytes)
+            if extra_attachment_bytes:
+                # A large non-resume attachment the lean fetch path should never download
+                msg.add_attachment(rng.randbytes(extra_attachment_bytes), maintype="application",
+                                   subtype="zip", filename=f"portfolio_{i}.zip")
+            self.add_message(msg)
+
+    # ---- stub bookkeeping ----
+    def round_trip(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def transfer(self, response):
+        """Counts the JSON size of a response, as a proxy for bytes on the wire."""
+        size = len(json.dumps(response))
+        with self._lock:
+            self.bytes_transferred += size
+        return response
+
+    def add_message(self, mime_msg):
+        msg_id = f"{len(self._order):016x}"
+        self._history_id += 1
+        self._messages[msg_id] = {"mime": mime_msg, "historyId": str(self._history_id)}
+        self._order.insert(0, msg_id)  # newest first, like Gmail
+        return msg_id
+
+    def _payload(self, msg_id, part, counter, inline_data=True):
+        filename = part.get_filename() or ""
+        headers = [{"name": k, "value": str(v)} for k, v in part.items()]
+        payload = {"mimeType": part.get_content_type(), "filename": filename, "headers": headers, "body": {"size": 0}}
+        if part.is_multipart():
+            payload["parts"] = [self._payload(msg_id, p, counter, inline_data) for p in part.iter_parts()]
+        elif filename:
+            data = part.get_payload(decode=True)
+            attachment_id = f"{msg_id}-att{len(counter)}"
+            counter.append(attachment_id)
+            self._attachments[attachment_id] = data
+            payload["body"] = {"attachmentId": attachment_id, "size": len(data)}
+        else:
+            data = part.get_payload(decode=True) or b""
+            payload["body"] = {"size": len(data), "data": _b64(data)} if inline_data else {"size": len(data)}
+        return payload
+
+    def _get(self, msg_id, format="full", metadataHeaders=None, fields=None):
+        record = self._messages[msg_id]
+        mime_msg = record["mime"]
+        result = {"id": msg_id, "threadId": msg_id, "historyId": record["historyId"]}
+        if format == "raw":
+            result["raw"] = _b64(mime_msg.as_bytes())
+        elif format == "metadata":
+            wanted = {h.lower() for h in (metadataHeaders or [])}
+            result["payload"] = {"headers": [
+                {"name": k, "value": str(v)} for k, v in mime_msg.items() if not wanted or k.lower() in wanted
+            ]}
+        else:
+            # A `fields` mask without body data (the lean structure fetch) leaves inline bodies out
+            result["payload"] = self._payload(msg_id, mime_msg, [], inline_data=not fields or "data" in fields)
+        return result
+
+    def _list(self, q=None, maxResults=100, pageToken=None):
+        start = int(pageToken or 0)
+        size = min(maxResults, self.page_size)
+        ids = self._order[start:start + size]
+        result = {"messages": [{"id": i, "threadId": i} for i in ids], "resultSizeEstimate": len(self._order)}
+        if start + size < len(self._order):
+            result["nextPageToken"] = str(start + size)
+        return result
+
+    # ---- googleapiclient surface ----
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def attachments(self):
+        return _FakeAttachments(self)
+
+    def history(self):
+        return _FakeHistory(self)
+
+    def getProfile(self, userId="me", **kwargs):
+        return FakeRequest(self, lambda: {"emailAddress": "hr@example.com", "historyId": str(self._history_id)})
+
+    def list(self, userId="me", q=None, maxResults=100, pageToken=None, **kwargs):
+        return FakeRequest(self, lambda: self._list(q, maxResults, pageToken))
+
+    def get(self, userId="me", id=None, format="full", metadataHeaders=None, fields=None, **kwargs):
+        return FakeRequest(self, lambda: self._get(id, format, metadataHeaders, fields))
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+class _FakeAttachments:
+    def __init__(self, service):
+        self._service = service
+
+    def get(self, userId="me", messageId=None, id=None, **kwargs):
+        data = self._service._attachments[id]
+        return FakeRequest(self._service, lambda: {"size": len(data), "data": _b64(data)})
+
+
+class _FakeHistory:
+    def __init__(self, service):
+        self._service = service
+
+    def _list(self, start_history_id, page_token):
+        added = [
+            {"id": record["historyId"], "messagesAdded": [{"message": {"id": msg_id, "labelIds": ["INBOX"]}}]}
+            for msg_id, record in self._service._messages.items()
+            if int(record["historyId"]) > int(start_history_id)
+        ]
+        start = int(page_token or 0)
+        page = added[start:start + self._service.page_size]
+        result = {"history": page, "historyId": str(self._service._history_id)}
+        if start + self._service.page_size < len(added):
+            result["nextPageToken"] = str(start + self._service.page_size)
+        return result
+
+    def list(self, userId="me", startHistoryId=None, historyTypes=None, pageToken=None, **kwargs):
+        return FakeRequest(self._service, lambda: self._list(startHistoryId, pageToken))
+
+
+# ---- Groq ----
+class FakeRateLimitError(Exception):
+    """Looks like the Groq client's 429 error: status_code plus a response carrying Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__("Error code: 429 - rate_limit_exceeded")
+        self.status_code = 429
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}})()
+
+
+class FakeMessage:
+    def __init__(self, content, prompt_tokens=0, completion_tokens=0):
+        self.content = content
+        self.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens} if (
+            prompt_tokens or completion_tokens) else None
+        self.response_metadata = {}
+
+
+PROFILE_TEXT = """Basic Information:
+- Name: {name}
+- Total years of experience: 4
+Strengths & Weaknesses:
+- **Strength:** Python and SQL pipelines
+- **Weakness:** Limited cloud exposure
+HR Summary & Justification:
+**HR Summary:** Solid data engineering background.
+**Justification:** Built ETL jobs matching the JD.
+Recommendation:
+**Why Select This Candidate:** Strong fit. **Why Not Select This Candidate:** Junior in cloud. **Additional Future Potential:** Can grow.
+ATS Evaluation JSON:
+[{{"name": "{name}", "ats_score": {ats_score}, "hr_score": {hr_score}}}]
+JD-Based Interview Questions & Resume Match Evaluation:
+1. Describe an ETL pipeline you built. **Match level:** Clear **Explanation:** Resume lists ETL work.
+"""
+
+
+class FakeChatGroq:
+    """Stand-in for ChatGroq: invoke() / stream() with simulated latency and 429 injection.
+
+    Each call sleeps `latency` seconds; with probability `rate_limit_rate`
+    it raises a 429 carrying Retry-After `retry_after` instead.
+    """
+
+    def __init__(self, latency=0.5, rate_limit_rate=0.0, retry_after=0.1, model_name="fake-groq", seed=0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.model_name = model_name
+        self.calls = 0
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _profile(self, fields=None):
+        with self._lock:
+            profile = {
+                "basic_info": "- Name: Applicant\n- Total years of experience: 4",
+                "strengths_weaknesses": "- **Strength:** Python and SQL pipelines\n- **Weakness:** Limited cloud exposure",
+                "hr_summary": "Solid data engineering background.",
+                "justification": "Built ETL jobs matching the JD.",
+                "recommendation": "**Why Select This Candidate:** Strong fit. **Why Not Select This Candidate:** "
+                                  "Junior in cloud. **Additional Future Potential:** Can grow.",
+                "ats_score": self._rng.randint(40, 95),
+                "hr_score": self._rng.randint(4, 9),
+                "interview_questions": "1. Describe an ETL pipeline you built. **Match level:** Clear",
+            }
+        return {k: v for k, v in profile.items() if not fields or k in fields}
+
+    def _answer(self, prompt):
+        if "Some fields of a candidate evaluation" in prompt:
+            fields = re.findall(r'^"(\w+)":', prompt, flags=re.MULTILINE)
+            return json.dumps(self._profile(fields))
+        if "JSON array" in prompt:
+            ids = re.findall(r"^Candidate (C\d+):", prompt, flags=re.MULTILINE)
+            return json.dumps([dict(self._profile(), id=i) for i in ids], indent=1)
+        if "JSON object" in prompt:
+            return "```json\n" + json.dumps(self._profile(), indent=1) + "\n```"
+        profile = self._profile()
+        return PROFILE_TEXT.format(name="Applicant", ats_score=profile["ats_score"], hr_score=profile["hr_score"])
+
+    def _call(self, prompt):
+        with self._lock:
+            self.calls += 1
+            limited = self._rng.random() < self.rate_limit_rate
+            self.rate_limited += int(limited)
+        if limited:
+            time.sleep(0.01)
+            raise FakeRateLimitError(self.retry_after)
+        time.sleep(self.latency)
+        return self._answer(prompt)
+
+    def invoke(self, prompt):
+        content = self._call(prompt)
+        return FakeMessage(content, len(prompt) // 4, len(content) // 4)
+
+    def stream(self, prompt):
+        content = self._call(prompt)
+        for i in range(0, len(content), 64):
+            yield FakeMessage(content[i:i + 64])
+        yield FakeMessage("", len(prompt) // 4, len(content) // 4)
+
+
+# ---- SMTP ----
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self.reply("220 localhost SMTPSink")
+        in_data = False
+        recipients = []
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    with sink.lock:
+                        sink.messages += 1
+                        sink.recipients.extend(recipients)
+                    recipients = []
+                    self.reply("250 OK: queued")
+                continue
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250-localhost")
+                self.reply("250 SIZE 10485760")
+            elif command == "RCPT":
+                address = line.split(":", 1)[-1].strip("<> ")
+                if any(address.startswith(prefix) for prefix in sink.reject_prefixes):
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif command == "DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server that accepts everything (no STARTTLS, no AUTH) and counts messages.
+
+    Recipients starting with one of `reject_prefixes` are refused with 550.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, reject_prefixes=()):
+        super().__init__((host, port), _SMTPHandler)
+        self.reject_prefixes = tuple(reject_prefixes)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.recipients = []
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def port(self):
+        return self.server_address[1]
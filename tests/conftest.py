@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def app_main(tmp_path, monkeypatch):
+    """The app module with its database, blob store and caches pointed at a temp folder."""
+    monkeypatch.setattr(main, "DATA_FOLDER", str(tmp_path))
+    monkeypatch.setattr(main, "DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setattr(main, "TEMPORARY_FOLDER", str(tmp_path / "resumes"))
+    monkeypatch.setattr(main, "TEXT_CACHE_FOLDER", str(tmp_path / "text_cache"))
+    return main
+
+
+@pytest.fixture
+def app_log(caplog, monkeypatch):
+    """Captured records of the app's operational logger, which does not propagate to the root."""
+    monkeypatch.setattr(main.LOGGER, "propagate", True)
+    caplog.set_level("INFO", logger=main.LOGGER.name)
+    return caplog
@@ -0,0 +1,45 @@
+import os
+
+import main
+
+
+def test_memory_backend_needs_no_writable_data_folder(app_main, monkeypatch):
+    monkeypatch.setattr(main, "DATABASE_PATH", "/dev/null/unwritable/test.db")
+    monkeypatch.setattr(main, "TEXT_CACHE_FOLDER", "/dev/null/unwritable/text_cache")
+    store = main.AttachmentStore(main.MemoryBlobBackend())
+
+    sha256, is_new = store.put(b"%PDF-1.4 resume", "m1", "resume.pdf", "a@example.com", "Application")
+    assert is_new
+    assert store.lookup("m1", "resume.pdf") == sha256
+    assert store.blobs_for_sender("a@example.com") == [sha256]
+    assert store.evict(max_age_days=0) == 1
+    main.write_cached_text(sha256, 10, "text")  # logged, not raised
+
+
+def test_disk_backend_only_manages_content_addressed_blobs(tmp_path):
+    folder = tmp_path / "resumes"
+    folder.mkdir()
+    legacy = folder / "1049_another_resume.pdf"
+    legacy.write_bytes(b"x" * 100)
+    backend = main.DiskBlobBackend(folder=str(folder), max_bytes=10)
+
+    sha256, _, _ = backend.write([b"a" * 20])
+    sha256_2, _, _ = backend.write([b"b" * 20])
+    assert backend.stats()["blobs"] == 1
+    assert legacy.exists()
+    assert backend.exists(sha256_2) and not backend.exists(sha256)
+
+
+def test_trim_text_cache_drops_oldest_texts(app_main):
+    folder = app_main.TEXT_CACHE_FOLDER
+    digests = [c * 64 for c in "abc"]
+    for age, digest in enumerate(digests):
+        app_main.write_cached_text(digest, 10, "x" * 100)
+        os.utime(app_main._text_cache_path(digest, 10), (1000 - age, 1000 - age))
+    notes = os.path.join(folder, "README.txt")
+    with open(notes, "w") as f:
+        f.write("x" * 1000)
+
+    assert app_main.trim_text_cache(max_bytes=150) == 2
+    assert app_main.read_cached_text(digests[0], 10) is not None
+    assert os.path.exists(notes)
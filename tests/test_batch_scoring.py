@@ -0,0 +1,91 @@
+import json
+import re
+
+import pytest
+
+from fakes import FakeChatGroq
+
+
+class ScriptedLLM(FakeChatGroq):
+    """FakeChatGroq whose batch answers drop some ids and/or are wrapped in prose."""
+
+    def __init__(self, drop=(), preamble=""):
+        super().__init__(latency=0)
+        self.drop = set(drop)
+        self.preamble = preamble
+        self.prompts = []
+
+    def _answer(self, prompt):
+        self.prompts.append(prompt)
+        if "JSON array" in prompt:
+            ids = [i for i in re.findall(r"^Candidate (C\d+):", prompt, flags=re.MULTILINE) if i not in self.drop]
+            return self.preamble + json.dumps([dict(self._profile(), id=i) for i in ids])
+        return super()._answer(prompt)
+
+
+def make_candidate(i, words=50):
+    text = f"Candidate {i} resume. " + "Python SQL ETL pipelines. " * words
+    return {
+        "name": f"Applicant {i}", "email": f"a{i}@example.com", "phone": "555", "filename": f"{i}.pdf",
+        "sender": f"a{i}@example.com", "subject": "Application", "cleaned_text": text, "raw_text": text,
+        "matched_keywords": {"data": ["Python"]}, "content_hash": f"hash-{i}",
+    }
+
+
+@pytest.fixture
+def llm(app_main, monkeypatch):
+    class NoLimit:
+        def acquire(self, estimated_tokens):
+            pass
+
+        def pause(self, seconds):
+            pass
+
+    monkeypatch.setattr(app_main, "LLM_RATE_LIMITER", NoLimit())
+    holder = {}
+    monkeypatch.setattr(app_main, "get_llm", lambda model=None, temperature=None: holder["llm"])
+
+    def use(fake):
+        holder["llm"] = fake
+        return fake
+    return use
+
+
+def test_pack_respects_batch_size_and_token_budget(app_main):
+    candidates = [make_candidate(i) for i in range(5)]
+    cost = app_main.count_tokens(app_main.compact_resume_for_batch(candidates[0]))
+    assert [len(b) for b in app_main.pack_candidate_batches(candidates, 2, token_budget=10 ** 6)] == [2, 2, 1]
+    assert [len(b) for b in app_main.pack_candidate_batches(candidates, 5, token_budget=2 * cost + 1)] == [2, 2, 1]
+
+
+def test_oversize_candidate_gets_a_batch_of_its_own(app_main):
+    small, big = make_candidate(1, words=5), make_candidate(2, words=200)
+    budget = app_main.count_tokens(app_main.compact_resume_for_batch(small)) * 2
+    batches = app_main.pack_candidate_batches([small, big, make_candidate(3, words=5)], 5, token_budget=budget)
+    assert [[c["name"] for c in b] for b in batches] == [["Applicant 1"], ["Applicant 2"], ["Applicant 3"]]
+
+
+def test_batch_maps_ids_back_to_candidates(app_main, llm):
+    fake = llm(ScriptedLLM(preamble="Here is {the result} for you:\n"))
+    batch = [make_candidate(i) for i in range(3)]
+    records = app_main.score_candidate_batch(batch, "Data Engineer", output_mode="json")
+    assert [r["name"] for r in records] == ["Applicant 0", "Applicant 1", "Applicant 2"]
+    assert fake.calls == 1
+
+
+def test_missing_ids_fall_back_to_single_requests(app_main, llm, app_log):
+    fake = llm(ScriptedLLM(drop={"C2"}))
+    batch = [make_candidate(i) for i in range(3)]
+    records = app_main.score_candidate_batch(batch, "Data Engineer", output_mode="json")
+    assert [r["name"] for r in records] == ["Applicant 0", "Applicant 1", "Applicant 2"]
+    assert fake.calls == 2
+    assert "JSON object" in fake.prompts[-1] and "Applicant 1" in fake.prompts[-1]
+    assert any("left out 1 of 3" in record.getMessage() for record in app_log.records)
+
+
+def test_scored_batch_is_served_from_cache(app_main, llm):
+    fake = llm(ScriptedLLM())
+    batch = [make_candidate(i) for i in range(2)]
+    app_main.score_candidate_batch(batch, "Data Engineer", output_mode="json")
+    app_main.score_candidate_batch([make_candidate(i) for i in range(2)], "Data Engineer", output_mode="json")
+    assert fake.calls == 1
@@ -0,0 +1,69 @@
+import pytest
+
+import main
+
+JD = "Data Engineer: Python, SQL"
+
+
+def record(name, email, ats, hr, filename=None):
+    return {
+        "name": name, "email": email, "phone": "555", "filename": filename or f"{name}.pdf",
+        "sender": email, "subject": "Application", "prescreen_score": 50,
+        "sections": {"ats_score": ats, "hr_score": hr, "hr_summary": f"{name} summary"},
+    }
+
+
+@pytest.fixture
+def store(app_main):
+    store = main.CandidateStore()
+    posting = store.upsert_job_posting(JD)
+    for i, (ats, hr) in enumerate([(90, 8), (70, 6), (50, 4), (None, None), (80, 9)]):
+        store.save_candidate(posting, record(f"Applicant {i}", f"a{i}@example.com", ats, hr))
+    store.posting = posting
+    return store
+
+
+def test_upsert_updates_the_same_candidate(store):
+    assert store.upsert_job_posting(JD.upper() + "  ") == store.posting
+    store.save_candidate(store.posting, record("Applicant 0", "A0@Example.com", 95, 10))
+    candidates, total = store.query_candidates(job_posting_id=store.posting)
+    assert total == 5
+    assert candidates[0]["name"] == "Applicant 0" and candidates[0]["sections"]["hr_score"] == 10
+
+
+def test_query_filters_sorts_and_pages(store):
+    page, total = store.query_candidates(min_ats_score=60, sort="ats_score", limit=2)
+    assert total == 3
+    assert [c["name"] for c in page] == ["Applicant 0", "Applicant 4"]
+    page, _ = store.query_candidates(sort="hr_score", descending=False)
+    assert page[0]["name"] == "Applicant 2" and page[-1]["name"] == "Applicant 3"  # unscored last
+    assert store.query_candidates(search="Applicant 3")[1] == 1
+
+
+def test_latest_scores_match_emails_case_insensitively(store):
+    store.save_candidate(store.posting, record("Jane", "Jane@X.com", 60, 7))
+    latest = store.latest_scores_by_email(["jane@x.com", "A1@EXAMPLE.COM"])
+    assert latest["jane@x.com"]["hr_score"] == 7
+    assert latest["a1@example.com"]["ats_score"] == 70
+
+
+def test_paging_routes_report_totals(store):
+    client = main.app.test_client()
+    body = client.get("/candidates?limit=2&offset=2&sort=name&order=asc").get_json()
+    assert body["total"] == 5 and body["limit"] == 2 and body["next_offset"] == 4
+    assert [c["name"] for c in body["candidates"]] == ["Applicant 2", "Applicant 3"]
+    body = client.get(f"/job_postings/{store.posting}/candidates?min_hr_score=8").get_json()
+    assert body["total"] == 2
+    body = client.get("/job_postings").get_json()
+    assert body["total"] == 1 and body["job_postings"][0]["candidates"] == 5
+
+
+@pytest.mark.parametrize("query", [
+    "limit=abc", "offset=1.5", "min_ats_score=high", "min_hr_score=x", "sort=sections", "order=sideways",
+])
+def test_bad_query_parameters_return_400(store, query):
+    assert main.app.test_client().get(f"/candidates?{query}").status_code == 400
+
+
+def test_job_postings_rejects_bad_paging(store):
+    assert main.app.test_client().get("/job_postings?limit=ten").status_code == 400
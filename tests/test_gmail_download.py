@@ -0,0 +1,23 @@
+from fakes import FakeGmailService
+
+
+def download(app_main, service):
+    return app_main.download_resumes_from_gmail(None, max_messages=50, service_factory=lambda: service)
+
+
+def test_repeated_fetch_screens_stored_resumes_again(app_main):
+    service = FakeGmailService(num_messages=6, latency=0, unique=True)
+    first = download(app_main, service)
+    calls_after_first = service.calls
+    second = download(app_main, service)
+
+    assert len(first) == 6
+    assert sorted(m["sha256"] for m in second) == sorted(m["sha256"] for m in first)
+    # The second run lists and inspects mail but never re-downloads a stored attachment
+    assert service.calls - calls_after_first == 3
+
+
+def test_identical_attachments_are_returned_once(app_main):
+    service = FakeGmailService(num_messages=6, latency=0, unique=False)
+    resumes = download(app_main, service)
+    assert len(resumes) == len({m["sha256"] for m in resumes})
@@ -0,0 +1,9 @@
+from google.oauth2.credentials import Credentials
+
+
+def test_equal_credentials_reuse_the_service(app_main):
+    first = app_main.build_gmail_service(Credentials(token="token-1", refresh_token="r", client_id="c"))
+    again = app_main.build_gmail_service(Credentials(token="token-1", refresh_token="r", client_id="c"))
+    refreshed = app_main.build_gmail_service(Credentials(token="token-2", refresh_token="r", client_id="c"))
+    assert again is first
+    assert refreshed is not first
@@ -0,0 +1,53 @@
+from fakes import FakeGmailService, build_mime_message, load_sample_pdfs, personalize_pdf
+
+
+def add_messages(service, start, count):
+    filename, pdf_bytes = load_sample_pdfs()[0]
+    for i in range(start, start + count):
+        service.add_message(build_mime_message(i, filename, personalize_pdf(pdf_bytes, i)))
+
+
+def sync(app_main, service, limit):
+    return app_main.download_resumes_from_gmail(
+        None, max_messages=limit, service_factory=lambda: service, incremental=True
+    )
+
+
+def test_mail_beyond_limit_is_kept_for_the_next_run(app_main):
+    service = FakeGmailService(num_messages=0, latency=0)
+    add_messages(service, 0, 1)
+    assert len(sync(app_main, service, 20)) == 1
+
+    add_messages(service, 1, 30)
+    first = sync(app_main, service, 20)
+    second = sync(app_main, service, 20)
+    assert len(first) == 20
+    assert len(second) == 10
+    assert {m["message_id"] for m in first}.isdisjoint(m["message_id"] for m in second)
+    assert sync(app_main, service, 20) == []
+
+
+def test_first_full_sync_queues_the_whole_window(app_main):
+    service = FakeGmailService(num_messages=0, latency=0)
+    add_messages(service, 0, 25)
+    assert len(sync(app_main, service, 10)) == 10
+    assert len(sync(app_main, service, 10)) == 10
+    assert len(sync(app_main, service, 10)) == 5
+
+
+def test_failed_download_is_retried(app_main, monkeypatch):
+    service = FakeGmailService(num_messages=0, latency=0)
+    add_messages(service, 0, 3)
+    real_chunks = app_main.iter_attachment_chunks
+    failing = {service._order[0]}
+
+    def flaky_chunks(gmail_service, message_id, part, http_session=None):
+        if message_id in failing:
+            raise OSError("connection reset")
+        return real_chunks(gmail_service, message_id, part, http_session)
+
+    monkeypatch.setattr(app_main, "iter_attachment_chunks", flaky_chunks)
+    assert len(sync(app_main, service, 20)) == 2
+    failing.clear()
+    retried = sync(app_main, service, 20)
+    assert [m["message_id"] for m in retried] == [service._order[0]]
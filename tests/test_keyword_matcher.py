@@ -0,0 +1,23 @@
+import main
+
+
+def test_plurals_match_the_singular_term():
+    assert main.is_resume_file("Resumes.pdf", "Applications")
+    matcher = main.KeywordMatcher({"tech": ["API", "database", "box"]})
+    assert matcher.match_groups("Built APIs, databases and boxes") == {"tech": ["API", "database", "box"]}
+    hits = matcher.hits("two APIs")
+    assert hits["API"]["offsets"] == [(4, 8)]
+
+
+def test_word_boundaries_still_apply():
+    matcher = main.KeywordMatcher({"tech": ["AI", "doc"]})
+    assert not matcher.search("maintain the doctor records")
+
+
+def test_taxonomy_must_be_lists_of_strings():
+    with main.app.app_context():
+        for keywords in ({"tech": ["Python", 3]}, {"tech": "Python"}, ["Python"]):
+            params, error = main.read_screening_params({"keywords": keywords})
+            assert params is None and error[1] == 400
+        params, error = main.read_screening_params({"keywords": {"tech": ["Python"]}})
+    assert error is None and params["keywords"] == {"tech": ["Python"]}
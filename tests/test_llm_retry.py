@@ -0,0 +1,40 @@
+import httpx
+import pytest
+
+
+class ServerError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class FlakyLLM:
+    model_name = "flaky"
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return type("Response", (), {"content": "ok", "response_metadata": {}, "usage_metadata": None})()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "compute_backoff", lambda attempt, retry_after=None: 0)
+
+
+def test_transient_errors_are_retried(app_main):
+    llm = FlakyLLM([ServerError(503), httpx.ReadTimeout("timed out"), httpx.ConnectError("reset")])
+    assert app_main.invoke_llm_with_backoff(llm, "prompt", max_retries=5) == "ok"
+    assert llm.calls == 4
+
+
+def test_client_errors_are_not_retried(app_main):
+    llm = FlakyLLM([ServerError(400)])
+    with pytest.raises(ServerError):
+        app_main.invoke_llm_with_backoff(llm, "prompt", max_retries=5)
+    assert llm.calls == 1
@@ -0,0 +1,55 @@
+import sqlite3
+
+
+def test_live_lease_is_not_reclaimed(app_main):
+    worker_a, worker_b = app_main.EmailOutbox(), app_main.EmailOutbox()
+    row, created = worker_a.enqueue("a@example.com", "Subject", "Body", "key-1")
+    assert created
+    assert [r["outbox_id"] for r in worker_a.claim()] == [row["outbox_id"]]
+
+    # A second process starting up must not re-queue a row another worker is still sending
+    assert worker_b.reset_stale() == 0
+    assert worker_b.claim() == []
+    assert worker_b.get(row["outbox_id"])["claimed_by"] == worker_a.owner
+
+
+def test_expired_lease_is_reclaimed(app_main):
+    outbox = app_main.EmailOutbox()
+    row, _ = outbox.enqueue("a@example.com", "Subject", "Body", "key-2")
+    outbox.claim()
+    assert outbox.reset_stale(lease_seconds=-1) == 1
+    assert outbox.get(row["outbox_id"])["status"] == "queued"
+
+
+def test_old_database_gets_lease_columns(app_main):
+    conn = sqlite3.connect(app_main.DATABASE_PATH)
+    conn.execute("CREATE TABLE email_outbox (outbox_id TEXT PRIMARY KEY, idempotency_key TEXT NOT NULL UNIQUE, "
+                 "to_email TEXT NOT NULL, subject TEXT NOT NULL, body TEXT NOT NULL, status TEXT NOT NULL, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, last_error TEXT, "
+                 "created_at REAL NOT NULL, updated_at REAL NOT NULL, sent_at REAL)")
+    conn.commit()
+    conn.close()
+    row, _ = app_main.EmailOutbox().enqueue("a@example.com", "Subject", "Body", "key-3")
+    assert "claimed_at" in row
+
+
+def test_bulk_send_enqueues_each_candidate_once(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "start_outbox_dispatcher", lambda: None)
+    client = app_main.app.test_client()
+    payload = {
+        "job_description": "Data Engineer",
+        "candidates": [
+            {"email": "a@example.com", "name": "A", "type": "accept"},
+            {"email": "b@example.com", "name": "B", "type": "reject"},
+            {"email": "", "name": "C", "type": "accept"},
+        ],
+    }
+    first = client.post("/send_emails_bulk", json=payload)
+    assert first.status_code == 202
+    body = first.get_json()
+    assert (body["queued"], body["invalid"], len(body["outbox_ids"])) == (2, 1, 2)
+    assert app_main.EMAIL_OUTBOX.counts() == {"queued": 2}
+
+    again = client.post("/send_emails_bulk", json=payload).get_json()
+    assert (again["queued"], again["duplicates"]) == (0, 2)
+    assert again["outbox_ids"] == body["outbox_ids"]
@@ -0,0 +1,23 @@
+import glob
+import os
+import shutil
+
+import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_extraction_pool_is_spawned_once_and_reused(app_main, tmp_path):
+    samples = sorted(glob.glob(os.path.join(ROOT, "temp_resumes", "*.pdf")))
+    unique = list({main.file_sha256(p): p for p in samples}.values())[:2]
+    assert len(unique) == 2
+    paths = [shutil.copyfile(src, tmp_path / f"{i}.pdf") for i, src in enumerate(unique)]
+
+    texts = app_main.extract_texts_parallel([str(p) for p in paths], max_workers=2)
+    pool = app_main.get_extract_pool(2)
+    assert pool._mp_context.get_start_method() == "spawn"
+    assert texts == {str(p): app_main.extract_text_from_pdf(str(p)) for p in paths}
+
+    shutil.rmtree(app_main.TEXT_CACHE_FOLDER)
+    app_main.extract_texts_parallel([str(p) for p in paths], max_workers=2)
+    assert app_main.get_extract_pool(2) is pool
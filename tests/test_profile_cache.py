@@ -0,0 +1,25 @@
+def test_key_covers_every_input_that_changes_the_profile(app_main):
+    make_key = app_main.ProfileCache.make_key
+    base = make_key("resume", "jd", "model-a", "v1", temperature=0.2, matched_keywords={"data": ["python"]})
+    assert base == make_key("resume", "jd", "model-a", "v1", temperature=0.2, matched_keywords={"data": ["python"]})
+    assert base != make_key("resume", "jd", "model-a", "v1", temperature=0.7, matched_keywords={"data": ["python"]})
+    assert base != make_key("resume", "jd", "model-a", "v1", temperature=0.2, matched_keywords={"data": ["sql"]})
+    assert base != make_key("resume", "jd", "model-b", "v1", temperature=0.2, matched_keywords={"data": ["python"]})
+
+
+def test_key_changes_with_token_budgets(app_main, monkeypatch):
+    before = app_main.ProfileCache.make_key("resume", "jd")
+    monkeypatch.setattr(app_main, "PROMPT_RESUME_TOKEN_BUDGET", 100)
+    assert app_main.ProfileCache.make_key("resume", "jd") != before
+
+
+def test_custom_taxonomy_changes_the_key(app_main):
+    text = "Python developer with Kubernetes and Terraform experience"
+    default = app_main.keyword_match(text)
+    custom = app_main.keyword_match(text, app_main.get_keyword_matcher({"platform": ["kubernetes", "terraform"]}))
+    candidate = {"cleaned_text": text}
+    keys = {
+        app_main.profile_cache_key(dict(candidate, matched_keywords=matches), "jd", "m", None, "v1")
+        for matches in (default, custom)
+    }
+    assert len(keys) == 2
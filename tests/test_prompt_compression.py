@@ -0,0 +1,71 @@
+import threading
+
+import main
+
+RESUME = """Jane Doe
+jane@example.com
+HOBBIES
+Chess and hiking
+EDUCATION
+B.Tech Computer Science, 2019
+EXPERIENCE
+Data Engineer at Acme, 2019-2024
+Built Spark ETL pipelines on AWS
+Built Spark ETL pipelines on AWS
+SKILLS
+Python, SQL, PySpark, Airflow
+References available upon request
+"""
+
+
+def test_tokens_are_estimated_unless_a_tokenizer_is_configured(monkeypatch):
+    monkeypatch.setattr(main, "_token_encoder", None)
+    monkeypatch.setattr(main, "PROMPT_TOKENIZER", "")
+    assert main.count_tokens("x" * 40) == main.estimate_tokens("x" * 40)
+    assert main._token_encoder is False
+
+
+def test_tokenizer_is_loaded_once_across_threads(monkeypatch):
+    import sys
+    loads = []
+
+    class FakeTiktoken:
+        @staticmethod
+        def get_encoding(name):
+            loads.append(name)
+            return type("Encoder", (), {"encode": lambda self, text, disallowed_special=(): text.split()})()
+
+    monkeypatch.setitem(sys.modules, "tiktoken", FakeTiktoken)
+    monkeypatch.setattr(main, "_token_encoder", None)
+    monkeypatch.setattr(main, "PROMPT_TOKENIZER", "test_encoding")
+    threads = [threading.Thread(target=main.count_tokens, args=("a b c",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == ["test_encoding"]
+    assert main.count_tokens("a b c") == 3
+    monkeypatch.setattr(main, "_token_encoder", None)
+
+
+def test_truncate_cuts_at_a_line_boundary():
+    text = "first line here\nsecond line here\nthird line here"
+    cut = main.truncate_to_tokens(text, main.count_tokens("first line here") + main.count_tokens("second") + 2)
+    assert cut.startswith("first line here\n")
+    assert "third" not in cut
+    assert all(line in text for line in cut.splitlines())
+    assert main.truncate_to_tokens(text, 1000) == text
+
+
+def test_compress_resume_keeps_priority_sections_within_budget():
+    full = main.compress_resume(RESUME, budget=1000)
+    assert "HOBBIES" not in full and "Chess" not in full
+    assert "References" not in full
+    assert full.count("Built Spark ETL pipelines") == 1
+    # Skills outrank experience and education, whatever their order in the resume
+    assert full.index("SKILLS:") < full.index("EXPERIENCE:") < full.index("EDUCATION:")
+
+    for budget in (10, 25, 40):
+        compact = main.compress_resume(RESUME, budget=budget)
+        assert main.count_tokens(compact) <= budget
+    assert "EDUCATION" not in main.compress_resume(RESUME, budget=25)
@@ -0,0 +1,65 @@
+import main
+
+JD = "Data Engineer with Python, SQL and Spark ETL experience"
+
+
+def candidate(name, text):
+    return {"name": name, "cleaned_text": text, "matched_keywords": main.keyword_match(text)}
+
+
+def pool():
+    return [
+        candidate("chef", "Head chef running a busy kitchen, menu planning and food costing"),
+        candidate("engineer", "Data engineer building Spark ETL pipelines in Python and SQL on AWS"),
+        candidate("analyst", "Analyst writing SQL reports and some Python notebooks"),
+    ]
+
+
+def test_bm25_ranks_matching_documents_higher():
+    docs = [main.tokenize_for_ranking(t) for t in ["python sql spark", "python cooking", "gardening tips"]]
+    scores = main.bm25_scores(main.tokenize_for_ranking("python spark"), docs)
+    assert scores[0] > scores[1] > scores[2] == 0
+
+
+def test_bm25_rare_terms_weigh_more():
+    docs = [["python", "python"], ["python", "spark"], ["python"]]
+    scores = main.bm25_scores(["spark", "python"], docs)
+    assert scores.argmax() == 1
+
+
+def test_bm25_handles_empty_inputs():
+    assert list(main.bm25_scores([], [["python"]])) == [0.0]
+    assert len(main.bm25_scores(["python"], [])) == 0
+
+
+def test_shortlist_orders_best_first_and_keeps_the_rest():
+    shortlist, rest = main.shortlist_candidates(pool(), JD, top_k=0, min_score=0)
+    assert [c["name"] for c in shortlist] == ["engineer", "analyst", "chef"]
+    assert rest == []
+    assert shortlist[0]["prescreen_score"] == 100.0
+
+
+def test_top_k_and_min_score_cut_offs():
+    shortlist, rest = main.shortlist_candidates(pool(), JD, top_k=1, min_score=0)
+    assert [c["name"] for c in shortlist] == ["engineer"]
+    assert [c["name"] for c in rest] == ["analyst", "chef"]
+
+    shortlist, rest = main.shortlist_candidates(pool(), JD, top_k=0, min_score=1)
+    assert "chef" not in [c["name"] for c in shortlist]
+    assert [c["name"] for c in rest] == ["chef"]
+    assert all(c["prescreen_score"] is not None for c in rest)
+
+
+def test_negative_top_k_keeps_everyone():
+    shortlist, rest = main.shortlist_candidates(pool(), JD, top_k=-1, min_score=0)
+    assert len(shortlist) == 3 and rest == []
+
+
+def test_empty_job_description_falls_back_to_keyword_coverage():
+    shortlist, rest = main.shortlist_candidates(pool(), "", top_k=0, min_score=0)
+    assert len(shortlist) == 3 and rest == []
+    scores = {c["name"]: c["prescreen_score"] for c in shortlist}
+    # No BM25 signal: only the keyword share counts, and the chef matches no taxonomy keyword
+    assert scores["chef"] == 0
+    assert max(scores.values()) <= 100 * main.RANKING_KEYWORD_WEIGHT
+    assert main.shortlist_candidates([], JD) == ([], [])
@@ -0,0 +1,14 @@
+import os
+
+import main
+
+
+def test_profile_report_is_logged_not_printed(app_main, monkeypatch, capsys, app_log):
+    monkeypatch.setattr(main, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(main, "PROFILE_FOLDER", os.path.join(main.DATA_FOLDER, "profiles"))
+    response = main.app.test_client().get("/metrics?profile=1")
+
+    assert response.status_code == 200
+    assert os.path.exists(response.headers["X-Profile-File"])
+    assert "function calls" not in capsys.readouterr().out
+    assert any("function calls" in record.getMessage() for record in app_log.records)
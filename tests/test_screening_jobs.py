@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import main
+
+API_FOLDER = os.path.dirname(os.path.abspath(main.__file__))
+
+
+def test_orphaned_job_is_failed_and_stream_ends(app_main, monkeypatch):
+    store = main.SQLiteJobStore(heartbeat_interval=3600, stale_seconds=60)
+    monkeypatch.setattr(main, "JOB_STORE", store)
+    job_id = store.create({"job_description": "Data Engineer"})
+    store.set_status(job_id, "running")
+    # A restarted process: the job is no longer held here and its heartbeat is old
+    store._active.clear()
+    conn = main.get_db()
+    conn.execute("UPDATE screening_jobs SET updated_at = ? WHERE job_id = ?", (time.time() - 120, job_id))
+    conn.commit()
+
+    client = main.app.test_client()
+    body = client.get(f"/screening_jobs/{job_id}").get_json()
+    assert body["status"] == "failed"
+    assert body["events"][-1]["type"] == "error"
+
+    stream = client.get(f"/screening_jobs/{job_id}/events")
+    assert "event: error" in stream.get_data(as_text=True)
+
+
+def test_job_held_by_this_process_is_not_expired(app_main, monkeypatch):
+    store = main.SQLiteJobStore(heartbeat_interval=3600, stale_seconds=60)
+    job_id = store.create({})
+    conn = main.get_db()
+    conn.execute("UPDATE screening_jobs SET updated_at = ? WHERE job_id = ?", (time.time() - 120, job_id))
+    conn.commit()
+    assert store.expire_stale() == []
+    assert store.get(job_id)["status"] == "queued"
+
+
+def test_heartbeat_refreshes_unfinished_jobs(app_main):
+    store = main.SQLiteJobStore(heartbeat_interval=0.05, stale_seconds=60)
+    job_id = store.create({})
+    created = store.get(job_id)["updated_at"]
+    time.sleep(0.3)
+    assert store.get(job_id)["updated_at"] > created
+    store.set_status(job_id, "completed")
+
+
+def test_stream_has_a_maximum_lifetime(app_main, monkeypatch):
+    monkeypatch.setattr(main, "JOB_STORE", main.InMemoryJobStore())
+    monkeypatch.setattr(main, "SSE_MAX_STREAM_SECONDS", 0.2)
+    monkeypatch.setattr(main, "SSE_POLL_INTERVAL", 0.05)
+    job_id = main.JOB_STORE.create({})
+    main.JOB_STORE.set_status(job_id, "running")
+    started = time.monotonic()
+    main.app.test_client().get(f"/screening_jobs/{job_id}/events").get_data()
+    assert time.monotonic() - started < 5
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/screening_jobs/{}?after=abc", {}),
+    ("/screening_jobs/{}?after=-1", {}),
+    ("/screening_jobs/{}/events", {"Last-Event-ID": "x7"}),
+    ("/screening_jobs/{}/events?after=1.5", {}),
+])
+def test_malformed_event_cursor_returns_400(app_main, monkeypatch, path, headers):
+    monkeypatch.setattr(main, "JOB_STORE", main.InMemoryJobStore())
+    job_id = main.JOB_STORE.create({})
+    assert main.app.test_client().get(path.format(job_id), headers=headers).status_code == 400
+
+
+def test_serverless_defaults_keep_state_off_the_read_only_tree(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("DATA_FOLDER", "DATABASE_PATH", "JOB_STORE_BACKEND",
+                                                            "ATTACHMENT_STORAGE", "SERVERLESS")}
+    env.update(VERCEL="1", TMPDIR=str(tmp_path))
+    code = "import main; print(main.DATA_FOLDER, main.JOB_STORE_BACKEND, main.ATTACHMENT_STORAGE)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_FOLDER, env=env, capture_output=True, text=True,
+                         check=True).stdout.split()
+    assert out == [os.path.join(str(tmp_path), "hr_data"), "memory", "memory"]
@@ -0,0 +1,55 @@
+import pytest
+
+import main
+
+
+def read(data):
+    with main.app.app_context():
+        params, error = main.read_screening_params(data)
+    return params, (error[1] if error else None)
+
+
+def test_defaults_are_valid():
+    params, status = read({})
+    assert status is None
+    assert params["model"] == main.LLM_MODEL
+    assert params["temperature"] == main.LLM_TEMPERATURE
+
+
+def test_temperature_snaps_to_allowed_values():
+    assert read({"temperature": 0.93})[0]["temperature"] == 1.0
+    assert read({"temperature": "0.01"})[0]["temperature"] == 0.0
+
+
+@pytest.mark.parametrize("data", [
+    {"model": "some-other-model"},
+    {"temperature": 7},
+    {"temperature": "hot"},
+    {"max_messages": "many"},
+    {"batch_size": None},
+    {"days_filter": float("inf")},
+    {"days_filter": 0},
+    {"max_messages": 100000},
+    {"shortlist_top_k": -1},
+    {"shortlist_min_score": 101},
+    {"batch_size": 0},
+    {"batch_size": -3},
+    {"output_mode": "yaml"},
+    {"incremental": "maybe"},
+])
+def test_invalid_parameters_are_rejected(data):
+    params, status = read(data)
+    assert params is None and status == 400
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("false", False), ("False", False), ("0", False), (0, False), (False, False),
+    ("true", True), ("1", True), (1, True), (True, True),
+])
+def test_incremental_is_parsed_strictly(value, expected):
+    assert read({"incremental": value})[0]["incremental"] is expected
+
+
+def test_output_mode_accepts_json_and_text():
+    assert read({"output_mode": "text"})[0]["output_mode"] == "text"
+    assert read({"output_mode": "json"})[0]["output_mode"] == "json"
@@ -0,0 +1,71 @@
+import numpy as np
+
+import main
+
+RESUMES = {
+    "engineer": "SKILLS\nPython, SQL, PySpark, Airflow\nEXPERIENCE\nData engineer building ETL pipelines on AWS",
+    "designer": "SKILLS\nFigma, Photoshop, typography\nEXPERIENCE\nProduct designer for mobile apps",
+    "chef": "EXPERIENCE\nHead chef, menu planning, kitchen staff management",
+}
+
+
+def candidate(name, text):
+    return {"name": name, "email": f"{name}@example.com", "phone": "555", "filename": f"{name}.pdf",
+            "sender": f"{name}@example.com", "cleaned_text": " ".join(text.split()), "raw_text": text}
+
+
+def indexed():
+    index = main.SemanticIndex()
+    hashes = index.add_many([candidate(n, t) for n, t in RESUMES.items()])
+    return index, dict(zip(RESUMES, hashes))
+
+
+def test_hashing_embedder_is_normalised_and_stable():
+    embedder = main.HashingEmbedder(dim=256)
+    vectors = embedder.embed(["data engineering", "data engineer", "pastry chef", ""])
+    assert vectors.shape == (4, 256)
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.array_equal(embedder.embed(["data engineering"])[0], vectors[0])
+
+
+def test_search_ranks_the_closest_resume_first(app_main):
+    index, hashes = indexed()
+    results = index.search("Data engineer: Python, SQL, Spark ETL on AWS", top_n=3)
+    assert [h for h, _ in results][0] == hashes["engineer"]
+    assert [s for _, s in results] == sorted((s for _, s in results), reverse=True)
+    assert len(index.search("Data engineer", top_n=1)) == 1
+
+
+def test_min_score_filters_weak_matches(app_main):
+    index, hashes = indexed()
+    all_results = index.search("Data engineer: Python, SQL, Spark ETL on AWS", top_n=3)
+    threshold = all_results[0][1] - 0.1
+    filtered = index.search("Data engineer: Python, SQL, Spark ETL on AWS", top_n=3, min_score=threshold)
+    assert filtered == all_results[:1]
+
+
+def test_reindexing_the_same_content_adds_nothing(app_main):
+    index, hashes = indexed()
+    chunks = index.stats()["chunks"]
+    again = index.add_many([candidate("engineer-renamed", RESUMES["engineer"])])
+    assert again == [hashes["engineer"]]
+    assert index.stats()["resumes"] == 3 and index.stats()["chunks"] == chunks
+    # The applicant details follow the latest submission of that content
+    assert index.describe(again)[hashes["engineer"]]["name"] == "engineer-renamed"
+
+
+def test_index_reloads_from_the_database(app_main):
+    _, hashes = indexed()
+    fresh = main.SemanticIndex()
+    assert fresh.stats()["resumes"] == 3
+    assert fresh.score_documents("Figma product designer", [hashes["designer"], "unknown"])[1] == 0.0
+
+
+def test_describe_returns_applicant_details(app_main):
+    index, hashes = indexed()
+    details = index.describe([hashes["chef"], "missing"])
+    assert list(details) == [hashes["chef"]]
+    assert details[hashes["chef"]]["email"] == "chef@example.com"
+    assert index.describe([]) == {}
@@ -0,0 +1,72 @@
+import smtplib
+
+import pytest
+
+from fakes import SMTPSink
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink(reject_prefixes=("missing",)).start()
+    yield server
+    server.shutdown()
+
+
+def test_password_is_never_sent_without_starttls(app_main, sink):
+    pool = app_main.SMTPConnectionPool("127.0.0.1", sink.port, "hr@example.com", "app-password")
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        pool.send(app_main.build_email_message("a@example.com", "Subject", "Body"))
+    assert sink.messages == 0
+
+
+def test_refused_recipient_keeps_the_pooled_connection(app_main, sink):
+    pool = app_main.SMTPConnectionPool("127.0.0.1", sink.port, size=1)
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send(app_main.build_email_message("missing@example.com", "Subject", "Body"))
+    pool.send(app_main.build_email_message("a@example.com", "Subject", "Body"))
+    pool.close()
+    assert (sink.messages, sink.connections, pool.connects) == (1, 1, 1)
+
+
+class DroppedSMTP:
+    def send_message(self, msg):
+        raise smtplib.SMTPServerDisconnected("gone")
+
+    def quit(self):
+        pass
+
+
+def test_failed_reconnect_does_not_return_the_dead_connection(app_main, monkeypatch):
+    pool = app_main.SMTPConnectionPool("127.0.0.1", 25, size=1)
+    pool._idle.put({"smtp": DroppedSMTP(), "sent": 0, "last_used": 0})
+    pool.idle_check = float("inf")
+
+    def refuse_login():
+        raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+    monkeypatch.setattr(pool, "_connect", refuse_login)
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        pool.send(app_main.build_email_message("a@example.com", "Subject", "Body"))
+    assert pool._idle.empty()
+
+
+class RejectingPool:
+    def __init__(self, error):
+        self.error = error
+
+    def send(self, msg):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, permanent", [
+    (smtplib.SMTPDataError(554, b"message rejected"), True),
+    (smtplib.SMTPSenderRefused(553, b"sender not allowed", "hr@example.com"), True),
+    (smtplib.SMTPDataError(451, b"try again later"), False),
+    (smtplib.SMTPAuthenticationError(535, b"bad credentials"), False),
+    (smtplib.SMTPServerDisconnected("gone"), False),
+])
+def test_5xx_replies_are_permanent_failures(app_main, error, permanent):
+    sender = app_main.BulkEmailSender(RejectingPool(error), workers=1, messages_per_minute=6000)
+    result = sender.submit(app_main.build_email_message("a@example.com", "Subject", "Body")).result()
+    assert not result["success"]
+    assert result.get("permanent", False) is permanent
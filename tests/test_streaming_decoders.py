@@ -0,0 +1,63 @@
+import base64
+import json
+import os
+import random
+
+import pytest
+
+import main
+
+
+def split_at(text, cuts):
+    points = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in zip(points, points[1:])]
+
+
+def every_split(text):
+    """All ways to cut the text in two, plus single characters."""
+    yield [text]
+    yield list(text)
+    for i in range(1, len(text)):
+        yield split_at(text, [i])
+
+
+def test_json_field_survives_every_chunk_boundary():
+    document = json.dumps({"size": 3, "data": 'a\\b"c/é☃\n', "id": "x"})
+    for chunks in every_split(document):
+        assert "".join(main.iter_json_string_field(chunks, "data")) == 'a\\b"c/é☃\n'
+
+
+def test_json_field_with_escaped_solidus_and_unicode_split_inside():
+    document = '{"data": "ab\\/cd\\u00e9f"}'
+    cut = document.index("\\u") + 3  # inside the \\u escape
+    assert "".join(main.iter_json_string_field(split_at(document, [cut]), "data")) == "ab/cdéf"
+
+
+def test_json_field_missing_yields_nothing():
+    assert list(main.iter_json_string_field(['{"other": "x"}'], "data")) == []
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 31, 64])
+def test_base64url_stream_survives_every_chunk_boundary(size):
+    data = os.urandom(size)
+    for padded in (True, False):
+        text = base64.urlsafe_b64encode(data).decode("ascii")
+        if not padded:
+            text = text.rstrip("=")
+        for chunks in every_split(text):
+            assert b"".join(main.decode_base64url_stream(chunks)) == data
+
+
+def test_base64url_stream_random_chunking():
+    rng = random.Random(7)
+    data = os.urandom(5000)
+    text = base64.urlsafe_b64encode(data).decode("ascii")
+    cuts = sorted(rng.sample(range(1, len(text)), 200))
+    assert b"".join(main.decode_base64url_stream(split_at(text, cuts))) == data
+
+
+def test_attachment_stream_decodes_a_split_json_body():
+    data = os.urandom(1000)
+    body = json.dumps({"data": base64.urlsafe_b64encode(data).decode("ascii"), "size": len(data)})
+    chunks = split_at(body, list(range(7, len(body), 13)))
+    assert b"".join(main.decode_base64url_stream(main.iter_json_string_field(chunks, "data"))) == data
@@ -0,0 +1,64 @@
+import main
+
+
+def feed(text, depth=0, chunk_size=None):
+    parser = main.StreamingJSONParser(depth=depth)
+    if chunk_size is None:
+        parser.feed(text)
+    else:
+        for i in range(0, len(text), chunk_size):
+            parser.feed(text[i:i + chunk_size])
+    return parser
+
+
+def test_leading_prose_with_brackets_and_braces():
+    text = 'Here is [the] profile (see {notes} below):\n{"name": "Asha", "skills": ["SQL"]}'
+    parser = feed(text, chunk_size=1)
+    assert parser.values == [{"name": "Asha", "skills": ["SQL"]}]
+    assert parser.errors == 0
+
+
+def test_leading_prose_before_batch_array():
+    text = 'Scores for [2] candidates]:\n[{"candidate_id": 1}, {"candidate_id": 2}]'
+    parser = feed(text, depth=1, chunk_size=3)
+    assert [v["candidate_id"] for v in parser.values] == [1, 2]
+
+
+def test_fenced_output():
+    text = '```json\n{"name": "Ravi", "note": "uses {braces} and ]"}\n```\nDone {}.'
+    parser = feed(text, chunk_size=4)
+    assert parser.values == [{"name": "Ravi", "note": "uses {braces} and ]"}]
+
+
+def test_stops_after_first_json_value():
+    parser = feed('{"a": 1}\n{"b": 2}')
+    assert parser.values == [{"a": 1}]
+
+
+def test_truncated_stream_emits_only_complete_objects():
+    parser = feed('[{"candidate_id": 1}, {"candidate_id": 2, "skills": ["Py', depth=1)
+    assert parser.values == [{"candidate_id": 1}]
+    assert parser.errors == 0
+
+    parser = feed('Sure! {"name": "Asha", "skills": [')
+    assert parser.values == [] and parser.errors == 0
+
+
+def test_prose_brace_before_batch_array_keeps_array_mode():
+    text = 'Here is {the result} for you: [{"id": "C1", "a": 1}, {"id": "C2", "a": 2}]'
+    parser = feed(text, depth=1, chunk_size=5)
+    assert [v["id"] for v in parser.values] == ["C1", "C2"]
+    assert parser.target_depth == 1
+
+
+def test_lone_object_accepted_in_array_mode():
+    parser = feed('Result: {"id": "C1"}', depth=1)
+    assert parser.values == [{"id": "C1"}]
+
+
+def test_reset_restores_array_mode():
+    parser = feed('{"id": "C1"}', depth=1)
+    assert parser.target_depth == 0
+    parser.reset()
+    parser.feed('[{"id": "C1"}, {"id": "C2"}]')
+    assert [v["id"] for v in parser.values] == ["C1", "C2"]